@@ -114,8 +114,23 @@ def get_config_from_api(config):
 
 
 def get_private_config_from_api(config, device_id, client_id):
-    """从Java API获取私有配置"""
-    return get_agent_models(device_id, client_id, config["selected_module"])
+    """从Java API获取私有配置（按device-id缓存，过期后后台刷新）"""
+    from core.utils.cache.private_config import get_private_config_cache
+
+    selected_module = config["selected_module"]
+    cache = get_private_config_cache(config)
+    if cache is None:
+        return get_agent_models(device_id, client_id, selected_module)
+    return cache.get(
+        device_id, lambda: get_agent_models(device_id, client_id, selected_module)
+    )
+
+
+def invalidate_private_config(device_id=None):
+    """使设备私有配置缓存失效（智控台修改配置后调用）"""
+    from core.utils.cache.private_config import invalidate_private_config_cache
+
+    return invalidate_private_config_cache(device_id)
 
 
 def ensure_directories(config):
@@ -1,10 +1,14 @@
 import os
 import time
 import base64
+import random
+import asyncio
 from typing import Optional, Dict
 
 import httpx
 
+from core.utils.latency_histogram import LatencyHistogram
+
 TAG = __name__
 
 
@@ -18,9 +22,170 @@ class DeviceBindException(Exception):
         super().__init__(f"设备绑定异常，绑定码: {bind_code}")
 
 
+class CircuitOpenError(Exception):
+    """接口熔断中，请求未发出"""
+
+
+class CircuitBreaker:
+    """单个接口的熔断器：连续失败达到阈值后熔断，冷却后放行一个探测请求"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open = False
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        if self.half_open or time.monotonic() - self.opened_at >= self.recovery_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.half_open:
+            # 冷却结束，只放行一个探测请求
+            self.half_open = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.half_open = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.half_open = False
+
+
+class AsyncManageApiClient:
+    """
+    基于 httpx.AsyncClient 的管理端客户端
+    运行在独立的线程和事件循环中（LoopHTTPClient），可从任意事件循环 await，也可从工作线程同步调用；
+    重试使用 asyncio.sleep 指数退避（带抖动），不占用调用方线程和主事件循环
+    """
+
+    def __init__(self, config: Dict):
+        # 延迟导入：config_loader 导入本模块时日志模块尚未就绪
+        from core.utils.async_http import LoopHTTPClient
+
+        self.config = config
+        self.max_retries = int(config.get("max_retries", 6))
+        self.retry_delay = float(config.get("retry_delay", 10))
+        self.max_retry_delay = float(config.get("max_retry_delay", 30))
+        self.max_concurrency = int(config.get("max_concurrency", 32))
+        self.timeout = config.get("timeout", 30)
+        self.breaker_threshold = int(config.get("breaker_failure_threshold", 5))
+        self.breaker_recovery = float(config.get("breaker_recovery_timeout", 30))
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._http = LoopHTTPClient(
+            "manage-api",
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+            base_url=self.config.get("url"),
+            headers={
+                "User-Agent": f"PythonClient/2.0 (PID:{os.getpid()})",
+                "Accept": "application/json",
+                "Authorization": "Bearer " + self.config.get("secret", ""),
+            },
+            timeout=self.timeout,
+        )
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """发送单次HTTP请求并处理响应"""
+        if self._semaphore is None:
+            # 只在客户端事件循环中创建和使用
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            response = await self._http.client.request(method, endpoint, **kwargs)
+        response.raise_for_status()
+
+        result = response.json()
+
+        # 处理API返回的业务错误
+        if result.get("code") == 10041:
+            raise DeviceNotFoundException(result.get("msg"))
+        elif result.get("code") == 10042:
+            raise DeviceBindException(result.get("msg"))
+        elif result.get("code") != 0:
+            raise Exception(f"API返回错误: {result.get('msg', '未知错误')}")
+
+        # 返回成功数据
+        return result.get("data") if result.get("code") == 0 else None
+
+    async def _execute(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """带熔断和重试机制的请求执行器（在客户端事件循环中运行）"""
+        endpoint = endpoint.lstrip("/")
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(self.breaker_threshold, self.breaker_recovery)
+            self._breakers[endpoint] = breaker
+            self._latency[endpoint] = LatencyHistogram()
+        histogram = self._latency[endpoint]
+
+        retry_count = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"{method} {endpoint} 熔断中，暂停请求")
+            start = time.monotonic()
+            try:
+                result = await self._request(method, endpoint, **kwargs)
+            except Exception as e:
+                retryable = ManageApiClient._should_retry(e)
+                histogram.observe((time.monotonic() - start) * 1000, ok=not retryable)
+                if not retryable:
+                    # 业务错误说明接口本身可用
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if retry_count >= self.max_retries:
+                    raise
+                retry_count += 1
+                delay = min(
+                    self.max_retry_delay, self.retry_delay * (2 ** (retry_count - 1))
+                ) * random.uniform(0.5, 1.0)
+                print(
+                    f"{method} {endpoint} 请求失败，将在 {delay:.1f} 秒后进行第 {retry_count} 次重试"
+                )
+                await asyncio.sleep(delay)
+                continue
+            histogram.observe((time.monotonic() - start) * 1000)
+            breaker.record_success()
+            return result
+
+    async def execute(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """在任意事件循环中异步执行请求"""
+        return await self._http.run(self._execute(method, endpoint, **kwargs))
+
+    def execute_sync(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """在工作线程中同步执行请求（不可在客户端自身的事件循环中调用）"""
+        return self._http.run_sync(self._execute(method, endpoint, **kwargs))
+
+    def get_stats(self) -> Dict:
+        return {
+            endpoint: dict(
+                histogram.snapshot(), breaker=self._breakers[endpoint].state
+            )
+            for endpoint, histogram in list(self._latency.items())
+        }
+
+    def close(self):
+        self._http.close()
+
+
 class ManageApiClient:
     _instance = None
-    _client = None
+    _client: Optional[AsyncManageApiClient] = None
     _secret = None
 
     def __new__(cls, config):
@@ -47,49 +212,14 @@ class ManageApiClient:
         cls._secret = cls.config.get("secret")
         cls.max_retries = cls.config.get("max_retries", 6)  # 最大重试次数
         cls.retry_delay = cls.config.get("retry_delay", 10)  # 初始重试延迟(秒)
-        # NOTE(goody): 2025/4/16 http相关资源统一管理，后续可以增加线程池或者超时
-        # 后续也可以统一配置apiToken之类的走通用的Auth
-        cls._client = httpx.Client(
-            base_url=cls.config.get("url"),
-            headers={
-                "User-Agent": f"PythonClient/2.0 (PID:{os.getpid()})",
-                "Accept": "application/json",
-                "Authorization": "Bearer " + cls._secret,
-            },
-            timeout=cls.config.get("timeout", 30),  # 默认超时时间30秒
-        )
-
-    @classmethod
-    def _request(cls, method: str, endpoint: str, **kwargs) -> Dict:
-        """发送单次HTTP请求并处理响应"""
-        endpoint = endpoint.lstrip("/")
-        
-        # デバッグ用ログ追加
-        print(f"※ここだよ！ API Request: {method} {cls._client.base_url}/{endpoint}")
-        print(f"※ここだよ！ Authorization Header: Bearer {cls._secret[:10]}...")
-        print(f"※ここだよ！ Request Headers: {dict(cls._client.headers)}")
-        
-        response = cls._client.request(method, endpoint, **kwargs)
-        
-        print(f"※ここだよ！ Response Status: {response.status_code}")
-        print(f"※ここだよ！ Response Headers: {dict(response.headers)}")
-        if response.status_code != 200:
-            print(f"※ここだよ！ Response Body: {response.text}")
-        
-        response.raise_for_status()
+        # http相关资源统一管理：异步连接池、并发上限、熔断和耗时统计
+        cls._client = AsyncManageApiClient(cls.config)
+        try:
+            from core.utils.cache.manager import cache_manager
 
-        result = response.json()
-
-        # 处理API返回的业务错误
-        if result.get("code") == 10041:
-            raise DeviceNotFoundException(result.get("msg"))
-        elif result.get("code") == 10042:
-            raise DeviceBindException(result.get("msg"))
-        elif result.get("code") != 0:
-            raise Exception(f"API返回错误: {result.get('msg', '未知错误')}")
-
-        # 返回成功数据
-        return result.get("data") if result.get("code") == 0 else None
+            cache_manager.register_stats("manage_api", cls.get_stats)
+        except ImportError:
+            pass
 
     @classmethod
     def _should_retry(cls, exception: Exception) -> bool:
@@ -109,31 +239,24 @@ class ManageApiClient:
 
     @classmethod
     def _execute_request(cls, method: str, endpoint: str, **kwargs) -> Dict:
-        """带重试机制的请求执行器"""
-        retry_count = 0
+        """同步执行请求（供工作线程调用），重试在客户端事件循环中进行"""
+        return cls._client.execute_sync(method, endpoint, **kwargs)
 
-        while retry_count <= cls.max_retries:
-            try:
-                # 执行请求
-                return cls._request(method, endpoint, **kwargs)
-            except Exception as e:
-                # 判断是否应该重试
-                if retry_count < cls.max_retries and cls._should_retry(e):
-                    retry_count += 1
-                    print(
-                        f"{method} {endpoint} 请求失败，将在 {cls.retry_delay:.1f} 秒后进行第 {retry_count} 次重试"
-                    )
-                    time.sleep(cls.retry_delay)
-                    continue
-                else:
-                    # 不重试，直接抛出异常
-                    raise
+    @classmethod
+    async def execute_request_async(cls, method: str, endpoint: str, **kwargs) -> Dict:
+        """异步执行请求（供事件循环中的协程调用），不阻塞调用方事件循环"""
+        return await cls._client.execute(method, endpoint, **kwargs)
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        return cls._client.get_stats() if cls._client else {}
 
     @classmethod
     def safe_close(cls):
         """安全关闭连接池"""
         if cls._client:
             cls._client.close()
+            cls._client = None
             cls._instance = None
 
 
@@ -23,7 +23,6 @@ from core.utils.modules_initialize import (
     initialize_tts,
     initialize_asr,
 )
-from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
 from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
@@ -39,7 +38,22 @@ from config.logger import setup_logging, build_module_string, create_connection_
 from config.manage_api_client import DeviceNotFoundException, DeviceBindException
 from core.utils.prompt_manager import PromptManager
 from core.utils.voiceprint_provider import VoiceprintProvider
+from core.utils.opus_decoder_utils import OpusDecodeStage
+from core.utils.async_pipeline import (
+    LoopQueue,
+    get_chat_executor,
+    get_init_executor,
+    get_shared_executor,
+    is_async_pipeline_enabled,
+    is_shared_executor,
+)
 from core.utils import textUtils
+from core.utils.provider_registry import get_provider_registry
+from core.utils.memory_prefetch import (
+    DEFAULT_DEADLINE_MS as DEFAULT_MEMORY_DEADLINE_MS,
+    MemoryPrefetcher,
+)
+from core.utils.latency_timeline import LatencyRecorder
 
 TAG = __name__
 
@@ -90,11 +104,20 @@ class ConnectionHandler:
         # 线程任务相关
         self.loop = asyncio.get_event_loop()
         self.stop_event = threading.Event()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # asyncio原生管线：各阶段以任务运行，阻塞工作交给进程级线程池
+        # （对话/LLM流式请求、TTS合成、连接初始化分池，互不抢占）
+        self.async_pipeline = is_async_pipeline_enabled(self.config)
+        self.pipeline_tasks = []
+        if self.async_pipeline:
+            self.executor = get_shared_executor(self.config)
+            self.chat_executor = get_chat_executor(self.config)
+            self.init_executor = get_init_executor(self.config)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=5)
+            self.chat_executor = self.executor
+            self.init_executor = self.executor
 
-        # 添加上报线程池
-        self.report_queue = queue.Queue()
-        self.report_thread = None
+        # 聊天记录上报由进程级上报服务统一处理（core/utils/report_service.py）
         # 未来可以通过修改此处，调节asr的上报和tts的上报，目前默认都开启
         self.report_asr_enable = self.read_config_from_api
         self.report_tts_enable = self.read_config_from_api
@@ -108,8 +131,13 @@ class ConnectionHandler:
         self._asr = _asr
         self._vad = _vad
         self.llm = _llm
+        # 从进程级注册表获取的共享实例，连接关闭时释放（有记忆保存时在保存完成后释放）
+        self.provider_leases = []
+        self.release_leases_after_save = False
         self.memory = _memory
         self.intent = _intent
+        # 每连接的记忆快照，记忆查询不阻塞LLM请求
+        self.memory_prefetch = None
 
         # 为每个连接单独管理声纹识别
         self.voiceprint_provider = None
@@ -131,7 +159,11 @@ class ConnectionHandler:
         # 因为实际部署时可能会用到公共的本地ASR，不能把变量暴露给公共ASR
         # 所以涉及到ASR的变量，需要在这里定义，属于connection的私有变量
         self.asr_audio = []
-        self.asr_audio_queue = queue.Queue()
+        self.asr_audio_queue = (
+            LoopQueue(self.loop) if self.async_pipeline else queue.Queue()
+        )
+        # 上行Opus只解码一次，解码结果由VAD/ASR/声纹共享
+        self.opus_decode_stage = OpusDecodeStage()
         # 在ASR未就绪期间的临时音频缓冲
         self.pending_audio_frames = []
         # 简易统计：接收的音频帧与字节数
@@ -140,7 +172,10 @@ class ConnectionHandler:
 
         # llm相关变量
         self.llm_finish_task = True
-        self.dialogue = Dialogue()
+        self.dialogue = Dialogue(
+            max_turns=self.config.get("dialogue_max_turns", 0),
+            max_tokens=self.config.get("dialogue_max_tokens", 0),
+        )
 
         # tts相关变量
         self.sentence_id = None
@@ -175,6 +210,8 @@ class ConnectionHandler:
 
         # Debugging/Tracing helpers
         self.utt_seq = 0  # Incremented on listen start
+        # 单句时延时间线（断句 -> 首帧音频发送）
+        self.latency = LatencyRecorder(self, self.config.get("latency_timeline", True))
         # ingress tracing
         self._ingress_seen = set()
         self.rx_frames_since_listen = 0
@@ -183,33 +220,9 @@ class ConnectionHandler:
         # Additional debugging fields
         self.debug_last_stop_set_by = None
 
-        # --- Ensure vad_provider initialized immediately (fallback to WebRTC) ---
-        try:
-            from core.providers.vad.webrtc import VADProvider as WebrtcVAD
-            try:
-                # prefer module-specific config if present
-                vad_conf = self.config.get("VAD", {}).get("WebRTCVAD", {})
-            except Exception:
-                vad_conf = self.config.get("VAD", {}) or {}
-            try:
-                self.vad_provider = WebrtcVAD(vad_conf)
-            except Exception:
-                # if instantiation fails, leave vad_provider to be set later
-                self.vad_provider = getattr(self, 'vad', None)
-
-            try:
-                import subprocess
-                sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"]).decode().strip()
-            except Exception:
-                sha = "unknown"
-            try:
-                self.logger.bind(tag=TAG).info(f"[BOOT] COMMIT={sha} VAD_IMPL={type(self.vad_provider).__name__ if self.vad_provider is not None else 'None'}")
-            except Exception:
-                pass
-        except Exception:
-            # keep moving; _initialize_components will try to set vad later
-            self.vad_provider = getattr(self, 'vad', None)
-        # ---------------------------------------------------------------------
+        # VAD模型由服务器共享，连接只持有自己的VADSession（解码器、帧缓冲等）
+        self.vad_provider = _vad
+        self.vad_session = None
 
     async def handle_connection(self, ws):
         try:
@@ -294,7 +307,7 @@ class ConnectionHandler:
             except Exception:
                 pass
             # 异步初始化
-            self.executor.submit(self._initialize_components)
+            self.init_executor.submit(self._initialize_components)
 
             try:
                 async for message in self.websocket:
@@ -333,7 +346,7 @@ class ConnectionHandler:
                         loop = asyncio.new_event_loop()
                         asyncio.set_event_loop(loop)
                         loop.run_until_complete(
-                            self.memory.save_memory(self.dialogue.dialogue)
+                            self.memory.save_memory(self.dialogue.full_history())
                         )
                     except Exception as e:
                         self.logger.bind(tag=TAG).error(f"保存记忆失败: {e}")
@@ -342,9 +355,12 @@ class ConnectionHandler:
                             loop.close()
                         except Exception:
                             pass
+                        # 记忆总结使用的LLM可能来自注册表，保存完成后再释放，避免保存中途被淘汰关闭
+                        self.release_providers()
 
                 # 启动线程保存记忆，不等待完成
                 threading.Thread(target=save_memory_task, daemon=True).start()
+                self.release_leases_after_save = True
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"保存记忆失败: {e}")
         finally:
@@ -475,6 +491,8 @@ class ConnectionHandler:
             """初始化本地组件"""
             if self.vad is None:
                 self.vad = self._vad
+            if self.vad is not None:
+                self.vad_provider = self.vad
             if self.asr is None:
                 self.asr = self._initialize_asr()
 
@@ -496,8 +514,6 @@ class ConnectionHandler:
             self._initialize_memory()
             """加载意图识别"""
             self._initialize_intent()
-            """初始化上报线程"""
-            self._init_report_threads()
             """更新系统提示词"""
             self._init_prompt_enhancement()
 
@@ -515,19 +531,6 @@ class ConnectionHandler:
             self.change_system_prompt(enhanced_prompt)
             self.logger.bind(tag=TAG).info("系统提示词已增强更新")
 
-    def _init_report_threads(self):
-        """初始化ASR和TTS上报线程"""
-        if not self.read_config_from_api or self.need_bind:
-            return
-        if self.chat_history_conf == 0:
-            return
-        if self.report_thread is None or not self.report_thread.is_alive():
-            self.report_thread = threading.Thread(
-                target=self._report_worker, daemon=True
-            )
-            self.report_thread.start()
-            self.logger.bind(tag=TAG).info("TTS上报线程已启动")
-
     def _initialize_tts(self):
         """初始化TTS"""
         tts = None
@@ -678,6 +681,7 @@ class ConnectionHandler:
                 init_tts,
                 init_memory,
                 init_intent,
+                leases=self.provider_leases,
             )
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"初始化组件失败: {e}")
@@ -686,30 +690,7 @@ class ConnectionHandler:
             self.tts = modules["tts"]
         if modules.get("vad", None) is not None:
             self.vad = modules["vad"]
-        # Ensure a stable vad_provider reference is available on the connection
-        try:
-            if getattr(self, 'vad', None) is not None:
-                self.vad_provider = self.vad
-            else:
-                # Fallback: try to instantiate a default webrtc provider
-                try:
-                    from core.providers.vad.webrtc import VADProvider as WebrtcVAD
-
-                    try:
-                        vad_conf = self.config.get("VAD", {})
-                    except Exception:
-                        vad_conf = {}
-                    self.vad_provider = WebrtcVAD(vad_conf)
-                except Exception:
-                    self.vad_provider = None
-
-            try:
-                self.logger.bind(tag=TAG).info(f"[BOOT] VAD_IMPL={type(self.vad_provider).__name__ if self.vad_provider is not None else 'None'}")
-            except Exception:
-                pass
-        except Exception:
-            # keep going but leave vad_provider as None
-            self.vad_provider = None
+            self.vad_provider = self.vad
         if modules.get("asr", None) is not None:
             self.asr = modules["asr"]
         if modules.get("llm", None) is not None:
@@ -736,6 +717,14 @@ class ConnectionHandler:
             summary_memory=self.config.get("summaryMemory", None),
             save_to_file=use_local_file,
         )
+        try:
+            deadline_ms = int(
+                self.config.get("memory_query_deadline_ms", DEFAULT_MEMORY_DEADLINE_MS)
+            )
+        except (TypeError, ValueError):
+            deadline_ms = DEFAULT_MEMORY_DEADLINE_MS
+        self.memory_prefetch = MemoryPrefetcher(self.memory, self.loop, deadline_ms)
+        self.memory_prefetch.refresh()
 
         # 获取记忆总结配置
         memory_config = self.config["Memory"]
@@ -756,11 +745,11 @@ class ConnectionHandler:
 
                 memory_llm_config = self.config["LLM"][memory_llm_name]
                 memory_llm_type = memory_llm_config.get("type", memory_llm_name)
-                memory_llm = llm_utils.create_instance(
-                    memory_llm_type, memory_llm_config
+                memory_llm = llm_utils.acquire_instance(
+                    memory_llm_type, memory_llm_config, self.provider_leases
                 )
                 self.logger.bind(tag=TAG).info(
-                    f"为记忆总结创建了专用LLM: {memory_llm_name}, 类型: {memory_llm_type}"
+                    f"为记忆总结获取了专用LLM: {memory_llm_name}, 类型: {memory_llm_type}"
                 )
                 self.memory.set_llm(memory_llm)
             else:
@@ -798,11 +787,11 @@ class ConnectionHandler:
 
                 intent_llm_config = self.config["LLM"][intent_llm_name]
                 intent_llm_type = intent_llm_config.get("type", intent_llm_name)
-                intent_llm = llm_utils.create_instance(
-                    intent_llm_type, intent_llm_config
+                intent_llm = llm_utils.acquire_instance(
+                    intent_llm_type, intent_llm_config, self.provider_leases
                 )
                 self.logger.bind(tag=TAG).info(
-                    f"为意图识别创建了专用LLM: {intent_llm_name}, 类型: {intent_llm_type}"
+                    f"为意图识别获取了专用LLM: {intent_llm_name}, 类型: {intent_llm_type}"
                 )
                 self.intent.set_llm(intent_llm)
             else:
@@ -829,6 +818,7 @@ class ConnectionHandler:
         # 为最顶层时新建会话ID和发送FIRST请求
         if depth == 0:
             self.sentence_id = str(uuid.uuid4().hex)
+            self.latency.set_sentence_id(self.sentence_id)
             self.dialogue.put(Message(role="user", content=query))
             self.tts.tts_text_queue.put(
                 TTSMessageDTO(
@@ -847,11 +837,12 @@ class ConnectionHandler:
         try:
             # 使用带记忆的对话
             memory_str = None
-            if self.memory is not None:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.memory.query_memory(query), self.loop
-                )
-                memory_str = future.result()
+            if self.memory_prefetch is not None:
+                self.latency.mark("memory_request")
+                memory_str = self.memory_prefetch.get(query)
+                self.latency.mark("memory_ready")
+            # LLM请求在记忆就绪之后发出，llm_first_token 不含记忆等待时间
+            self.latency.mark("llm_request")
 
             if self.intent_type == "function_call" and functions is not None:
                 # 使用支持functions的streaming接口
@@ -917,6 +908,7 @@ class ConnectionHandler:
 
             if content is not None and len(content) > 0:
                 if not tool_call_flag:
+                    self.latency.mark("llm_first_token")
                     response_message.append(content)
                     self.tts.tts_text_queue.put(
                         TTSMessageDTO(
@@ -1042,44 +1034,40 @@ class ConnectionHandler:
         else:
             pass
 
-    def _report_worker(self):
-        """聊天记录上报工作线程"""
-        while not self.stop_event.is_set():
-            try:
-                # 从队列获取数据，设置超时以便定期检查停止事件
-                item = self.report_queue.get(timeout=1)
-                if item is None:  # 检测毒丸对象
-                    break
-                try:
-                    # 检查线程池状态
-                    if self.executor is None:
-                        continue
-                    # 提交任务到线程池
-                    self.executor.submit(self._process_report, *item)
-                except Exception as e:
-                    self.logger.bind(tag=TAG).error(f"聊天记录上报线程异常: {e}")
-            except queue.Empty:
-                continue
-            except Exception as e:
-                self.logger.bind(tag=TAG).error(f"聊天记录上报工作线程异常: {e}")
+    def spawn_pipeline_task(self, coro_fn, *args):
+        """在事件循环上启动管线阶段任务，可从任意线程调用"""
 
-        self.logger.bind(tag=TAG).info("聊天记录上报线程已退出")
+        def _spawn():
+            if self.stop_event.is_set():
+                return
+            task = self.loop.create_task(coro_fn(*args))
+            self.pipeline_tasks.append(task)
 
-    def _process_report(self, type, text, audio_data, report_time):
-        """处理上报任务"""
         try:
-            # 执行上报（传入二进制数据）
-            report(self, type, text, audio_data, report_time)
-        except Exception as e:
-            self.logger.bind(tag=TAG).error(f"上报处理异常: {e}")
-        finally:
-            # 标记任务完成
-            self.report_queue.task_done()
+            if asyncio.get_running_loop() is self.loop:
+                _spawn()
+                return
+        except RuntimeError:
+            pass
+        self.loop.call_soon_threadsafe(_spawn)
 
     def clearSpeakStatus(self):
         self.client_is_speaking = False
         self.logger.bind(tag=TAG).info("Set speaking=False by clearSpeakStatus")
 
+    def release_providers(self):
+        """清理本会话在共享LLM实例上的状态，并释放从注册表获取的实例"""
+        instances = {id(llm): llm for llm in [self.llm, *self.provider_leases] if llm}
+        for llm in instances.values():
+            end_session = getattr(llm, "end_session", None)
+            if callable(end_session):
+                try:
+                    end_session(self.session_id)
+                except Exception as e:
+                    self.logger.bind(tag=TAG).warning(f"清理LLM会话状态失败: {e}")
+        if self.provider_leases:
+            get_provider_registry().release_all(self.provider_leases)
+
     async def close(self, ws=None):
         """资源清理方法"""
         try:
@@ -1105,6 +1093,18 @@ class ConnectionHandler:
             if self.stop_event:
                 self.stop_event.set()
 
+            self.latency.close()
+
+            # 释放共享的提供者实例（记忆保存线程会在保存完成后释放）
+            if not self.release_leases_after_save:
+                self.release_providers()
+
+            # 取消管线阶段任务
+            for task in self.pipeline_tasks:
+                if not task.done():
+                    task.cancel()
+            self.pipeline_tasks.clear()
+
             # 清空任务队列
             self.clear_queues()
 
@@ -1147,8 +1147,8 @@ class ConnectionHandler:
             if self.tts:
                 await self.tts.close()
 
-            # 最后关闭线程池（避免阻塞）
-            if self.executor:
+            # 最后关闭线程池（避免阻塞；共享线程池由进程持有，不在此关闭）
+            if self.executor and not is_shared_executor(self.executor):
                 try:
                     self.executor.shutdown(wait=False)
                 except Exception as executor_error:
@@ -1156,6 +1156,8 @@ class ConnectionHandler:
                         f"关闭线程池时出错: {executor_error}"
                     )
                 self.executor = None
+            self.chat_executor = None
+            self.init_executor = None
 
             self.logger.bind(tag=TAG).info("连接资源已释放")
         except Exception as e:
@@ -1176,7 +1178,6 @@ class ConnectionHandler:
             for q in [
                 self.tts.tts_text_queue,
                 self.tts.tts_audio_queue,
-                self.report_queue,
             ]:
                 if not q:
                     continue
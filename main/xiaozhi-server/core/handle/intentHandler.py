@@ -151,7 +151,7 @@ async def process_intent_result(conn, intent_result, original_text):
                             speak_txt(conn, text)
 
             # 将函数执行放在线程池中
-            conn.executor.submit(process_function_call)
+            conn.chat_executor.submit(process_function_call)
             return True
         return False
     except json.JSONDecodeError as e:
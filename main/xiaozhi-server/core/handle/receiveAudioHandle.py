@@ -152,6 +152,7 @@ async def handleAudioMessage(conn, audio):
         have_voice = False
         # 设置一个短暂延迟后恢复VAD检测
         conn.asr_audio.clear()
+        conn.opus_decode_stage.clear_utterance()
         if not hasattr(conn, "vad_resume_task") or conn.vad_resume_task.done():
             conn.vad_resume_task = asyncio.create_task(resume_vad_detection(conn))
         return
@@ -227,7 +228,13 @@ async def handleAudioMessage(conn, audio):
                 if getattr(conn, 'audio_format', 'opus') in ('pcm', 'pcm16', 's16'):
                     pcm = audio
                 else:
-                    if vad_api is not None and hasattr(vad_api, 'decoder'):
+                    stage = getattr(conn, 'opus_decode_stage', None)
+                    if stage is not None:
+                        try:
+                            pcm = stage.decode(audio)
+                        except Exception:
+                            pcm = None
+                    elif vad_api is not None and hasattr(vad_api, 'decoder'):
                         try:
                             pcm = vad_api.decoder.decode(audio, 960)
                         except Exception:
@@ -631,8 +638,14 @@ async def startToChat(conn, text):
     if conn.client_is_speaking:
         await handleAbortMessage(conn)
 
+    # 记忆查询与意图分析并行进行，chat中最多等待记忆查询deadline
+    if getattr(conn, "memory_prefetch", None) is not None:
+        conn.memory_prefetch.prefetch(actual_text)
+
     # 首先进行意图分析，使用实际文本内容
+    conn.latency.mark("intent_start")
     intent_handled = await handle_user_intent(conn, actual_text)
+    conn.latency.mark("intent_done")
 
     if intent_handled:
         # 如果意图已被处理，不再进行聊天
@@ -640,7 +653,7 @@ async def startToChat(conn, text):
 
     # 意图未被处理，继续常规聊天流程，使用实际文本内容
     await send_stt_message(conn, actual_text)
-    conn.executor.submit(conn.chat, actual_text)
+    conn.chat_executor.submit(conn.chat, actual_text)
 
 
 async def no_voice_close_connect(conn, have_voice):
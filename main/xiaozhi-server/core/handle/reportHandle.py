@@ -1,21 +1,22 @@
 """
-TTS上报功能已集成到ConnectionHandler类中。
+ASR/TTS聊天记录上报
 
 上报功能包括：
-1. 每个连接对象拥有自己的上报队列和处理线程
-2. 上报线程的生命周期与连接对象绑定
-3. 使用ConnectionHandler.enqueue_tts_report方法进行上报
-
-具体实现请参考core/connection.py中的相关代码。
+1. 所有连接共享进程级上报服务（core/utils/report_service.py）
+2. 上报服务按条数和时间批量异步发送，过载时优先丢弃音频
+3. 使用 enqueue_tts_report / enqueue_asr_report 提交上报记录
 """
 
 import time
 
 import opuslib_next
 
+from config.logger import setup_logging
 from config.manage_api_client import report as manage_report
+from core.utils.report_service import get_report_service
 
 TAG = __name__
+logger = setup_logging()
 
 
 def report(conn, type, text, opus_data, report_time):
@@ -50,7 +51,7 @@ def opus_to_wav(conn, opus_data):
     """将Opus数据转换为WAV格式的字节流
 
     Args:
-        output_dir: 输出目录（保留参数以保持接口兼容）
+        conn: 连接对象（仅用于日志，可以为 None）
         opus_data: opus音频数据
 
     Returns:
@@ -64,7 +65,9 @@ def opus_to_wav(conn, opus_data):
             pcm_frame = decoder.decode(opus_packet, 960)  # 960 samples = 60ms
             pcm_data.append(pcm_frame)
         except opuslib_next.OpusError as e:
-            conn.logger.bind(tag=TAG).error(f"Opus解码错误: {e}", exc_info=True)
+            (conn.logger if conn else logger).bind(tag=TAG).error(
+                f"Opus解码错误: {e}", exc_info=True
+            )
 
     if not pcm_data:
         raise ValueError("没有有效的PCM数据")
@@ -106,14 +109,14 @@ def enqueue_tts_report(conn, text, opus_data):
         opus_data: opus音频数据
     """
     try:
-        # 使用连接对象的队列，传入文本和二进制数据而非文件路径
+        # 提交到进程级上报服务，传入文本和二进制数据而非文件路径
         if conn.chat_history_conf == 2:
-            conn.report_queue.put((2, text, opus_data, int(time.time())))
+            _submit_report(conn, 2, text, opus_data)
             conn.logger.bind(tag=TAG).debug(
                 f"TTS数据已加入上报队列: {conn.device_id}, 音频大小: {len(opus_data)} "
             )
         else:
-            conn.report_queue.put((2, text, None, int(time.time())))
+            _submit_report(conn, 2, text, None)
             conn.logger.bind(tag=TAG).debug(
                 f"TTS数据已加入上报队列: {conn.device_id}, 不上报音频"
             )
@@ -134,16 +137,27 @@ def enqueue_asr_report(conn, text, opus_data):
         opus_data: opus音频数据
     """
     try:
-        # 使用连接对象的队列，传入文本和二进制数据而非文件路径
+        # 提交到进程级上报服务，传入文本和二进制数据而非文件路径
         if conn.chat_history_conf == 2:
-            conn.report_queue.put((1, text, opus_data, int(time.time())))
+            _submit_report(conn, 1, text, opus_data)
             conn.logger.bind(tag=TAG).debug(
                 f"ASR数据已加入上报队列: {conn.device_id}, 音频大小: {len(opus_data)} "
             )
         else:
-            conn.report_queue.put((1, text, None, int(time.time())))
+            _submit_report(conn, 1, text, None)
             conn.logger.bind(tag=TAG).debug(
                 f"ASR数据已加入上报队列: {conn.device_id}, 不上报音频"
             )
     except Exception as e:
         conn.logger.bind(tag=TAG).debug(f"加入ASR上报队列失败: {text}, {e}")
+
+
+def _submit_report(conn, type, text, opus_data):
+    """提交到进程级上报服务；服务不可用时退回同步上报"""
+    service = get_report_service(conn.config)
+    if service is not None:
+        service.submit(
+            conn.device_id, conn.session_id, type, text, opus_data, int(time.time())
+        )
+    else:
+        report(conn, type, text, opus_data, int(time.time()))
@@ -43,6 +43,7 @@ async def sendAudio(conn, audios):
         try:
             if hasattr(conn, 'websocket') and conn.websocket:
                 await conn.websocket.send(audios)
+                conn.latency.frame_sent()
                 logger.bind(tag=TAG).info(f"※ここだよ！ WebSocket音声送信完了 bytes={len(audios)}")
             else:
                 logger.bind(tag=TAG).error(f"※ここだよ！ WebSocket未接続: conn.websocket={getattr(conn, 'websocket', None)}")
@@ -92,6 +93,23 @@ async def send_tts_message(conn, state, text=None):
     await conn.websocket.send(json.dumps(message))
 
 
+async def send_stt_partial_message(conn, text):
+    """发送识别中间结果（流式ASR），不改变说话状态"""
+    stt_text = textUtils.get_string_no_punctuation_or_emoji(text)
+    if not stt_text:
+        return
+    await conn.websocket.send(
+        json.dumps(
+            {
+                "type": "stt",
+                "state": "partial",
+                "text": stt_text,
+                "session_id": conn.session_id,
+            }
+        )
+    )
+
+
 async def send_stt_message(conn, text):
     """发送 STT 状态消息"""
     end_prompt_str = conn.config.get("end_prompt", {}).get("prompt")
@@ -57,6 +57,7 @@ async def handleTextMessage(conn, message):
                 conn.client_voice_stop = False
                 try:
                     conn.asr_audio.clear()
+                    conn.opus_decode_stage.clear_utterance()
                 except Exception:
                     pass
                 # Clear VAD-related buffers/windows
@@ -96,6 +97,7 @@ async def handleTextMessage(conn, message):
             elif msg_json["state"] == "detect":
                 conn.client_have_voice = False
                 conn.asr_audio.clear()
+                conn.opus_decode_stage.clear_utterance()
                 if "text" in msg_json:
                     conn.last_activity_time = time.time() * 1000
                     original_text = msg_json["text"]  # 保留原始文本
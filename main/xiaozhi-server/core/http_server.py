@@ -1,3 +1,4 @@
+import hmac
 import asyncio
 from aiohttp import web, WSMsgType
 from config.logger import setup_logging
@@ -7,6 +8,7 @@ from core.connection import ConnectionHandler
 from core.handle.receiveAudioHandle import handleAudioMessage
 from core.utils.modules_initialize import initialize_modules
 from config.runtime_flags import flags
+from config.config_loader import invalidate_private_config
 import os
 import time
 
@@ -82,6 +84,34 @@ class SimpleHttpServer:
                 ]
             )
 
+            if read_config_from_api:
+                # 智控台修改设备配置后调用，使缓存的私有配置失效
+                # body: {"device_id": "..."}，不传device_id时全部失效
+                async def invalidate_private_config_handler(request: web.Request):
+                    secret = (self.config.get("manager-api") or {}).get("secret", "")
+                    auth_header = request.headers.get("Authorization", "")
+                    if not secret or not hmac.compare_digest(
+                        auth_header, f"Bearer {secret}"
+                    ):
+                        return web.json_response({"error": "unauthorized"}, status=401)
+                    try:
+                        body = await request.json() if request.can_read_body else {}
+                    except Exception:
+                        body = {}
+                    device_id = (body or {}).get("device_id") or request.query.get(
+                        "device_id"
+                    )
+                    count = invalidate_private_config(device_id)
+                    return web.json_response({"invalidated": count})
+
+                app.add_routes(
+                    [
+                        web.post(
+                            "/api/config/invalidate", invalidate_private_config_handler
+                        )
+                    ]
+                )
+
             # ランタイムデバッグ用トグル（再デプロイ不要）
             async def toggle_vad_force(request: web.Request):
                 on = request.query.get("on", "")
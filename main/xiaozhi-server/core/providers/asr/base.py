@@ -7,7 +7,6 @@ import traceback
 import threading
 import opuslib_next
 import json
-import io
 import time
 import concurrent.futures
 from abc import ABC, abstractmethod
@@ -16,6 +15,7 @@ from typing import Optional, Tuple, List, Dict, Any
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
 from core.utils.util import remove_punctuation_and_length
+from core.utils.utterance_buffer import UtteranceBuffer
 from core.handle.receiveAudioHandle import handleAudioMessage
 
 TAG = __name__
@@ -28,11 +28,26 @@ class ASRProviderBase(ABC):
 
     # 打开音频通道
     async def open_audio_channels(self, conn):
+        if getattr(conn, "async_pipeline", False):
+            # asyncio管线模式：ASR阶段作为事件循环任务运行
+            conn.spawn_pipeline_task(self.asr_text_priority_task, conn)
+            return
         conn.asr_priority_thread = threading.Thread(
             target=self.asr_text_priority_thread, args=(conn,), daemon=True
         )
         conn.asr_priority_thread.start()
 
+    # 有序处理ASR音频（asyncio管线模式）
+    async def asr_text_priority_task(self, conn):
+        while not conn.stop_event.is_set():
+            message = await conn.asr_audio_queue.get()
+            try:
+                await handleAudioMessage(conn, message)
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理ASR文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+
     # 有序处理ASR音频
     def asr_text_priority_thread(self, conn):
         while not conn.stop_event.is_set():
@@ -75,11 +90,7 @@ class ASRProviderBase(ABC):
         # ASR ingress visibility: only log when we actually have voice
         try:
             if audio_have_voice_flag:
-                est_pcm = 0
-                if conn.audio_format == "pcm":
-                    est_pcm = sum(len(x) for x in conn.asr_audio) if getattr(conn, 'asr_audio', None) is not None else 0
-                else:
-                    est_pcm = len(getattr(conn, 'asr_audio', [])) * 1920
+                est_pcm = conn.opus_decode_stage.utterance_bytes
                 logger.bind(tag=TAG).info(f"[ASR_IN] hv=True pcm_bytes={est_pcm} sr=16000 ch=1 utt={getattr(conn,'utt_seq',0)}")
         except Exception:
             pass
@@ -119,12 +130,15 @@ class ASRProviderBase(ABC):
                 else:
                     pcm_bytes = audio
                 conn.asr_audio.append(pcm_bytes)
+                if conn.audio_format != "pcm":
+                    # 复用VAD阶段已解码的PCM，flush时无需再次解码
+                    conn.opus_decode_stage.append_utterance(pcm_bytes)
+                else:
+                    conn.opus_decode_stage.append_pcm(pcm_bytes)
+                await self.on_utterance_audio(conn)
             # Per-chunk trace: size, have_voice flag, asr_audio length and estimated PCM
             try:
-                if conn.audio_format == "pcm":
-                    total_len_estimated_now = sum(len(x) for x in conn.asr_audio)
-                else:
-                    total_len_estimated_now = len(conn.asr_audio) * 1920
+                total_len_estimated_now = conn.opus_decode_stage.utterance_bytes
                 if audio_trace:
                     logger.bind(tag=TAG).info(
                         f"[AUDIO_TRACE] UTT#{getattr(conn,'utt_seq',0)} recv_chunk size={len(audio)} have_voice={audio_have_voice} client_have_voice={getattr(conn,'client_have_voice',False)} asr_audio_frames={len(conn.asr_audio)} est_pcm={total_len_estimated_now}"
@@ -175,13 +189,8 @@ class ASRProviderBase(ABC):
             except Exception:
                 min_pcm_bytes = 12000
 
-            if conn.audio_format == "pcm":
-                # actual PCM bytes stored
-                total_len_estimated = sum(len(x) for x in conn.asr_audio)
-            else:
-                # conn.asr_audio holds Opus frames; estimate PCM bytes the same way
-                # as the per-chunk trace (frames * 1920)
-                total_len_estimated = len(conn.asr_audio) * 1920
+            # 语句缓冲中实际的PCM字节数（O(1)）
+            total_len_estimated = conn.opus_decode_stage.utterance_bytes
 
             if total_len_estimated < min_pcm_bytes:
                 if audio_trace:
@@ -205,25 +214,37 @@ class ASRProviderBase(ABC):
             # Proceed with normal flush
             asr_audio_task = conn.asr_audio.copy()
             conn.asr_audio.clear()
+            utterance = conn.opus_decode_stage.take_utterance(asr_audio_task)
             conn.reset_vad_states()
 
             if len(asr_audio_task) > 0:
-                await self.handle_voice_stop(conn, asr_audio_task)
+                await self.handle_voice_stop(conn, asr_audio_task, utterance)
             conn.client_voice_stop = False
 
     # 处理语音停止
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
-        """并行处理ASR和声纹识别"""
+    async def handle_voice_stop(
+        self, conn, asr_audio_task: List[bytes], utterance: Optional[UtteranceBuffer] = None
+    ):
+        """并行处理ASR和声纹识别
+
+        Args:
+            asr_audio_task: 本句的音频帧（Opus或PCM，取决于conn.audio_format）
+            utterance: 接收阶段已写好的语句PCM缓冲，提供时不再重复解码和拼接
+        """
         try:
             total_start_time = time.monotonic()
+            conn.latency.begin(
+                getattr(conn, "utt_seq", 0), getattr(conn, "last_voice_ms", None)
+            )
             
-            # 准备音频数据
-            if conn.audio_format == "pcm":
-                pcm_data = asr_audio_task
-            else:
-                pcm_data = self.decode_opus(asr_audio_task)
-            
-            combined_pcm_data = b"".join(pcm_data)
+            # 准备音频数据：ASR、声纹识别和保存文件共用同一块缓冲
+            if utterance is None:
+                if conn.audio_format == "pcm":
+                    utterance = UtteranceBuffer.from_chunks(asr_audio_task)
+                else:
+                    utterance = UtteranceBuffer.from_chunks(self.decode_opus(asr_audio_task))
+            combined_pcm_data = utterance.pcm_view()
+            pcm_data = [combined_pcm_data]
             try:
                 stop_cause = getattr(conn, "_stop_cause", None)
                 logger.bind(tag=TAG).info(
@@ -242,8 +263,8 @@ class ASRProviderBase(ABC):
             # 预先准备WAV数据
             wav_data = None
             # 使用连接的声纹识别提供者
-            if conn.voiceprint_provider and combined_pcm_data:
-                wav_data = self._pcm_to_wav(combined_pcm_data)
+            if conn.voiceprint_provider and len(combined_pcm_data):
+                wav_data = utterance.wav_view()
             
             
             # 定义ASR任务
@@ -260,11 +281,7 @@ class ASRProviderBase(ABC):
                             )
                         except Exception:
                             min_pcm_bytes = 12000
-                        if conn.audio_format == "pcm":
-                            total_len = sum(len(x) for x in asr_audio_task)
-                        else:
-                            # 粗い推定：Opus→PCMの目安（各フレームを960サンプル相当として計算）
-                            total_len = len(asr_audio_task) * 1920  # 16-bit mono 960 samples
+                        total_len = len(utterance)
                         # デバッグ: ASR送信判断値 (※ここを送って※ を送ってください)
                         try:
                             logger.bind(tag=TAG).info(
@@ -283,9 +300,12 @@ class ASRProviderBase(ABC):
                             )
                             return ("", None)
 
+                        # 已解码的PCM直接交给识别，避免provider内部再次解码Opus
+                        conn.latency.mark("asr_request")
                         result = loop.run_until_complete(
-                            self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
+                            self.speech_to_text(pcm_data, conn.session_id, "pcm")
                         )
+                        conn.latency.mark("asr_response")
                         end_time = time.monotonic()
                         logger.bind(tag=TAG).info(f"ASR耗时: {end_time - start_time:.3f}s")
                         try:
@@ -456,6 +476,8 @@ class ASRProviderBase(ABC):
                                                     asyncio.set_event_loop(loop)
                                                     loop.run_until_complete(conn.memory.save_memory([enhanced_text]))
                                                     loop.close()
+                                                    if getattr(conn, 'memory_prefetch', None) is not None:
+                                                        conn.memory_prefetch.refresh()
                                                 except Exception:
                                                     pass
 
@@ -478,6 +500,9 @@ class ASRProviderBase(ABC):
                                 asyncio.set_event_loop(loop)
                                 loop.run_until_complete(conn.memory.save_memory([enhanced_text]))
                                 loop.close()
+                                # 记忆更新后在后台刷新快照
+                                if getattr(conn, 'memory_prefetch', None) is not None:
+                                    conn.memory_prefetch.refresh()
                             except Exception:
                                 pass
 
@@ -500,36 +525,6 @@ class ASRProviderBase(ABC):
         else:
             return text
 
-    def _pcm_to_wav(self, pcm_data: bytes) -> bytes:
-        """将PCM数据转换为WAV格式"""
-        if len(pcm_data) == 0:
-            logger.bind(tag=TAG).warning("PCM数据为空，无法转换WAV")
-            return b""
-        
-        # 确保数据长度是偶数（16位音频）
-        if len(pcm_data) % 2 != 0:
-            pcm_data = pcm_data[:-1]
-        
-        # 创建WAV文件头
-        wav_buffer = io.BytesIO()
-        try:
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)      # 单声道
-                wav_file.setsampwidth(2)      # 16位
-                wav_file.setframerate(16000)  # 16kHz采样率
-                wav_file.writeframes(pcm_data)
-            
-            wav_buffer.seek(0)
-            wav_data = wav_buffer.read()
-            
-            return wav_data
-        except Exception as e:
-            logger.bind(tag=TAG).error(f"WAV转换失败: {e}")
-            return b""
-
-    def stop_ws_connection(self):
-        pass
-
     def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
         """PCM数据保存为WAV文件"""
         module_name = __name__.split(".")[-1]
@@ -540,10 +535,19 @@ class ASRProviderBase(ABC):
             wf.setnchannels(1)
             wf.setsampwidth(2)  # 2 bytes = 16-bit
             wf.setframerate(16000)
-            wf.writeframes(b"".join(pcm_data))
+            # 语句缓冲只有一个数据块（memoryview）时直接写入，避免拼接复制
+            wf.writeframes(pcm_data[0] if len(pcm_data) == 1 else b"".join(pcm_data))
 
         return file_path
 
+    async def on_utterance_audio(self, conn):
+        """语句缓冲（conn.opus_decode_stage.utterance）写入新音频后调用，支持流式解码的provider可在此增量识别"""
+        pass
+
+    def stop_ws_connection(self):
+        """一句话识别结束后调用，使用长连接的provider可在此关闭连接"""
+        pass
+
     @abstractmethod
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
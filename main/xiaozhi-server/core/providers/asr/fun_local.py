@@ -1,5 +1,6 @@
 import time
 import os
+import asyncio
 import sys
 import io
 import psutil
@@ -9,7 +10,9 @@ from core.providers.asr.base import ASRProviderBase
 from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 import shutil
+from functools import partial
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.asr_batcher import get_asr_batcher
 
 TAG = __name__
 logger = setup_logging()
@@ -35,6 +38,29 @@ class CaptureOutput:
             logger.bind(tag=TAG).info(self.output.strip())
 
 
+def _load_model(model_dir: str) -> AutoModel:
+    with CaptureOutput():
+        return AutoModel(
+            model=model_dir,
+            vad_kwargs={"max_single_segment_time": 30000},
+            disable_update=True,
+            hub="hf",
+            # device="cuda:0",  # 启用GPU加速
+        )
+
+
+def _generate_batch(model: AutoModel, pcm_list: List[bytes]) -> List[str]:
+    """在推理线程中对一批PCM音频调用模型批量接口"""
+    results = model.generate(
+        input=pcm_list,
+        cache={},
+        language="auto",
+        use_itn=True,
+        batch_size=len(pcm_list),
+    )
+    return [rich_transcription_postprocess(result["text"]) for result in results]
+
+
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
@@ -52,14 +78,18 @@ class ASRProvider(ASRProviderBase):
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
-        with CaptureOutput():
-            self.model = AutoModel(
-                model=self.model_dir,
-                vad_kwargs={"max_single_segment_time": 30000},
-                disable_update=True,
-                hub="hf",
-                # device="cuda:0",  # 启用GPU加速
-            )
+        # 模型和推理线程按模型目录进程级共享，所有连接的识别请求由同一个推理线程合批处理
+        self.batcher = get_asr_batcher(
+            "fun_local",
+            ("fun_local", os.path.abspath(self.model_dir)),
+            partial(_load_model, self.model_dir),
+            _generate_batch,
+            max_batch_size=config.get("batch_max_size", 8),
+            max_wait_ms=config.get("batch_max_wait_ms", 20),
+            # 整段识别无副作用，整批失败时可逐条重试
+            retry_individually=True,
+        )
+        self.model = self.batcher.model
 
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
@@ -92,14 +122,9 @@ class ASRProvider(ASRProviderBase):
 
                 # 语音识别
                 start_time = time.time()
-                result = self.model.generate(
-                    input=combined_pcm_data,
-                    cache={},
-                    language="auto",
-                    use_itn=True,
-                    batch_size_s=60,
+                text = await asyncio.wrap_future(
+                    self.batcher.submit(combined_pcm_data)
                 )
-                text = rich_transcription_postprocess(result[0]["text"])
                 logger.bind(tag=TAG).debug(
                     f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
                 )
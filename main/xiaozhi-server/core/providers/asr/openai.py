@@ -4,8 +4,8 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
-
-import requests
+from core.utils.async_http import get_async_http_client
+from core.utils.utterance_buffer import UtteranceBuffer
 
 TAG = __name__
 logger = setup_logging()
@@ -21,9 +21,33 @@ class ASRProvider(ASRProviderBase):
         self.model = config.get("model_name")        
         self.output_dir = config.get("output_dir")
         self.delete_audio_file = delete_audio_file
+        # 上传格式：wav（默认）或 ogg（Opus编码，体积约为WAV的1/10）
+        self.upload_format = str(config.get("upload_format", "wav")).lower()
+        self.opus_bitrate = int(config.get("opus_bitrate", 24000))
+        self.timeout = float(config.get("timeout", 30))
+
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+        }
+        # Support project/organization headers for sk-proj keys
+        project_id = os.getenv("OPENAI_PROJECT", "").strip()
+        if project_id:
+            self.headers["OpenAI-Project"] = project_id
+        org_id = os.getenv("OPENAI_ORG", "").strip()
+        if org_id:
+            self.headers["OpenAI-Organization"] = org_id
 
         os.makedirs(self.output_dir, exist_ok=True)
 
+    def _build_upload(self, pcm_data: List[bytes]) -> Tuple[str, bytes, str]:
+        """在内存中生成上传文件（文件名, 内容, MIME类型）"""
+        if self.upload_format == "ogg":
+            from core.utils.ogg_opus import encode_pcm_to_ogg_opus
+
+            pcm = pcm_data[0] if len(pcm_data) == 1 else b"".join(pcm_data)
+            return "audio.ogg", encode_pcm_to_ogg_opus(pcm, self.opus_bitrate), "audio/ogg"
+        return "audio.wav", bytes(UtteranceBuffer.from_chunks(pcm_data).wav_view()), "audio/wav"
+
     async def speech_to_text(self, opus_data: List[bytes], session_id: str, audio_format="opus") -> Tuple[Optional[str], Optional[str]]:
         file_path = None
         try:
@@ -32,24 +56,16 @@ class ASRProvider(ASRProviderBase):
                 pcm_data = opus_data
             else:
                 pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
+            # 只有需要保留音频时才写文件，上传内容直接在内存中生成
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(pcm_data, session_id)
+                logger.bind(tag=TAG).info(f"file path: {file_path}")
 
+            file_name, content, content_type = self._build_upload(pcm_data)
             logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
+                f"上传音频准备耗时: {time.time() - start_time:.3f}s | 格式: {self.upload_format} | 大小: {len(content)}"
             )
 
-            logger.bind(tag=TAG).info(f"file path: {file_path}")
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-            }
-            # Support project/organization headers for sk-proj keys
-            project_id = os.getenv("OPENAI_PROJECT", "").strip()
-            if project_id:
-                headers["OpenAI-Project"] = project_id
-            org_id = os.getenv("OPENAI_ORG", "").strip()
-            if org_id:
-                headers["OpenAI-Organization"] = org_id
-            
             # 使用data参数传递模型名称（固定日本語）
             data = {
                 "model": self.model,
@@ -57,24 +73,20 @@ class ASRProvider(ASRProviderBase):
                 "temperature": 0,
             }
 
-
-            with open(file_path, "rb") as audio_file:  # 使用with语句确保文件关闭
-                files = {
-                    "file": audio_file
-                }
-
-                start_time = time.time()
-                response = requests.post(
-                    self.api_url,
-                    files=files,
-                    data=data,
-                    headers=headers
-                )
-                elapsed = time.time() - start_time
-                body_preview = response.text[:300] if isinstance(response.text, str) else str(response.text)[:300]
-                logger.bind(tag=TAG).info(
-                    f"ASR HTTP {response.status_code} in {elapsed:.3f}s | preview={body_preview}"
-                )
+            start_time = time.time()
+            response = await get_async_http_client().post(
+                self.api_url,
+                body_size=len(content),
+                files={"file": (file_name, content, content_type)},
+                data=data,
+                headers=self.headers,
+                timeout=self.timeout,
+            )
+            elapsed = time.time() - start_time
+            body_preview = response.text[:300]
+            logger.bind(tag=TAG).info(
+                f"ASR HTTP {response.status_code} in {elapsed:.3f}s | preview={body_preview}"
+            )
 
             if response.status_code == 200:
                 text = response.json().get("text", "")
@@ -86,12 +98,3 @@ class ASRProvider(ASRProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"语音识别失败: {e}")
             return "", None
-        finally:
-            # 文件清理逻辑
-            if self.delete_audio_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
-        
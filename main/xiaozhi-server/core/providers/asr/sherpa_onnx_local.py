@@ -1,12 +1,17 @@
 import time
 import wave
+import asyncio
 import os
 import sys
 import io
+import weakref
+from functools import partial
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.utils.asr_batcher import get_asr_batcher
+from core.handle.sendAudioHandle import send_stt_partial_message
 
 import numpy as np
 import sherpa_onnx
@@ -17,6 +22,10 @@ import requests
 TAG = __name__
 logger = setup_logging()
 
+SAMPLE_RATE = 16000
+# 流式模型在语句结束时补的静音，用于冲出模型右侧上下文中尚未输出的尾字
+TAIL_PADDING_SECONDS = 0.5
+
 
 # 捕获标准输出
 class CaptureOutput:
@@ -47,6 +56,12 @@ class ASRProvider(ASRProviderBase):
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # 流式模式：边收音频边解码，向设备推送识别中间结果，断句时只需解码剩余的几帧
+        self.streaming = bool(config.get("streaming", False))
+        if self.streaming:
+            self._init_streaming(config)
+            return
+
         # 初始化模型文件路径
         model_files = {
             "model.int8.onnx": os.path.join(self.model_dir, "model.int8.onnx"),
@@ -86,28 +101,114 @@ class ASRProvider(ASRProviderBase):
             logger.bind(tag=TAG).error(f"模型文件处理失败: {str(e)}")
             raise
 
-        with CaptureOutput():
-            if self.model_type == "paraformer":
-                self.model = sherpa_onnx.OfflineRecognizer.from_paraformer(
-                    paraformer=self.model_path,
-                    tokens=self.tokens_path,
-                    num_threads=2,
-                    sample_rate=16000,
-                    feature_dim=80,
-                    decoding_method="greedy_search",
-                    debug=False,
-                )
-            else:  # sense_voice
-                self.model = sherpa_onnx.OfflineRecognizer.from_sense_voice(
-                    model=self.model_path,
-                    tokens=self.tokens_path,
-                    num_threads=2,
-                    sample_rate=16000,
-                    feature_dim=80,
-                    decoding_method="greedy_search",
-                    debug=False,
-                    use_itn=True,
-                )
+        # 模型和推理线程按模型文件进程级共享，所有连接的识别请求由同一个推理线程合批处理
+        self.batcher = get_asr_batcher(
+            "sherpa_onnx_local",
+            ("sherpa_onnx_local", self.model_type, os.path.abspath(self.model_path)),
+            partial(_load_offline_model, self.model_type, self.model_path, self.tokens_path),
+            _decode_batch,
+            max_batch_size=config.get("batch_max_size", 8),
+            max_wait_ms=config.get("batch_max_wait_ms", 20),
+            # 整段识别无副作用，整批失败时可逐条重试
+            retry_individually=True,
+        )
+        self.model = self.batcher.model
+
+    def _init_streaming(self, config: dict):
+        """加载 OnlineRecognizer（transducer / paraformer 流式模型，需预先放在 streaming_model_dir）"""
+        model_dir = config.get("streaming_model_dir") or self.model_dir
+        model_type = config.get("streaming_model_type", "transducer")
+        self.partial_interval = float(config.get("partial_interval_ms", 200)) / 1000
+
+        def model_file(key: str, default: str) -> str:
+            path = os.path.join(model_dir, config.get(key, default))
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"流式模型文件不存在: {path}")
+            return path
+
+        files = {
+            "tokens": model_file("tokens", "tokens.txt"),
+            "encoder": model_file("encoder", "encoder.int8.onnx"),
+            "decoder": model_file(
+                "decoder", "decoder.int8.onnx" if model_type == "paraformer" else "decoder.onnx"
+            ),
+        }
+        if model_type != "paraformer":
+            files["joiner"] = model_file("joiner", "joiner.int8.onnx")
+
+        # 各连接的流共用一个推理线程：同一批中所有就绪的流一次 decode_streams
+        # 解码会修改流状态，整批失败时不逐条重试（会重复送入音频），各请求直接失败
+        self.batcher = get_asr_batcher(
+            "sherpa_onnx_online",
+            ("sherpa_onnx_online", model_type, tuple(sorted(files.items()))),
+            partial(_load_online_model, model_type, files),
+            _decode_online_batch,
+            max_batch_size=config.get("batch_max_size", 8),
+            max_wait_ms=config.get("batch_max_wait_ms", 20),
+        )
+        self.online_model = self.batcher.model
+        # session_id -> 当前语句的流状态（状态由连接持有，连接释放后自动移除）
+        self._online_states: "weakref.WeakValueDictionary[str, _OnlineState]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    async def on_utterance_audio(self, conn):
+        """把语句缓冲中新增的PCM送入该连接的流，并按间隔推送中间结果"""
+        if not self.streaming:
+            return
+        utterance = conn.opus_decode_stage.utterance
+        state = getattr(conn, "asr_online_state", None)
+        # 语句缓冲被取走或清空后开始新的流
+        # 上次解码失败（流状态不可信）时也重新开始，新流从语句开头送入
+        if (
+            state is None
+            or state.finished
+            or state.buffer is not utterance
+            or len(utterance) < state.fed
+        ):
+            if state is not None:
+                state.finished = True
+            state = _OnlineState(self.online_model.create_stream(), utterance)
+            conn.asr_online_state = state
+            self._online_states[conn.session_id] = state
+        if len(utterance) == state.fed:
+            return
+
+        # 转换时已复制数据，视图随即释放，不影响语句缓冲继续追加
+        with utterance.pcm_view() as view:
+            samples = _to_float32(view[state.fed :])
+            state.fed = len(view)
+        future = self.batcher.submit((state.stream, samples, False))
+
+        def on_partial(f):
+            if f.cancelled() or state.finished:
+                return
+            if f.exception() is not None:
+                # 流已部分送入音频，不能重试；放弃该流，断句时用整段音频重新识别
+                state.finished = True
+                return
+            text = f.result()
+            now = time.monotonic()
+            if not text or text == state.partial or now - state.sent_at < self.partial_interval:
+                return
+            state.partial, state.sent_at = text, now
+            asyncio.run_coroutine_threadsafe(
+                send_stt_partial_message(conn, text), conn.loop
+            )
+
+        future.add_done_callback(on_partial)
+
+    async def _finalize_online(self, pcm: bytes, session_id: str) -> str:
+        """断句时结束该会话的流，只需解码尚未送入的音频和尾部补白"""
+        state = self._online_states.pop(session_id, None)
+        if state is None or state.finished or state.fed > len(pcm):
+            # 没有对齐的流（如非接收路径提交的音频）时用整段音频新建流
+            state = _OnlineState(self.online_model.create_stream(), None)
+        state.finished = True
+        remaining = _to_float32(pcm[state.fed :])
+        return await asyncio.wrap_future(
+            self.batcher.submit((state.stream, remaining, True))
+        )
 
     def read_wave(self, wave_filename: str) -> Tuple[np.ndarray, int]:
         """
@@ -139,25 +240,27 @@ class ASRProvider(ASRProviderBase):
         """语音转文本主处理逻辑"""
         file_path = None
         try:
-            # 保存音频文件
             start_time = time.time()
             if audio_format == "pcm":
                 pcm_data = opus_data
             else:
                 pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-            # 保持原有静默，避免过多日志
-            logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
-            )
+            # 只有需要保留音频时才写文件，识别直接使用内存中的PCM
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(pcm_data, session_id)
+                logger.bind(tag=TAG).debug(
+                    f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
+                )
 
             # 语音识别
             start_time = time.time()
-            s = self.model.create_stream()
-            samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            pcm = b"".join(pcm_data)
+            if self.streaming:
+                text = await self._finalize_online(pcm, session_id)
+            else:
+                text = await asyncio.wrap_future(
+                    self.batcher.submit(_to_float32(pcm))
+                )
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
@@ -175,3 +278,107 @@ class ASRProvider(ASRProviderBase):
                     logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
+
+
+class _OnlineState:
+    """一个连接当前语句的流式识别状态"""
+
+    __slots__ = ("stream", "buffer", "fed", "partial", "sent_at", "finished", "__weakref__")
+
+    def __init__(self, stream, buffer):
+        self.stream = stream
+        # 对应的语句缓冲及已送入流的字节数
+        self.buffer = buffer
+        self.fed = 0
+        self.partial = ""
+        self.sent_at = 0.0
+        self.finished = False
+
+
+def _to_float32(pcm) -> np.ndarray:
+    """16位PCM转为 [-1, 1] 的float32采样"""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+
+
+def _load_offline_model(model_type: str, model_path: str, tokens_path: str):
+    with CaptureOutput():
+        if model_type == "paraformer":
+            return sherpa_onnx.OfflineRecognizer.from_paraformer(
+                paraformer=model_path,
+                tokens=tokens_path,
+                num_threads=2,
+                sample_rate=16000,
+                feature_dim=80,
+                decoding_method="greedy_search",
+                debug=False,
+            )
+        # sense_voice
+        return sherpa_onnx.OfflineRecognizer.from_sense_voice(
+            model=model_path,
+            tokens=tokens_path,
+            num_threads=2,
+            sample_rate=16000,
+            feature_dim=80,
+            decoding_method="greedy_search",
+            debug=False,
+            use_itn=True,
+        )
+
+
+def _decode_batch(model, samples_list: List[np.ndarray]) -> List[str]:
+    """在推理线程中用 decode_streams 一次解码一批音频"""
+    streams = []
+    for samples in samples_list:
+        s = model.create_stream()
+        s.accept_waveform(16000, samples)
+        streams.append(s)
+    model.decode_streams(streams)
+    return [s.result.text for s in streams]
+
+
+def _load_online_model(model_type: str, files: dict):
+    """加载 OnlineRecognizer（transducer / paraformer 流式模型）"""
+    with CaptureOutput():
+        if model_type == "paraformer":
+            return sherpa_onnx.OnlineRecognizer.from_paraformer(
+                num_threads=2,
+                sample_rate=SAMPLE_RATE,
+                feature_dim=80,
+                enable_endpoint_detection=False,
+                decoding_method="greedy_search",
+                **files,
+            )
+        # transducer（zipformer 等）
+        return sherpa_onnx.OnlineRecognizer.from_transducer(
+            num_threads=2,
+            sample_rate=SAMPLE_RATE,
+            feature_dim=80,
+            enable_endpoint_detection=False,
+            decoding_method="greedy_search",
+            **files,
+        )
+
+
+def _decode_online_batch(recognizer, items: List[Tuple]) -> List[str]:
+    """
+    在推理线程中处理一批流式请求，流的所有操作都只在该线程中进行
+    items: (流, 新增采样, 是否结束)，按入队顺序处理
+    """
+    streams = []
+    for stream, samples, final in items:
+        if samples is not None and len(samples):
+            stream.accept_waveform(SAMPLE_RATE, samples)
+        if final:
+            stream.accept_waveform(
+                SAMPLE_RATE,
+                np.zeros(int(TAIL_PADDING_SECONDS * SAMPLE_RATE), dtype=np.float32),
+            )
+            stream.input_finished()
+        if all(stream is not s for s in streams):
+            streams.append(stream)
+
+    ready = [s for s in streams if recognizer.is_ready(s)]
+    while ready:
+        recognizer.decode_streams(ready)
+        ready = [s for s in ready if recognizer.is_ready(s)]
+    return [recognizer.get_result(stream) for stream, _, _ in items]
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Optional, Tuple, List
+from config.logger import setup_logging
+from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.dto.dto import InterfaceType
+
+TAG = __name__
+logger = setup_logging()
+
+
+class ASRProvider(ASRProviderBase):
+    """
+    离线桩ASR（压测用）：解码音频后等待配置的延迟，按音频长度确定性地返回 texts 中的一句
+    latency_ms: 固定延迟；latency_per_sec_ms: 每秒音频额外增加的延迟
+    """
+
+    def __init__(self, config: dict, delete_audio_file: bool):
+        super().__init__()
+        self.interface_type = InterfaceType.LOCAL
+        self.output_dir = config.get("output_dir", "tmp/")
+        self.delete_audio_file = delete_audio_file
+        self.texts = list(config.get("texts") or ["你好", "给我讲个笑话", "你叫什么名字"])
+        self.latency_ms = float(config.get("latency_ms", 200))
+        self.latency_per_sec_ms = float(config.get("latency_per_sec_ms", 20))
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        if audio_format == "pcm":
+            pcm_data = opus_data
+        else:
+            pcm_data = self.decode_opus(opus_data)
+        pcm_bytes = sum(len(chunk) for chunk in pcm_data)
+        audio_seconds = pcm_bytes / 32000  # 16kHz 16bit 单声道
+        await asyncio.sleep(
+            (self.latency_ms + self.latency_per_sec_ms * audio_seconds) / 1000
+        )
+        if pcm_bytes == 0:
+            return "", None
+        return self.texts[(pcm_bytes // 1920) % len(self.texts)], None
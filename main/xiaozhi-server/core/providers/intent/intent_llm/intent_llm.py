@@ -1,10 +1,11 @@
 from typing import List, Dict
 from ..base import IntentProviderBase
 from plugins_func.functions.play_music import initialize_music_handler
+from core.utils.intent_router import get_intent_router
+from .prompt_sections import IntentPromptBuilder
 from config.logger import setup_logging
 import re
 import json
-import hashlib
 import time
 
 TAG = __name__
@@ -16,11 +17,13 @@ class IntentProvider(IntentProviderBase):
         super().__init__(config)
         self.llm = None
         self.promot = ""
-        # 导入全局缓存管理器
-        from core.utils.cache.manager import cache_manager, CacheType
+        self.prompt_builder = IntentPromptBuilder()
+        # 两级意图缓存（全局层按归一化文本共享，设备层按对话历史区分）
+        from core.utils.cache.intent_cache import get_intent_cache
 
-        self.cache_manager = cache_manager
-        self.CacheType = CacheType
+        self.intent_cache = get_intent_cache(config)
+        # 高置信度指令（退出、播放音乐等）由快速路由直接返回，跳过LLM
+        self.router = get_intent_router() if config.get("fast_router", True) else None
         self.history_count = 4  # 默认使用最近4条对话记录
 
     def get_intent_system_prompt(self, functions_list: str) -> str:
@@ -111,6 +114,30 @@ class IntentProvider(IntentProviderBase):
         )
         return llm_result
 
+    @staticmethod
+    def _handle_continue_chat(conn, function_name: str):
+        """继续聊天时清理工具调用相关的历史消息（缓存命中时同样需要）"""
+        if function_name != "continue_chat":
+            return
+        # 保留非工具相关的消息
+        conn.dialogue.dialogue = [
+            msg for msg in conn.dialogue.dialogue if msg.role not in ["tool", "function"]
+        ]
+
+    def _route(self, conn, functions, text: str):
+        available = {
+            (func.get("function") or {}).get("name") for func in functions or []
+        }
+        if hasattr(conn, "mcp_client"):
+            available.update(
+                tool.get("function", {}).get("name")
+                for tool in conn.mcp_client.get_available_tools() or []
+            )
+        self.router.update_exit_commands(getattr(conn, "cmd_exit", None) or [])
+        if "play_music" in available:
+            self.router.update_music(initialize_music_handler(conn))
+        return self.router.route(text, available)
+
     async def detect_intent(self, conn, dialogue_history: List[Dict], text: str) -> str:
         if not self.llm:
             raise ValueError("LLM provider not set")
@@ -124,45 +151,57 @@ class IntentProvider(IntentProviderBase):
         model_info = getattr(self.llm, "model_name", str(self.llm.__class__.__name__))
         logger.bind(tag=TAG).debug(f"使用意图识别模型: {model_info}")
 
-        # 计算缓存键
-        cache_key = hashlib.md5((conn.device_id + text).encode()).hexdigest()
+        functions = conn.func_handler.get_functions()
+
+        if self.router is not None:
+            routed_intent = self._route(conn, functions, text)
+            if routed_intent is not None:
+                logger.bind(tag=TAG).info(
+                    f"快速路由识别到意图: {routed_intent}, 耗时: {time.time() - total_start_time:.4f}秒"
+                )
+                return routed_intent
+
+        functions_fp = self.intent_cache.functions_fingerprint(functions)
+        history_fp = self.intent_cache.history_fingerprint(
+            dialogue_history, self.history_count
+        )
 
         # 检查缓存
-        cached_intent = self.cache_manager.get(self.CacheType.INTENT, cache_key)
+        cached_intent = self.intent_cache.get(
+            text, functions_fp, conn.device_id, history_fp
+        )
         if cached_intent is not None:
             cache_time = time.time() - total_start_time
             logger.bind(tag=TAG).debug(
-                f"使用缓存的意图: {cache_key} -> {cached_intent}, 耗时: {cache_time:.4f}秒"
+                f"使用缓存的意图: {cached_intent}, 耗时: {cache_time:.4f}秒"
             )
+            try:
+                function_name = json.loads(cached_intent)["function_call"]["name"]
+            except (ValueError, KeyError, TypeError):
+                function_name = None
+            self._handle_continue_chat(conn, function_name)
             return cached_intent
 
         if self.promot == "":
-            functions = conn.func_handler.get_functions()
             if hasattr(conn, "mcp_client"):
                 mcp_tools = conn.mcp_client.get_available_tools()
                 if mcp_tools is not None and len(mcp_tools) > 0:
-                    if functions is None:
-                        functions = []
+                    functions = list(functions or [])
                     functions.extend(mcp_tools)
 
             self.promot = self.get_intent_system_prompt(functions)
-
-        music_config = initialize_music_handler(conn)
-        music_file_names = music_config["music_file_names"]
-        prompt_music = f"{self.promot}\n<musicNames>{music_file_names}\n</musicNames>"
+            self.prompt_builder.set_instructions(functions_fp, lambda: self.promot)
 
         home_assistant_cfg = conn.config["plugins"].get("home_assistant")
-        if home_assistant_cfg:
-            devices = home_assistant_cfg.get("devices", [])
-        else:
-            devices = []
-        if len(devices) > 0:
-            hass_prompt = "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
-            for device in devices:
-                hass_prompt += device + "\n"
-            prompt_music += hass_prompt
-
-        logger.bind(tag=TAG).debug(f"User prompt: {prompt_music}")
+        self.prompt_builder.set_home_assistant_devices(
+            home_assistant_cfg.get("devices", []) if home_assistant_cfg else []
+        )
+        self.prompt_builder.set_music(initialize_music_handler(conn))
+        prompt_music = self.prompt_builder.build()
+
+        logger.bind(tag=TAG).debug(
+            f"意图提示词token估算: {self.prompt_builder.token_estimates()}"
+        )
 
         # 构建用户对话历史的提示
         msgStr = ""
@@ -215,43 +254,39 @@ class IntentProvider(IntentProviderBase):
             # 如果包含function_call，则格式化为适合处理的格式
             if "function_call" in intent_data:
                 function_data = intent_data["function_call"]
-                function_name = function_data.get("name")
-                function_args = function_data.get("arguments", {})
+                calls = [(function_data.get("name"), function_data.get("arguments"))]
 
                 # 记录识别到的function call
                 logger.bind(tag=TAG).info(
-                    f"llm 识别到意图: {function_name}, 参数: {function_args}"
+                    f"llm 识别到意图: {function_data.get('name')}, 参数: {function_data.get('arguments', {})}"
                 )
-
                 # 如果是继续聊天，清理工具调用相关的历史消息
-                if function_name == "continue_chat":
-                    # 保留非工具相关的消息
-                    clean_history = [
-                        msg
-                        for msg in conn.dialogue.dialogue
-                        if msg.role not in ["tool", "function"]
-                    ]
-                    conn.dialogue.dialogue = clean_history
-
-                # 添加到缓存
-                self.cache_manager.set(self.CacheType.INTENT, cache_key, intent)
-
-                # 后处理时间
-                postprocess_time = time.time() - postprocess_start_time
-                logger.bind(tag=TAG).debug(f"意图后处理耗时: {postprocess_time:.4f}秒")
-
-                # 确保返回完全序列化的JSON字符串
-                return intent
+                self._handle_continue_chat(conn, function_data.get("name"))
             else:
-                # 添加到缓存
-                self.cache_manager.set(self.CacheType.INTENT, cache_key, intent)
+                calls = [
+                    (call.get("name"), call.get("arguments"))
+                    for call in intent_data.get("function_calls", [])
+                    if isinstance(call, dict)
+                ]
+
+            # 添加到缓存
+            self.intent_cache.put(
+                text,
+                functions_fp,
+                conn.device_id,
+                history_fp,
+                intent,
+                calls,
+                llm_time,
+                history_used=len(dialogue_history) > start_idx,
+            )
 
-                # 后处理时间
-                postprocess_time = time.time() - postprocess_start_time
-                logger.bind(tag=TAG).debug(f"意图后处理耗时: {postprocess_time:.4f}秒")
+            # 后处理时间
+            postprocess_time = time.time() - postprocess_start_time
+            logger.bind(tag=TAG).debug(f"意图后处理耗时: {postprocess_time:.4f}秒")
 
-                # 返回普通意图
-                return intent
+            # 确保返回完全序列化的JSON字符串
+            return intent
         except json.JSONDecodeError:
             # 后处理时间
             postprocess_time = time.time() - postprocess_start_time
@@ -0,0 +1,102 @@
+"""
+意图识别系统提示词分段组装
+提示词由若干预渲染的分段组成，每段带版本号，只有版本变化时才重新渲染：
+1. instructions：函数说明和返回格式（连接生命周期内不变）
+2. home_assistant：HA设备列表（配置变化时更新）
+3. music：音乐文件列表（MUSIC_CACHE 重新扫描且列表内容变化时更新）
+分段按变化频率从低到高排列，保证前缀字节稳定，便于服务商侧的提示词缓存命中
+"""
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from core.utils.textUtils import estimate_tokens
+
+
+class PromptSection:
+    """带版本号的预渲染提示词分段"""
+
+    __slots__ = ("name", "version", "text", "tokens", "renders")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.version: Optional[Any] = None
+        self.text = ""
+        self.tokens = 0
+        self.renders = 0
+
+    def update(self, version: Any, render: Callable[[], str]) -> bool:
+        """版本变化时重新渲染，返回是否发生了变化"""
+        if version == self.version:
+            return False
+        self.text = render()
+        self.tokens = estimate_tokens(self.text)
+        self.version = version
+        self.renders += 1
+        return True
+
+
+def _digest(items) -> str:
+    return hashlib.sha1("\n".join(items).encode("utf-8")).hexdigest()
+
+
+class IntentPromptBuilder:
+    """按分段组装意图识别系统提示词，各段未变化时复用上一次的完整提示词"""
+
+    ORDER = ("instructions", "home_assistant", "music")
+
+    def __init__(self):
+        self.sections: Dict[str, PromptSection] = {
+            name: PromptSection(name) for name in self.ORDER
+        }
+        self._music_scan_time = None
+        self._prompt = ""
+        self._dirty = True
+        self._lock = threading.Lock()
+
+    def set_instructions(self, version: Any, render: Callable[[], str]) -> None:
+        with self._lock:
+            self._dirty |= self.sections["instructions"].update(version, render)
+
+    def set_home_assistant_devices(self, devices: List[str]) -> None:
+        devices = list(devices or [])
+
+        def render() -> str:
+            if not devices:
+                return ""
+            return (
+                "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
+                + "".join(device + "\n" for device in devices)
+            )
+
+        with self._lock:
+            self._dirty |= self.sections["home_assistant"].update(_digest(devices), render)
+
+    def set_music(self, music_cache: Dict[str, Any]) -> None:
+        """只在 MUSIC_CACHE 重新扫描后比较列表内容，内容不变时保持原文本"""
+        scan_time = music_cache.get("scan_time")
+        with self._lock:
+            if scan_time is not None and scan_time == self._music_scan_time:
+                return
+            self._music_scan_time = scan_time
+            names = list(music_cache.get("music_file_names") or [])
+            self._dirty |= self.sections["music"].update(
+                _digest(names), lambda: f"\n<musicNames>{names}\n</musicNames>"
+            )
+
+    def build(self) -> str:
+        with self._lock:
+            if self._dirty:
+                # 变化频率低的分段在前：instructions 与 HA 设备列表构成稳定前缀
+                self._prompt = "".join(
+                    self.sections[name].text for name in self.ORDER
+                )
+                self._dirty = False
+            return self._prompt
+
+    def token_estimates(self) -> Dict[str, int]:
+        with self._lock:
+            estimates = {name: section.tokens for name, section in self.sections.items()}
+        estimates["total"] = sum(estimates.values())
+        return estimates
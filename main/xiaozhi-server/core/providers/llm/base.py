@@ -26,6 +26,13 @@ class LLMProviderBase(ABC):
             logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
             return "【LLM服务响应异常】"
     
+    def end_session(self, session_id):
+        """
+        连接结束时清理该会话保存在实例上的状态
+        实例可能被多个连接共享（默认LLM、提供者注册表），按 session_id 保存状态的提供者需要重写
+        """
+        pass
+
     def response_with_functions(self, session_id, dialogue, functions=None):
         """
         Default implementation for function calling (streaming)
@@ -27,6 +27,9 @@ class LLMProvider(LLMProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
+    def end_session(self, session_id):
+        self.session_conversation_map.pop(session_id, None)
+
     def response(self, session_id, dialogue, **kwargs):
         coze_api_token = self.personal_access_token
         coze_api_base = COZE_CN_BASE_URL
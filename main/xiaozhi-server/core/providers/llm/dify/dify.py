@@ -19,6 +19,9 @@ class LLMProvider(LLMProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
+    def end_session(self, session_id):
+        self.session_conversation_map.pop(session_id, None)
+
     def response(self, session_id, dialogue, **kwargs):
         try:
             # 取最后一条用户消息
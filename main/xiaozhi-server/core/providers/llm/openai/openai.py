@@ -4,6 +4,7 @@ import os
 from openai.types import CompletionUsage
 from config.logger import setup_logging
 from core.utils.util import check_model_key
+from core.utils.async_http import HTTP2_AVAILABLE
 from core.providers.llm.base import LLMProviderBase
 
 TAG = __name__
@@ -65,16 +66,32 @@ class LLMProvider(LLMProviderBase):
             # Both set header and pass organization param for compatibility
             default_headers["OpenAI-Organization"] = organization_id
 
+        # 实例通过提供者注册表在连接间共享，连接池保持长连接复用
         self.client = openai.OpenAI(
             api_key=self.api_key,
             base_url=self.base_url,
             timeout=httpx.Timeout(self.timeout),
+            http_client=openai.DefaultHttpxClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=int(config.get("max_connections", 100)),
+                    max_keepalive_connections=int(
+                        config.get("max_keepalive_connections", 20)
+                    ),
+                    keepalive_expiry=float(config.get("keepalive_expiry", 60)),
+                ),
+            ),
             organization=organization_id if organization_id else None,
             default_headers=default_headers if default_headers else None,
         )
         if default_headers:
             logger.bind(tag=TAG).info(f"LLM OpenAI headers enabled: {list(default_headers.keys())}")
 
+    def close(self):
+        """关闭HTTP连接池（由提供者注册表在实例淘汰时调用）"""
+        self.client.close()
+
     def response(self, session_id, dialogue, **kwargs):
         try:
             responses = self.client.chat.completions.create(
@@ -0,0 +1,36 @@
+import time
+from config.logger import setup_logging
+from core.providers.llm.base import LLMProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+
+class LLMProvider(LLMProviderBase):
+    """
+    离线桩LLM（压测用）：不访问网络，按配置的延迟逐段返回固定回复
+    first_token_ms: 首个token延迟；token_ms: 之后每段的间隔；chunk_size: 每段字符数
+    """
+
+    def __init__(self, config):
+        self.model_name = config.get("model_name", "stub")
+        self.reply = config.get(
+            "reply", "好的，我听到了。这是一个用于压力测试的固定回复，请继续说话吧！"
+        )
+        self.first_token_ms = float(config.get("first_token_ms", 300))
+        self.token_ms = float(config.get("token_ms", 20))
+        self.chunk_size = max(1, int(config.get("chunk_size", 2)))
+
+    def _stream(self):
+        time.sleep(self.first_token_ms / 1000)
+        for start in range(0, len(self.reply), self.chunk_size):
+            if start:
+                time.sleep(self.token_ms / 1000)
+            yield self.reply[start : start + self.chunk_size]
+
+    def response(self, session_id, dialogue, **kwargs):
+        yield from self._stream()
+
+    def response_with_functions(self, session_id, dialogue, functions=None):
+        for token in self._stream():
+            yield token, None
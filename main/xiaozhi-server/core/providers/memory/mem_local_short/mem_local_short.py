@@ -1,8 +1,7 @@
 from ..base import MemoryProviderBase, logger
+from .memory_store import get_memory_store
 import time
 import json
-import os
-import yaml
 from config.config_loader import get_project_dir
 from config.manage_api_client import save_mem_local_short
 from core.utils.util import check_model_key
@@ -112,6 +111,7 @@ class MemoryProvider(MemoryProviderBase):
         self.short_memory = ""
         self.save_to_file = True
         self.memory_path = get_project_dir() + "data/.memory.yaml"
+        self.store = get_memory_store(self.memory_path)
         self.load_memory(summary_memory)
 
     def init_memory(
@@ -127,21 +127,12 @@ class MemoryProvider(MemoryProviderBase):
             self.short_memory = summary_memory
             return
 
-        all_memory = {}
-        if os.path.exists(self.memory_path):
-            with open(self.memory_path, "r", encoding="utf-8") as f:
-                all_memory = yaml.safe_load(f) or {}
-        if self.role_id in all_memory:
-            self.short_memory = all_memory[self.role_id]
+        memory = self.store.get(self.role_id)
+        if memory is not None:
+            self.short_memory = memory
 
     def save_memory_to_file(self):
-        all_memory = {}
-        if os.path.exists(self.memory_path):
-            with open(self.memory_path, "r", encoding="utf-8") as f:
-                all_memory = yaml.safe_load(f) or {}
-        all_memory[self.role_id] = self.short_memory
-        with open(self.memory_path, "w", encoding="utf-8") as f:
-            yaml.dump(all_memory, f, allow_unicode=True)
+        self.store.put(self.role_id, self.short_memory)
 
     async def save_memory(self, msgs):
         # 打印使用的模型信息
@@ -221,30 +212,18 @@ class MemoryProvider(MemoryProviderBase):
             if self.save_to_file:
                 logger.bind(tag=TAG).info(f"※ここだよ！ ローカルファイルモード：API呼び出しをスキップ")
                 
-                # ローカルファイルから記憶検索
-                try:
-                    if os.path.exists(self.memory_path):
-                        with open(self.memory_path, "r", encoding="utf-8") as f:
-                            all_memory = yaml.safe_load(f) or {}
-                        
-                        user_memory = all_memory.get(self.role_id, "")
-                        if user_memory:
-                            logger.bind(tag=TAG).info(f"※ここだよ！ ローカル記憶発見: {user_memory[:100]}...")
-                            return user_memory
-                        else:
-                            logger.bind(tag=TAG).info(f"※ここだよ！ ローカル記憶が見つかりません role_id={self.role_id}")
-                            return ""
-                    else:
-                        logger.bind(tag=TAG).info(f"※ここだよ！ メモリーファイルが存在しません: {self.memory_path}")
-                        return ""
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"※ここだよ！ ローカル記憶読み込みエラー: {e}")
-                    return ""
+                # ローカル記憶ストアから検索（起動時に読み込み済み、O(1)）
+                user_memory = self.store.get(self.role_id) or ""
+                if user_memory:
+                    logger.bind(tag=TAG).info(f"※ここだよ！ ローカル記憶発見: {user_memory[:100]}...")
+                else:
+                    logger.bind(tag=TAG).info(f"※ここだよ！ ローカル記憶が見つかりません role_id={self.role_id}")
+                return user_memory
             
             # nekota-server memories search API を呼び出し
             if ManageApiClient._instance:
                 logger.bind(tag=TAG).info(f"※ここだよ！ ManageApiClient使用可能")
-                result = ManageApiClient._instance._execute_request(
+                result = await ManageApiClient.execute_request_async(
                     "GET",
                     f"/api/memory/search",
                     params={
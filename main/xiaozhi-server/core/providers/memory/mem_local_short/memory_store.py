@@ -0,0 +1,126 @@
+"""
+本地短期记忆存储
+启动时加载一次 data/.memory.yaml 快照并回放追加日志，之后按 role_id 在内存中 O(1) 查询；
+每次保存只向追加日志写一行，日志条数达到阈值时合并为新快照（原子替换）
+"""
+
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+import yaml
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_COMPACT_THRESHOLD = 500
+
+
+class ShortMemoryStore:
+    """按 role_id 索引的短期记忆存储（进程内线程安全）"""
+
+    def __init__(self, snapshot_path: str, compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.log_path = snapshot_path + ".log"
+        self.compact_threshold = compact_threshold
+        self._memories: Dict[str, str] = {}
+        self._log_entries = 0
+        self._snapshot_ok = True
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    memories = yaml.safe_load(f) or {}
+                if not isinstance(memories, dict):
+                    raise ValueError(f"快照格式错误: {type(memories).__name__}")
+                self._memories = memories
+            except Exception as e:
+                # 快照无法解析时不能合并，否则新快照只含日志中的记录，会覆盖掉所有设备的原有记忆
+                self._snapshot_ok = False
+                logger.bind(tag=TAG).error(
+                    f"加载记忆快照失败，暂停合并以保留原快照，请手动修复 {self.snapshot_path}: {e}"
+                )
+        if os.path.exists(self.log_path):
+            valid_size = 0
+            with open(self.log_path, "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        # 进程异常退出时最后一行可能不完整
+                        break
+                    valid_size += len(raw)
+                    line = raw.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        logger.bind(tag=TAG).warning(f"跳过损坏的记忆日志: {line[:80]!r}")
+                        continue
+                    self._memories[record["role_id"]] = record["memory"]
+                    self._log_entries += 1
+            if valid_size < os.path.getsize(self.log_path):
+                # 截掉不完整的最后一行，避免之后追加的记录与其拼在同一行而丢失
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(valid_size)
+        logger.bind(tag=TAG).info(
+            f"记忆存储加载完成: {len(self._memories)} 个设备，日志 {self._log_entries} 条"
+        )
+
+    def get(self, role_id: str) -> Optional[str]:
+        return self._memories.get(role_id)
+
+    def put(self, role_id: str, memory: str) -> None:
+        record = json.dumps({"role_id": role_id, "memory": memory}, ensure_ascii=False)
+        with self._lock:
+            self._memories[role_id] = memory
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(record + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_entries += 1
+            if self._log_entries >= self.compact_threshold:
+                self._compact_locked()
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        """把内存中的全部记忆写成新快照，然后清空追加日志"""
+        if not self._snapshot_ok:
+            # 原快照加载失败，继续只写追加日志
+            return
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                yaml.dump(self._memories, f, allow_unicode=True)
+            os.replace(tmp_path, self.snapshot_path)
+            # 快照已包含日志中的全部记录，可以安全截断
+            open(self.log_path, "w").close()
+            self._log_entries = 0
+        except OSError as e:
+            logger.bind(tag=TAG).error(f"记忆快照合并失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_stores: Dict[str, ShortMemoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_memory_store(snapshot_path: str) -> ShortMemoryStore:
+    """获取进程级记忆存储（同一路径只加载一次）"""
+    store = _stores.get(snapshot_path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(snapshot_path)
+            if store is None:
+                store = ShortMemoryStore(snapshot_path)
+                _stores[snapshot_path] = store
+    return store
@@ -6,11 +6,16 @@ available the exported names are stub classes that raise ImportError when used.
 """
 
 try:
-    from .mcp_manager import ServerMCPManager
+    from .mcp_manager import ServerMCPManager, get_server_mcp_manager
     from .mcp_executor import ServerMCPExecutor
     from .mcp_client import ServerMCPClient
 
-    __all__ = ["ServerMCPManager", "ServerMCPExecutor", "ServerMCPClient"]
+    __all__ = [
+        "ServerMCPManager",
+        "ServerMCPExecutor",
+        "ServerMCPClient",
+        "get_server_mcp_manager",
+    ]
 except Exception as _err:  # pragma: no cover - fallback for missing optional deps
     # Define lightweight stubs that raise when instantiated to avoid import-time errors
     class ServerMCPManager:
@@ -31,4 +36,14 @@ except Exception as _err:  # pragma: no cover - fallback for missing optional de
                 "optional package 'mcp' is not installed; ServerMCPClient unavailable"
             )
 
-    __all__ = ["ServerMCPManager", "ServerMCPExecutor", "ServerMCPClient"]
+    def get_server_mcp_manager(*args, **kwargs):
+        raise ImportError(
+            "optional package 'mcp' is not installed; ServerMCPManager unavailable"
+        )
+
+    __all__ = [
+        "ServerMCPManager",
+        "ServerMCPExecutor",
+        "ServerMCPClient",
+        "get_server_mcp_manager",
+    ]
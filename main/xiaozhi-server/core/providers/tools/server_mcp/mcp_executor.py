@@ -3,11 +3,11 @@
 from typing import Dict, Any, Optional
 from ..base import ToolType, ToolDefinition, ToolExecutor
 from plugins_func.register import Action, ActionResponse
-from .mcp_manager import ServerMCPManager
+from .mcp_manager import ServerMCPManager, get_server_mcp_manager
 
 
 class ServerMCPExecutor(ToolExecutor):
-    """服务端MCP工具执行器"""
+    """服务端MCP工具执行器（使用进程级共享的MCP连接池）"""
 
     def __init__(self, conn):
         self.conn = conn
@@ -15,9 +15,9 @@ class ServerMCPExecutor(ToolExecutor):
         self._initialized = False
 
     async def initialize(self):
-        """初始化MCP管理器"""
+        """获取共享的MCP管理器，首次调用时启动所有MCP服务"""
         if not self._initialized:
-            self.mcp_manager = ServerMCPManager(self.conn)
+            self.mcp_manager = get_server_mcp_manager(self.conn.config)
             await self.mcp_manager.initialize_servers()
             self._initialized = True
 
@@ -84,6 +84,6 @@ class ServerMCPExecutor(ToolExecutor):
         return self.mcp_manager.is_mcp_tool(actual_tool_name)
 
     async def cleanup(self):
-        """清理MCP连接"""
-        if self.mcp_manager:
-            await self.mcp_manager.cleanup_all()
+        """连接关闭时只释放引用，共享的MCP会话由进程统一管理"""
+        self.mcp_manager = None
+        self._initialized = False
@@ -1,9 +1,20 @@
-"""服务端MCP管理器"""
+"""服务端MCP管理器（进程级连接池）
+
+所有设备连接共享同一组MCP服务会话：
+1. 进程内只启动一次，MCP客户端运行在独立的线程和事件循环中
+2. 每个MCP服务最多维持 max_sessions 个会话，并发的工具调用按负载分配到各会话上复用
+3. 定期健康检查；会话断开（传输层错误）时移出连接池，进行中的调用结束后再关闭，按需重新建立
+   工具自身返回的错误（如某台设备传错参数）不影响共享的会话
+4. 连接只读取共享的工具列表，不再各自启动子进程
+"""
 
 import asyncio
 import os
+import anyio
 import json
-from typing import Dict, Any, List
+import threading
+import concurrent.futures
+from typing import Dict, Any, List, Optional, Tuple
 from config.config_loader import get_project_dir
 from config.logger import setup_logging
 from .mcp_client import ServerMCPClient
@@ -11,21 +22,215 @@ from .mcp_client import ServerMCPClient
 TAG = __name__
 logger = setup_logging()
 
+DEFAULT_MAX_SESSIONS = 2
+DEFAULT_MAX_INFLIGHT = 8
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+DEFAULT_START_TIMEOUT = 60
+
+
+# 说明会话本身已断开的异常（传输层/连接错误）；工具自身返回的错误不在此列
+SESSION_ERRORS = (
+    OSError,
+    EOFError,
+    asyncio.TimeoutError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+)
+
+
+class MCPSession:
+    """连接池中的一个MCP会话"""
+
+    __slots__ = ("client", "inflight", "semaphore", "retired")
+
+    def __init__(self, client: ServerMCPClient, max_inflight: int):
+        self.client = client
+        self.inflight = 0
+        self.semaphore = asyncio.Semaphore(max_inflight)
+        # 已移出连接池，等进行中的调用结束后关闭
+        self.retired = False
+
+    def is_healthy(self) -> bool:
+        return self.client.is_connected()
+
+
+class MCPServerSessions:
+    """单个MCP服务的会话组"""
+
+    def __init__(self, name: str, srv_config: Dict[str, Any], max_sessions: int, max_inflight: int):
+        self.name = name
+        self.srv_config = srv_config
+        self.max_sessions = max(1, max_sessions)
+        self.max_inflight = max(1, max_inflight)
+        self.sessions: List[MCPSession] = []
+        self.tools: List[Dict[str, Any]] = []
+        self.tool_names = frozenset()
+        # 正在建立中的会话数（已占用 max_sessions 名额）
+        self._opening = 0
+        self._tasks = set()
+        self._lock = asyncio.Lock()
+
+    async def _open_session(self) -> MCPSession:
+        client = ServerMCPClient(self.srv_config)
+        await client.initialize()
+        if client.session is None:
+            raise RuntimeError(f"MCP服务 {self.name} 会话建立失败")
+        return MCPSession(client, self.max_inflight)
+
+    async def start(self):
+        session = await self._open_session()
+        self.sessions.append(session)
+        self.tools = session.client.get_available_tools()
+        self.tool_names = frozenset(session.client.tools_dict.keys())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _grow(self) -> Optional[MCPSession]:
+        """建立一个新会话（调用前已在锁内占用名额），建立过程不持有锁"""
+        session = None
+        try:
+            session = await self._open_session()
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"MCP服务 {self.name} 扩容会话失败: {e}")
+        async with self._lock:
+            self._opening -= 1
+            if session is not None:
+                self.sessions.append(session)
+                logger.bind(tag=TAG).info(
+                    f"MCP服务 {self.name} 扩容会话: {len(self.sessions)}/{self.max_sessions}"
+                )
+        return session
+
+    async def _acquire(self) -> MCPSession:
+        """选择负载最低的健康会话；全部繁忙且未达上限时在后台新开一个会话"""
+        async with self._lock:
+            healthy = [s for s in self.sessions if s.is_healthy()]
+            best = min(healthy, key=lambda s: s.inflight, default=None)
+            grow = (best is None or best.inflight > 0) and (
+                len(self.sessions) + self._opening < self.max_sessions
+            )
+            if grow:
+                self._opening += 1
+            if best is not None:
+                if grow:
+                    # 已有可用会话时不等待新会话建立（启动子进程可能需要数秒）
+                    self._spawn(self._grow())
+                best.inflight += 1
+                return best
+        if not grow:
+            raise RuntimeError(f"MCP服务 {self.name} 没有可用会话")
+        await self._grow()
+        async with self._lock:
+            healthy = [s for s in self.sessions if s.is_healthy()]
+            best = min(healthy, key=lambda s: s.inflight, default=None)
+            if best is None:
+                raise RuntimeError(f"MCP服务 {self.name} 没有可用会话")
+            best.inflight += 1
+            return best
+
+    def _release(self, session: MCPSession):
+        session.inflight -= 1
+        if session.retired and session.inflight == 0:
+            self._spawn(self._close_session(session))
+
+    async def retire(self, session: MCPSession):
+        """把会话移出连接池，不再分配新的调用；进行中的调用结束后再关闭"""
+        async with self._lock:
+            if session not in self.sessions:
+                return
+            self.sessions.remove(session)
+            session.retired = True
+        logger.bind(tag=TAG).info(f"MCP服务 {self.name} 会话已断开，移出连接池")
+        if session.inflight == 0:
+            await self._close_session(session)
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any], max_retries: int, retry_interval: float) -> Any:
+        for attempt in range(max_retries):
+            session = await self._acquire()
+            try:
+                async with session.semaphore:
+                    return await session.client.call_tool(tool_name, arguments)
+            except Exception as e:
+                # 工具自身返回的错误（如参数错误）说明会话正常：直接抛出，不重启共享给其他连接的会话
+                if session.is_healthy() and not isinstance(e, SESSION_ERRORS):
+                    raise
+                await self.retire(session)
+                # 最后一次尝试失败时直接抛出异常
+                if attempt == max_retries - 1:
+                    raise
+                logger.bind(tag=TAG).warning(
+                    f"执行工具 {tool_name} 失败 (尝试 {attempt+1}/{max_retries}): {e}"
+                )
+            finally:
+                self._release(session)
+            await asyncio.sleep(retry_interval)
+
+    async def health_check(self):
+        for session in list(self.sessions):
+            healthy = session.is_healthy()
+            if healthy and session.inflight == 0:
+                try:
+                    await asyncio.wait_for(session.client.session.send_ping(), timeout=10)
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"MCP服务 {self.name} 心跳失败: {e}")
+                    healthy = False
+            if not healthy:
+                await self.retire(session)
+        async with self._lock:
+            grow = not self.sessions and not self._opening
+            if grow:
+                self._opening += 1
+        if grow and await self._grow() is None:
+            logger.bind(tag=TAG).error(f"MCP服务 {self.name} 重新连接失败")
+
+    @staticmethod
+    async def _close_session(session: MCPSession):
+        try:
+            await asyncio.wait_for(session.client.cleanup(), timeout=20)
+        except (asyncio.TimeoutError, Exception) as e:
+            logger.bind(tag=TAG).error(f"关闭服务端MCP客户端时出错: {e}")
+
+    async def close(self):
+        sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            await self._close_session(session)
+
 
 class ServerMCPManager:
-    """管理多个服务端MCP服务的集中管理器"""
+    """管理多个服务端MCP服务的进程级连接池"""
 
-    def __init__(self, conn) -> None:
+    def __init__(self, pool_config: Optional[Dict[str, Any]] = None) -> None:
         """初始化MCP管理器"""
-        self.conn = conn
+        pool_config = pool_config or {}
+        self.max_sessions = int(pool_config.get("max_sessions", DEFAULT_MAX_SESSIONS))
+        self.max_inflight = int(
+            pool_config.get("max_inflight_per_session", DEFAULT_MAX_INFLIGHT)
+        )
+        self.health_check_interval = float(
+            pool_config.get("health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL)
+        )
+        self.max_retries = int(pool_config.get("max_retries", 3))
+        self.retry_interval = float(pool_config.get("retry_interval", 2))
+
         self.config_path = get_project_dir() + "data/.mcp_server_settings.json"
         if not os.path.exists(self.config_path):
             self.config_path = ""
             logger.bind(tag=TAG).warning(
                 f"请检查mcp服务配置文件：data/.mcp_server_settings.json"
             )
-        self.clients: Dict[str, ServerMCPClient] = {}
-        self.tools = []
+        self.servers: Dict[str, MCPServerSessions] = {}
+        self.tools: Tuple[Dict[str, Any], ...] = ()
+        self._tool_servers: Dict[str, MCPServerSessions] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_future: Optional[concurrent.futures.Future] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
 
     def load_config(self) -> Dict[str, Any]:
         """加载MCP服务配置"""
@@ -42,9 +247,51 @@ class ServerMCPManager:
             )
             return {}
 
+    def _ensure_loop(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(ready,), name="server-mcp", daemon=True
+            )
+            self._thread.start()
+        ready.wait(timeout=5)
+
+    def _run(self, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _on_pool_loop(self, coro):
+        """在连接池的事件循环中执行协程，可从任意事件循环调用"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return await asyncio.wrap_future(future)
+
     async def initialize_servers(self) -> None:
-        """初始化所有MCP服务"""
+        """启动所有MCP服务（进程内只执行一次，并发调用会等待同一次启动）"""
+        self._ensure_loop()
+        with self._lock:
+            if self._start_future is None:
+                self._start_future = asyncio.run_coroutine_threadsafe(
+                    self._start_servers(), self._loop
+                )
+            start_future = self._start_future
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(start_future)),
+                timeout=DEFAULT_START_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            logger.bind(tag=TAG).warning("等待服务端MCP启动超时，本次连接暂不提供MCP工具")
+
+    async def _start_servers(self) -> None:
         config = self.load_config()
+        tools: List[Dict[str, Any]] = []
         for name, srv_config in config.items():
             if not srv_config.get("command") and not srv_config.get("url"):
                 logger.bind(tag=TAG).warning(
@@ -55,104 +302,93 @@ class ServerMCPManager:
             try:
                 # 初始化服务端MCP客户端
                 logger.bind(tag=TAG).info(f"初始化服务端MCP客户端: {name}")
-                client = ServerMCPClient(srv_config)
-                await client.initialize()
-                self.clients[name] = client
-                client_tools = client.get_available_tools()
-                self.tools.extend(client_tools)
+                server = MCPServerSessions(
+                    name, srv_config, self.max_sessions, self.max_inflight
+                )
+                await server.start()
+                self.servers[name] = server
+                tools.extend(server.tools)
+                for tool_name in server.tool_names:
+                    self._tool_servers.setdefault(tool_name, server)
 
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"Failed to initialize MCP server {name}: {e}"
                 )
 
-        # 输出当前支持的服务端MCP工具列表
-        if hasattr(self.conn, "func_handler") and self.conn.func_handler:
-            self.conn.func_handler.current_support_functions()
+        self.tools = tuple(tools)
+        if self.servers and self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for server in list(self.servers.values()):
+                try:
+                    await server.health_check()
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"MCP服务 {server.name} 健康检查出错: {e}")
 
-    def get_all_tools(self) -> List[Dict[str, Any]]:
-        """获取所有服务的工具function定义"""
+    def get_all_tools(self) -> Tuple[Dict[str, Any], ...]:
+        """获取所有服务的工具function定义（所有连接共享，只读）"""
         return self.tools
 
     def is_mcp_tool(self, tool_name: str) -> bool:
         """检查是否是MCP工具"""
-        for tool in self.tools:
-            if (
-                tool.get("function") is not None
-                and tool["function"].get("name") == tool_name
-            ):
-                return True
-        return False
+        return tool_name in self._tool_servers
 
     async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        """执行工具调用，失败时会尝试重新连接"""
+        """执行工具调用，会话断开时换用其他会话重试"""
         logger.bind(tag=TAG).info(f"执行服务端MCP工具 {tool_name}，参数: {arguments}")
 
-        max_retries = 3  # 最大重试次数
-        retry_interval = 2  # 重试间隔(秒)
-
-        # 找到对应的客户端
-        client_name = None
-        target_client = None
-        for name, client in self.clients.items():
-            if client.has_tool(tool_name):
-                client_name = name
-                target_client = client
-                break
-
-        if not target_client:
+        server = self._tool_servers.get(tool_name)
+        if server is None:
             raise ValueError(f"工具 {tool_name} 在任意MCP服务中未找到")
 
-        # 带重试机制的工具调用
-        for attempt in range(max_retries):
-            try:
-                return await target_client.call_tool(tool_name, arguments)
-            except Exception as e:
-                # 最后一次尝试失败时直接抛出异常
-                if attempt == max_retries - 1:
-                    raise
+        return await self._on_pool_loop(
+            server.call_tool(
+                tool_name, arguments, self.max_retries, self.retry_interval
+            )
+        )
 
-                logger.bind(tag=TAG).warning(
-                    f"执行工具 {tool_name} 失败 (尝试 {attempt+1}/{max_retries}): {e}"
-                )
-
-                # 尝试重新连接
-                logger.bind(tag=TAG).info(
-                    f"重试前尝试重新连接 MCP 客户端 {client_name}"
-                )
-                try:
-                    # 关闭旧的连接
-                    await target_client.cleanup()
-
-                    # 重新初始化客户端
-                    config = self.load_config()
-                    if client_name in config:
-                        client = ServerMCPClient(config[client_name])
-                        await client.initialize()
-                        self.clients[client_name] = client
-                        target_client = client
-                        logger.bind(tag=TAG).info(
-                            f"成功重新连接 MCP 客户端: {client_name}"
-                        )
-                    else:
-                        logger.bind(tag=TAG).error(
-                            f"Cannot reconnect MCP client {client_name}: config not found"
-                        )
-                except Exception as reconnect_error:
-                    logger.bind(tag=TAG).error(
-                        f"Failed to reconnect MCP client {client_name}: {reconnect_error}"
-                    )
-
-                # 等待一段时间再重试
-                await asyncio.sleep(retry_interval)
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "sessions": len(server.sessions),
+                "inflight": sum(s.inflight for s in server.sessions),
+            }
+            for name, server in self.servers.items()
+        }
 
     async def cleanup_all(self) -> None:
-        """关闭所有 MCP客户端"""
-        for name, client in list(self.clients.items()):
-            try:
-                if hasattr(client, "cleanup"):
-                    await asyncio.wait_for(client.cleanup(), timeout=20)
+        """关闭所有 MCP客户端（进程退出时调用）"""
+        if self._loop is None:
+            return
+
+        async def _close():
+            if self._health_task:
+                self._health_task.cancel()
+            for name, server in list(self.servers.items()):
+                await server.close()
                 logger.bind(tag=TAG).info(f"服务端MCP客户端已关闭: {name}")
-            except (asyncio.TimeoutError, Exception) as e:
-                logger.bind(tag=TAG).error(f"关闭服务端MCP客户端 {name} 时出错: {e}")
-        self.clients.clear()
+            self.servers.clear()
+            self._tool_servers.clear()
+            self.tools = ()
+
+        await self._on_pool_loop(_close())
+
+
+_server_mcp_manager: Optional[ServerMCPManager] = None
+_server_mcp_manager_lock = threading.Lock()
+
+
+def get_server_mcp_manager(config: Optional[Dict[str, Any]] = None) -> ServerMCPManager:
+    """获取进程级服务端MCP管理器"""
+    global _server_mcp_manager
+    if _server_mcp_manager is None:
+        with _server_mcp_manager_lock:
+            if _server_mcp_manager is None:
+                _server_mcp_manager = ServerMCPManager(
+                    (config or {}).get("server_mcp_pool", {})
+                )
+    return _server_mcp_manager
@@ -1,20 +1,24 @@
 import os
 import re
+import json
 import queue
+import hashlib
 import uuid
 import asyncio
 import threading
 from typing import Callable, Any
 from core.utils import p3
-import time
 from datetime import datetime
 from core.utils import textUtils
 from core.utils.text_sanitize import sanitize_for_tts
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.audio_flow_control import FlowControlConfig
+from core.utils.async_pipeline import LoopQueue, migrate_queue
+from core.utils.cache.tts_audio import get_tts_audio_cache
 from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
-from core.utils.tts import MarkdownCleaner
+from core.utils.audio_transcoder import PCMOpusTranscoder, create_opus_encoder
+from core.utils.tts import MarkdownCleaner, SentenceSegmenter
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
@@ -30,6 +34,59 @@ import traceback
 TAG = __name__
 logger = setup_logging()
 
+# 计算音频缓存身份时排除的配置项：密钥类（不影响音色，也不应参与哈希）和输出目录
+_CACHE_IDENTITY_EXCLUDED = re.compile(
+    r"(key|token|secret|password|passwd|auth|credential|^output_dir$)", re.IGNORECASE
+)
+
+
+def _config_fingerprint(config) -> str:
+    """TTS配置（排除密钥）的摘要：音色、语速、音调、格式、接口地址等任一参数不同都会得到不同的值"""
+
+    def strip(value):
+        if isinstance(value, dict):
+            return {
+                k: strip(v)
+                for k, v in value.items()
+                if not _CACHE_IDENTITY_EXCLUDED.search(str(k))
+            }
+        if isinstance(value, (list, tuple)):
+            return [strip(v) for v in value]
+        return value
+
+    raw = json.dumps(strip(dict(config or {})), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class _OpusFrameSink:
+    """
+    把一句话的Opus帧逐帧放入 tts_audio_queue：首帧编码出来立即以 FIRST 发出，
+    其余帧滞后一帧发出，以便最后一帧仍标记为 LAST；同时保留一份帧列表供音频缓存使用
+    """
+
+    def __init__(self, tts, text):
+        self.tts = tts
+        self.text = text
+        self.frames = []
+        self._held = None
+
+    def push(self, opus_frame):
+        self.frames.append(opus_frame)
+        if len(self.frames) == 1:
+            self.tts._mark_latency("first_opus_frame")
+            self.tts.tts_audio_queue.put((SentenceType.FIRST, opus_frame, self.text))
+            return
+        if self._held is not None:
+            self.tts.tts_audio_queue.put((SentenceType.MIDDLE, self._held, None))
+        self._held = opus_frame
+
+    def close(self):
+        """句子结束：发出滞留的最后一帧，返回全部帧"""
+        if self._held is not None:
+            self.tts.tts_audio_queue.put((SentenceType.LAST, self._held, None))
+            self._held = None
+        return self.frames
+
 
 class TTSProviderBase(ABC):
     def __init__(self, config, delete_audio_file):
@@ -39,6 +96,7 @@ class TTSProviderBase(ABC):
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
         self.output_file = config.get("output_dir", "tmp/")
+        self._config_fingerprint = _config_fingerprint(config)
         self.tts_text_queue = queue.Queue()
         self.tts_audio_queue = queue.Queue()
         self.tts_audio_first_sentence = True
@@ -72,7 +130,14 @@ class TTSProviderBase(ABC):
         self.tts_stop_request = False
         self.processed_chars = 0
         self.is_first_sentence = True
+        self.segmenter = SentenceSegmenter(
+            self.punctuations, self.first_sentence_punctuations
+        )
+        self._segment_source = None
+        self._segment_fed = 0
         self.flow_controller = FlowControlConfig.create_flow_controller()
+        self.audio_cache = None
+        self._opus_encoder = None
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -80,7 +145,12 @@ class TTSProviderBase(ABC):
             f"tts-{datetime.now().date()}@{uuid.uuid4().hex}{extension}",
         )
 
+    def _mark_latency(self, stage):
+        if self.conn is not None:
+            self.conn.latency.mark(stage)
+
     def handle_opus(self, opus_data: bytes):
+        self._mark_latency("first_opus_frame")
         logger.bind(tag=TAG).debug(
             f"推送数据到队列里面帧数～～ {len(opus_data)}"
         )
@@ -95,58 +165,65 @@ class TTSProviderBase(ABC):
 
     def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
         logger.bind(tag=TAG).info(f"※ここだよ！ to_tts_stream呼び出し text='{text}', delete_audio_file={self.delete_audio_file}")
+        self._mark_latency("tts_first_segment")
         text = MarkdownCleaner.clean_markdown(text)
         try:
             text = sanitize_for_tts(text)
         except Exception:
             pass
         max_repeat_time = 5
+        cache_key = self._get_audio_cache_key(text)
+        if cache_key is not None:
+            cached_frames = self.audio_cache.get(cache_key)
+            if cached_frames:
+                logger.bind(tag=TAG).info(f"TTS音频缓存命中: {text}, frames={len(cached_frames)}")
+                if self.delete_audio_file:
+                    self._put_opus_frames(text, cached_frames)
+                elif opus_handler is not None:
+                    for opus_frame in cached_frames:
+                        opus_handler(opus_frame)
+                return None
         if self.delete_audio_file:
-            # 需要删除文件的直接转为音频数据
+            # 需要删除文件的直接转为音频数据，每编码出一帧就放入音频队列
             while max_repeat_time > 0:
+                sink = _OpusFrameSink(self, text)
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
-                    if audio_bytes:
-                        logger.bind(tag=TAG).info(f"※ここだよ！ TTS音声バイナリ生成完了 bytes={len(audio_bytes)}, text='{text}'")
-                        
-                        # Collect OPUS frames
-                        opus_frames = []
-                        def collect_opus_frame(frame_data):
-                            opus_frames.append(frame_data)
-                            logger.bind(tag=TAG).debug(f"※ここだよ！ OPUS frame collected: {len(frame_data)} bytes")
-                            
-                        try:
-                            logger.bind(tag=TAG).info(f"※ここだよ！ OPUS変換開始 audio_file_type={self.audio_file_type}")
-                            audio_bytes_to_data_stream(
-                                audio_bytes, file_type=self.audio_file_type, is_opus=True, callback=collect_opus_frame
-                            )
-                            logger.bind(tag=TAG).info(f"※ここだよ！ OPUS変換完了 frames={len(opus_frames)}")
-                        except Exception as e:
-                            logger.bind(tag=TAG).error(f"※ここだよ！ OPUS変換エラー: {e}")
-                            import traceback
-                            logger.bind(tag=TAG).error(f"※ここだよ！ OPUS変換エラー詳細: {traceback.format_exc()}")
-                            break
-                        
-                        # Send each OPUS frame to queue
-                        for i, opus_frame in enumerate(opus_frames):
-                            if len(opus_frames) == 1:
-                                # 1フレームの場合は FIRST かつ LAST
-                                sentence_type = SentenceType.FIRST
-                            elif i == 0:
-                                sentence_type = SentenceType.FIRST
-                            elif i == len(opus_frames) - 1:
-                                sentence_type = SentenceType.LAST
-                            else:
-                                sentence_type = SentenceType.MIDDLE
-                            
-                            self.tts_audio_queue.put((sentence_type, opus_frame, text if i == 0 else None))
-                            logger.bind(tag=TAG).debug(f"※ここだよ！ キューに追加 frame={i+1}/{len(opus_frames)}, type={sentence_type}, bytes={len(opus_frame)}")
-                            
-                        logger.bind(tag=TAG).info(f"※ここだよ！ OPUS音声キューに追加完了 frames={len(opus_frames)}")
-                        break
+                    stream = self.text_to_speak_stream(text)
+                    if stream is not None:
+                        # 流式provider：边接收边转码，首帧不必等整段音频合成完
+                        completed = asyncio.run(self._stream_to_opus(stream, sink))
                     else:
-                        max_repeat_time -= 1
+                        audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                        completed = bool(audio_bytes)
+                        if completed:
+                            logger.bind(tag=TAG).info(f"※ここだよ！ TTS音声バイナリ生成完了 bytes={len(audio_bytes)}, text='{text}'")
+                            try:
+                                audio_bytes_to_data_stream(
+                                    audio_bytes,
+                                    file_type=self.audio_file_type,
+                                    is_opus=True,
+                                    callback=sink.push,
+                                    sample_rate=int(getattr(self, "sample_rate", 16000) or 16000),
+                                    encoder=self.get_opus_encoder(),
+                                )
+                            except Exception as e:
+                                logger.bind(tag=TAG).error(f"※ここだよ！ OPUS変換エラー: {e}")
+                                logger.bind(tag=TAG).error(f"※ここだよ！ OPUS変換エラー詳細: {traceback.format_exc()}")
+                                sink.close()
+                                break
+                    if completed:
+                        frames = sink.close()
+                        logger.bind(tag=TAG).info(f"※ここだよ！ OPUS音声キューに追加完了 frames={len(frames)}")
+                        if cache_key is not None and frames:
+                            self.audio_cache.put(cache_key, frames)
+                        break
+                    max_repeat_time -= 1
                 except Exception as e:
+                    if sink.frames:
+                        # 已有音频放入队列，重试会重复播放，结束本句（不缓存不完整的音频）
+                        sink.close()
+                        logger.bind(tag=TAG).error(f"语音流中断: {text}，错误: {e}")
+                        break
                     logger.bind(tag=TAG).warning(
                         f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
                     )
@@ -186,11 +263,79 @@ class TTSProviderBase(ABC):
                     self.tts_audio_queue.put(
                         (SentenceType.FIRST, None, text)
                     )
-                self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                if cache_key is not None and opus_handler is not None and os.path.exists(tmp_file):
+                    opus_frames = []
+
+                    def collect_opus_frame(frame_data):
+                        opus_frames.append(frame_data)
+                        opus_handler(frame_data)
+
+                    self._process_audio_file_stream(tmp_file, callback=collect_opus_frame)
+                    self.audio_cache.put(cache_key, opus_frames)
+                else:
+                    self._process_audio_file_stream(tmp_file, callback=opus_handler)
             except Exception as e:
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
                 return None
 
+    def _put_opus_frames(self, text, opus_frames):
+        sink = _OpusFrameSink(self, text)
+        for opus_frame in opus_frames:
+            sink.push(opus_frame)
+        sink.close()
+        logger.bind(tag=TAG).info(f"※ここだよ！ OPUS音声キューに追加完了 frames={len(opus_frames)}")
+
+    def text_to_speak_stream(self, text):
+        """
+        流式合成：支持边合成边返回音频的provider重写此方法，返回逐块产出音频数据的异步迭代器，
+        数据格式由 stream_audio_file_type / stream_sample_rate 描述；返回 None 表示使用 text_to_speak 整段合成
+        """
+        return None
+
+    async def _stream_to_opus(self, stream, sink) -> bool:
+        """逐块转码流式音频，凑满一帧就放入音频队列；没有收到任何音频时返回 False"""
+        transcoder = PCMOpusTranscoder(
+            is_opus=True,
+            file_type=getattr(self, "stream_audio_file_type", self.audio_file_type),
+            sample_rate=int(getattr(self, "stream_sample_rate", 16000) or 16000),
+            encoder=self.get_opus_encoder(),
+        )
+        received = 0
+        async for chunk in stream:
+            if chunk:
+                received += len(chunk)
+                transcoder.feed(chunk, sink.push)
+        if not received:
+            return False
+        transcoder.finish(sink.push)
+        logger.bind(tag=TAG).info(f"※ここだよ！ TTS流式音声受信完了 bytes={received}")
+        return True
+
+    def get_opus_encoder(self):
+        """每个连接（TTS实例）复用一个Opus编码器，避免每句话重新创建"""
+        if self._opus_encoder is None:
+            self._opus_encoder = create_opus_encoder()
+        return self._opus_encoder
+
+    def get_audio_cache_identity(self):
+        """
+        音频缓存键中的 (provider, voice)
+        provider 包含完整有效配置（排除密钥）的摘要，音色参数不在 voice 字段的provider也不会互相串用；
+        voice 为运行时的音色属性（如有），覆盖初始化后被修改音色的情况
+        """
+        provider = type(self).__module__.rsplit(".", 1)[-1]
+        voice = getattr(self, "voice", None)
+        return f"{provider}:{self._config_fingerprint}", "" if voice is None else str(voice)
+
+    def _get_audio_cache_key(self, text):
+        """生成音频缓存键；未开启缓存、PCM输出或文本不适合缓存时返回 None"""
+        if self.audio_cache is None or self.conn is None:
+            return None
+        if self.conn.audio_format == "pcm" or not self.audio_cache.is_cacheable(text):
+            return None
+        provider, voice = self.get_audio_cache_identity()
+        return self.audio_cache.make_key(provider, voice, text, "opus")
+
     @abstractmethod
     async def text_to_speak(self, text, output_file):
         pass
@@ -234,6 +379,12 @@ class TTSProviderBase(ABC):
     async def open_audio_channels(self, conn):
         self.conn = conn
         self.tts_timeout = conn.config.get("tts_timeout", 10)
+        self.flow_controller = self._create_flow_controller(conn.config)
+        self.audio_cache = get_tts_audio_cache(conn.config)
+        self._configure_segmenter(conn.config)
+        if getattr(conn, "async_pipeline", False):
+            self._open_pipeline_channels(conn)
+            return
         # tts 消化线程
         self.tts_priority_thread = threading.Thread(
             target=self.tts_text_priority_thread, daemon=True
@@ -246,41 +397,55 @@ class TTSProviderBase(ABC):
         )
         self.audio_play_priority_thread.start()
 
+    def _configure_segmenter(self, config):
+        """按全局配置设置分句的最小/最大长度（0 表示不限制）"""
+        for attr, key in (
+            ("min_length", "tts_segment_min_len"),
+            ("first_min_length", "tts_first_segment_min_len"),
+            ("max_length", "tts_segment_max_len"),
+        ):
+            value = config.get(key)
+            if value is None:
+                continue
+            try:
+                setattr(self.segmenter, attr, max(0, int(value)))
+            except (TypeError, ValueError):
+                logger.bind(tag=TAG).warning(f"无效的分句配置 {key}: {value}")
+
+    def _create_flow_controller(self, config):
+        """按全局配置创建流控制器（预缓冲帧数、是否使用设备播放反馈）"""
+        pre_roll_frames = config.get("tts_pre_roll_frames")
+        try:
+            pre_roll_frames = int(pre_roll_frames) if pre_roll_frames is not None else None
+        except (TypeError, ValueError):
+            pre_roll_frames = None
+        device_feedback = str(config.get("tts_device_feedback", False)).lower() in ("true", "1", "yes")
+        return FlowControlConfig.create_flow_controller(
+            pre_roll_frames=pre_roll_frames, device_feedback=device_feedback
+        )
+
+    def _open_pipeline_channels(self, conn):
+        """asyncio管线模式：文本与音频发送阶段作为事件循环任务运行"""
+        # 子类重写了文本线程（流式TTS）时仍保留其线程，只把音频发送阶段切换为任务
+        if type(self).tts_text_priority_thread is TTSProviderBase.tts_text_priority_thread:
+            self.tts_text_queue = migrate_queue(self.tts_text_queue, LoopQueue(conn.loop))
+            conn.spawn_pipeline_task(self._tts_text_priority_task)
+        else:
+            self.tts_priority_thread = threading.Thread(
+                target=self.tts_text_priority_thread, daemon=True
+            )
+            self.tts_priority_thread.start()
+
+        self.tts_audio_queue = migrate_queue(self.tts_audio_queue, LoopQueue(conn.loop))
+        conn.spawn_pipeline_task(self._audio_play_priority_task)
+
     # 这里默认是非流式的处理方式
     # 流式处理方式请在子类中重写
     def tts_text_priority_thread(self):
         while not self.conn.stop_event.is_set():
             try:
                 message = self.tts_text_queue.get(timeout=1)
-                if message.sentence_type == SentenceType.FIRST:
-                    self.conn.client_abort = False
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                    continue
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
-                    self.tts_audio_first_sentence = True
-                    self.reset_flow_controller()
-                elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
-                elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    tts_file = message.content_file
-                    if tts_file and os.path.exists(tts_file):
-                        self._process_audio_file_stream(tts_file, callback=self.handle_opus)
-                if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    self.tts_audio_queue.put(
-                        (message.sentence_type, [], message.content_detail)
-                    )
-
+                self._handle_tts_text_message(message)
             except queue.Empty:
                 continue
             except Exception as e:
@@ -289,10 +454,111 @@ class TTSProviderBase(ABC):
                 )
                 continue
 
+    async def _tts_text_priority_task(self):
+        """TTS文本阶段（asyncio管线模式），合成工作交给共享线程池"""
+        while not self.conn.stop_event.is_set():
+            message = await self.tts_text_queue.get()
+            try:
+                await self.conn.loop.run_in_executor(
+                    self.conn.executor, self._handle_tts_text_message, message
+                )
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+
+    def _handle_tts_text_message(self, message):
+        if message.sentence_type == SentenceType.FIRST:
+            self.conn.client_abort = False
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+            return
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            self.tts_stop_request = False
+            self.processed_chars = 0
+            self.tts_text_buff = []
+            self.is_first_sentence = True
+            self.tts_audio_first_sentence = True
+            self.reset_flow_controller()
+        elif ContentType.TEXT == message.content_type:
+            self.tts_text_buff.append(message.content_detail)
+            segment_text = self._get_segment_text()
+            if segment_text:
+                self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
+        elif ContentType.FILE == message.content_type:
+            self._process_remaining_text_stream(opus_handler=self.handle_opus)
+            tts_file = message.content_file
+            if tts_file and os.path.exists(tts_file):
+                self._process_audio_file_stream(tts_file, callback=self.handle_opus)
+        if message.sentence_type == SentenceType.LAST:
+            self._process_remaining_text_stream(opus_handler=self.handle_opus)
+            self.tts_audio_queue.put(
+                (message.sentence_type, [], message.content_detail)
+            )
+
+    def _track_audio_item(self, sentence_type, audio_datas, text):
+        """处理打断、上报与输出统计，返回本条需要发送的帧数；被打断时返回None"""
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
+            # 打断时丢弃未上报的音频数据
+            self._enqueue_text, self._enqueue_audio = None, []
+            return None
+
+        # 收到下一个文本开始或会话结束时进行上报
+        if sentence_type is not SentenceType.MIDDLE:
+            # 上报TTS数据
+            if self._enqueue_text is not None and self._enqueue_audio is not None:
+                enqueue_tts_report(self.conn, self._enqueue_text, self._enqueue_audio)
+            self._enqueue_audio = []
+            self._enqueue_text = text
+
+        # 计算音频数据的帧数
+        if isinstance(audio_datas, bytes):
+            frame_count = 1  # 单个字节流作为一帧
+            if self._enqueue_audio is not None:
+                self._enqueue_audio.append(audio_datas)
+        else:
+            frame_count = 0
+
+        # 记录输出和报告
+        if self.conn.max_output_size > 0 and text:
+            add_device_output(self.conn.headers.get("device-id"), len(text))
+        return frame_count
+
+    async def _audio_play_priority_task(self):
+        """音频发送阶段（asyncio管线模式），直接在事件循环上发送"""
+        # 需要上报的文本和音频列表
+        self._enqueue_text = None
+        self._enqueue_audio = None
+        while not self.conn.stop_event.is_set():
+            sentence_type, audio_datas, text = await self.tts_audio_queue.get()
+            try:
+                frame_count = self._track_audio_item(sentence_type, audio_datas, text)
+                if frame_count is None:
+                    continue
+
+                if frame_count > 0:
+                    if await self.flow_controller.wait_for_slot_async(
+                        frame_count,
+                        FlowControlConfig.DEFAULT_MAX_WAIT_TIME,
+                        self._should_stop_sending,
+                    ):
+                        self.flow_controller.record_sent_frames(frame_count)
+                        await self._send_audio_with_flow_control(sentence_type, audio_datas, text)
+                    else:
+                        logger.bind(tag=TAG).debug("流控等待超时或收到停止信号，跳过音频发送")
+                else:
+                    await self._send_audio_with_flow_control(sentence_type, audio_datas, text)
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"audio_play_priority_task: {text} {e}"
+                )
+
     def _audio_play_priority_thread(self):
         # 需要上报的文本和音频列表
-        enqueue_text = None
-        enqueue_audio = None
+        self._enqueue_text = None
+        self._enqueue_audio = None
         while not self.conn.stop_event.is_set():
             text = None
             try:
@@ -303,46 +569,19 @@ class TTSProviderBase(ABC):
                         break
                     continue
 
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
-                    # 打断时丢弃未上报的音频数据
-                    enqueue_text, enqueue_audio = None, []
+                frame_count = self._track_audio_item(sentence_type, audio_datas, text)
+                if frame_count is None:
                     continue
 
-                # 收到下一个文本开始或会话结束时进行上报
-                if sentence_type is not SentenceType.MIDDLE:
-                    # 上报TTS数据
-                    if enqueue_text is not None and enqueue_audio is not None:
-                        enqueue_tts_report(self.conn, enqueue_text, enqueue_audio)
-                    enqueue_audio = []
-                    enqueue_text = text
-
-                # 计算音频数据的帧数
-                if isinstance(audio_datas, bytes):
-                    frame_count = 1  # 单个字节流作为一帧
-                    enqueue_audio.append(audio_datas)
-                else:
-                    frame_count = 0
-
-                # 记录输出和报告
-                if self.conn.max_output_size > 0 and text:
-                    add_device_output(self.conn.headers.get("device-id"), len(text))
-
                 # 流控检查
                 if frame_count > 0:
-                    max_wait_time = FlowControlConfig.DEFAULT_MAX_WAIT_TIME
-                    wait_start_time = time.time()
-                    retry_interval = FlowControlConfig.DEFAULT_RETRY_INTERVAL
-
-                    while not self.flow_controller.can_send_frames(frame_count):
-                        # 检查是否超时或需要停止
-                        if (time.time() - wait_start_time > max_wait_time or
-                                self.conn.stop_event.is_set() or
-                                self.conn.client_abort):
-                            logger.bind(tag=TAG).debug("流控等待超时或收到停止信号，跳过音频发送")
-                            break
-                        # 短暂等待后重试
-                        time.sleep(retry_interval)
+                    # 按播放截止时间定时等待，超时或需要停止时放弃发送
+                    if not self.flow_controller.wait_for_slot(
+                        frame_count,
+                        FlowControlConfig.DEFAULT_MAX_WAIT_TIME,
+                        self._should_stop_sending,
+                    ):
+                        logger.bind(tag=TAG).debug("流控等待超时或收到停止信号，跳过音频发送")
                     else:
                         # 可以发送，记录发送的帧数
                         self.flow_controller.record_sent_frames(frame_count)
@@ -358,10 +597,8 @@ class TTSProviderBase(ABC):
                         # status = self.flow_controller.get_status()
                         # logger.bind(tag=TAG).debug(
                         #     f"流控状态: 缓冲区使用率={status['buffer_usage_percent']:.1f}%, "
-                        #     f"可用令牌={status['available_tokens']}..."
+                        #     f"缓冲时长={status['buffered_ms']}ms..."
                         #     f"发送帧数={status['sent_frames']}..."
-                        #     f"消费帧数={status['consumed_frames']}..."
-                        #     f"代播放帧数={status['sent_frames'] - status['consumed_frames']}..."
                         # )
                 else:
                     # 没有音频数据，直接发送
@@ -376,19 +613,17 @@ class TTSProviderBase(ABC):
                     f"audio_play_priority_thread: {text} {e}"
                 )
 
+    def _should_stop_sending(self) -> bool:
+        return self.conn.stop_event.is_set() or self.conn.client_abort
+
     async def _send_audio_with_flow_control(self, sentence_type, audio_datas, text):
         """
-        带流控的音频发送方法 模拟设备消费音频帧的过程
-        实际应用中应该根据设备反馈来更新消费情况
+        带流控的音频发送方法
+        发送节奏由流控制器按播放时间线控制，设备端播放进度反馈通过
+        flow_controller.update_device_consumption 上报
         """
         await sendAudioMessage(self.conn, sentence_type, audio_datas, text)
 
-        # 模拟设备消费（实际应用中应该从设备获取反馈）防止音字不同步
-        if isinstance(audio_datas, bytes):
-            # 模拟设备播放延迟（60ms per frame）, 实际情况可以低一点（50ms），增加使用体验
-            await asyncio.sleep(0.055)
-            self.flow_controller.update_device_consumption(1)
-
     # 在类中添加流控制器重置方法
     def reset_flow_controller(self):
         """重置流控制器状态，通常在新会话开始时调用"""
@@ -408,27 +643,20 @@ class TTSProviderBase(ABC):
             await self.ws.close()
 
     def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
+        # 只把新增的文本交给增量分句器，避免每次都合并全部文本
+        buff = self.tts_text_buff
+        if self._segment_source is not buff or self._segment_fed > len(buff):
+            # 文本缓冲已被重置（新的一轮对话）
+            self.segmenter.reset()
+            self._segment_source = buff
+            self._segment_fed = 0
+        new_text = "".join(buff[self._segment_fed :])
+        self._segment_fed = len(buff)
+
+        self.segmenter.is_first_sentence = self.is_first_sentence
+        segment_text_raw = self.segmenter.feed(new_text)
+
+        if segment_text_raw:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(
                 segment_text_raw
             )
@@ -439,13 +667,24 @@ class TTSProviderBase(ABC):
                 self.is_first_sentence = False
 
             return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
+        elif self.tts_stop_request and self.segmenter.tail:
+            segment_text = self.segmenter.flush()
+            self.processed_chars += len(segment_text)
             self.is_first_sentence = True  # 重置标志
             return segment_text
         else:
             return None
 
+    def _take_remaining_text(self) -> str:
+        """取出尚未合成的全部文本，并同步分句器状态，之后到达的文本不会重复合成这部分内容"""
+        full_text = "".join(self.tts_text_buff)
+        remaining_text = full_text[self.processed_chars :]
+        self.processed_chars = len(full_text)
+        self.segmenter.reset()
+        self._segment_source = self.tts_text_buff
+        self._segment_fed = len(self.tts_text_buff)
+        return remaining_text
+
     def _process_audio_file_stream(self, tts_file, callback: Callable[[Any], Any]) -> None:
         """处理音频文件并转换为指定格式
 
@@ -480,12 +719,10 @@ class TTSProviderBase(ABC):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
+        remaining_text = self._take_remaining_text()
         if remaining_text:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
             if segment_text:
                 self.to_tts_stream(segment_text, opus_handler=opus_handler)
-                self.processed_chars += len(full_text)
                 return True
         return False
@@ -1,5 +1,6 @@
 import requests
 import os
+import aiohttp
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
@@ -20,6 +21,7 @@ class TTSProvider(TTSProviderBase):
             self.voice = config.get("voice", "alloy")
         self.response_format = config.get("format", "wav")
         self.audio_file_type = config.get("format", "wav")
+        self.stream_audio_file_type = "wav"
 
         # 处理空字符串的情况
         speed = config.get("speed", "1.0")
@@ -37,7 +39,7 @@ class TTSProvider(TTSProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
-    async def text_to_speak(self, text, output_file):
+    def _request_headers(self):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -49,14 +51,21 @@ class TTSProvider(TTSProviderBase):
         organization_id = os.getenv("OPENAI_ORG")
         if organization_id:
             headers["OpenAI-Organization"] = organization_id
-        data = {
+        return headers
+
+    def _request_body(self, text):
+        return {
             "model": self.model,
             "input": text,
             "voice": self.voice,
             "response_format": "wav",
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+
+    async def text_to_speak(self, text, output_file):
+        response = requests.post(
+            self.api_url, json=self._request_body(text), headers=self._request_headers()
+        )
         if response.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as audio_file:
@@ -67,3 +76,17 @@ class TTSProvider(TTSProviderBase):
             raise Exception(
                 f"OpenAI TTS请求失败: {response.status_code} - {response.text}"
             )
+
+    async def text_to_speak_stream(self, text):
+        """接口以分块传输返回WAV，收到多少转码多少（WAV头部中的长度字段会被忽略）"""
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.tts_timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(
+                self.api_url, json=self._request_body(text), headers=self._request_headers()
+            ) as resp:
+                if resp.status != 200:
+                    raise Exception(
+                        f"OpenAI TTS请求失败: {resp.status} - {await resp.text()}"
+                    )
+                async for chunk in resp.content.iter_any():
+                    yield chunk
@@ -0,0 +1,46 @@
+import io
+import math
+import wave
+import asyncio
+import numpy as np
+from config.logger import setup_logging
+from core.providers.tts.base import TTSProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+
+class TTSProvider(TTSProviderBase):
+    """
+    离线桩TTS（压测用）：等待配置的合成延迟后生成确定性的正弦波WAV
+    latency_ms: 固定合成延迟；char_ms: 每个字符对应的音频时长
+    """
+
+    def __init__(self, config, delete_audio_file):
+        super().__init__(config, delete_audio_file)
+        self.audio_file_type = "wav"
+        self.sample_rate = 16000
+        self.latency_ms = float(config.get("latency_ms", 150))
+        self.char_ms = float(config.get("char_ms", 200))
+        self.frequency = float(config.get("frequency", 440))
+
+    def _synthesize(self, text):
+        samples = int(self.sample_rate * max(1, len(text)) * self.char_ms / 1000)
+        step = 2 * math.pi * self.frequency / self.sample_rate
+        frames = (3000 * np.sin(step * np.arange(samples))).astype("<i2")
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(frames.tobytes())
+        return buffer.getvalue()
+
+    async def text_to_speak(self, text, output_file):
+        await asyncio.sleep(self.latency_ms / 1000)
+        audio_bytes = self._synthesize(text)
+        if output_file:
+            with open(output_file, "wb") as f:
+                f.write(audio_bytes)
+        else:
+            return audio_bytes
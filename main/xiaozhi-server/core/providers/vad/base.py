@@ -1,5 +1,29 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Optional
+
+import opuslib_next
+
+
+class VADSession:
+    """
+    每连接的VAD会话：持有Opus解码器和各实现的帧处理状态
+    VAD提供者本身只保存模型和只读参数，可被所有连接共享
+    """
+
+    __slots__ = ("provider", "sample_rate", "state", "_decoder")
+
+    def __init__(self, provider: "VADProviderBase", state: Any = None, sample_rate: int = 16000):
+        self.provider = provider
+        self.sample_rate = sample_rate
+        self.state = state
+        self._decoder: Optional[opuslib_next.Decoder] = None
+
+    @property
+    def decoder(self) -> opuslib_next.Decoder:
+        # 连接上有共享解码阶段时不会用到，按需创建
+        if self._decoder is None:
+            self._decoder = opuslib_next.Decoder(self.sample_rate, 1)
+        return self._decoder
 
 
 class VADProviderBase(ABC):
@@ -7,3 +31,22 @@ class VADProviderBase(ABC):
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    def create_session_state(self) -> Any:
+        """创建实现相关的每连接状态，子类按需覆盖"""
+        return None
+
+    def get_session(self, conn) -> VADSession:
+        """获取连接的VAD会话，不存在或属于其他提供者时新建"""
+        session = getattr(conn, "vad_session", None)
+        if session is None or session.provider is not self:
+            session = VADSession(self, self.create_session_state())
+            conn.vad_session = session
+        return session
+
+    def decode_packet(self, conn, opus_packet) -> bytes:
+        """解码Opus数据包；连接上有共享解码阶段时复用其结果，避免重复解码"""
+        stage = getattr(conn, "opus_decode_stage", None)
+        if stage is not None:
+            return stage.decode(opus_packet)
+        return self.get_session(conn).decoder.decode(opus_packet, 960)
@@ -1,4 +1,5 @@
 import time
+import threading
 import numpy as np
 import torch
 import opuslib_next
@@ -8,6 +9,18 @@ from core.providers.vad.base import VADProviderBase
 TAG = __name__
 logger = setup_logging()
 
+# silero模型内部保存的循环状态属性（不同版本不同，存在哪些就保存哪些）
+MODEL_STATE_ATTRS = ("_state", "_context", "_last_sr", "_last_batch_size", "_h", "_c")
+
+
+class SileroVADState:
+    """每连接的模型循环状态"""
+
+    __slots__ = ("model_state",)
+
+    def __init__(self):
+        self.model_state = None  # None表示尚未推理过，使用模型初始状态
+
 
 class VADProvider(VADProviderBase):
     def __init__(self, config):
@@ -19,7 +32,11 @@ class VADProvider(VADProviderBase):
             force_reload=False,
         )
 
-        self.decoder = opuslib_next.Decoder(16000, 1)
+        # 模型被所有连接共享：推理时加锁，并换入/换出各连接自己的循环状态
+        self._model_lock = threading.Lock()
+        self._state_attrs = tuple(
+            attr for attr in MODEL_STATE_ATTRS if hasattr(self.model, attr)
+        )
 
         # 处理空字符串的情况
         threshold = config.get("threshold", "0.5")
@@ -36,10 +53,30 @@ class VADProvider(VADProviderBase):
         # 至少要多少帧才算有语音
         self.frame_window_threshold = 3
 
+    def create_session_state(self) -> SileroVADState:
+        return SileroVADState()
+
+    def _infer(self, state: SileroVADState, audio_tensor) -> float:
+        """使用连接自己的循环状态推理一个512采样点的块"""
+        with self._model_lock:
+            if state.model_state is None:
+                if hasattr(self.model, "reset_states"):
+                    self.model.reset_states()
+            else:
+                for attr, value in zip(self._state_attrs, state.model_state):
+                    setattr(self.model, attr, value)
+            with torch.no_grad():
+                speech_prob = self.model(audio_tensor, 16000).item()
+            state.model_state = tuple(
+                getattr(self.model, attr) for attr in self._state_attrs
+            )
+        return speech_prob
+
     def is_vad(self, conn, opus_packet):
         try:
-            pcm_frame = self.decoder.decode(opus_packet, 960)
+            pcm_frame = self.decode_packet(conn, opus_packet)
             conn.client_audio_buffer.extend(pcm_frame)  # 将新数据加入缓冲区
+            state = self.get_session(conn).state
 
             # 处理缓冲区中的完整帧（每次处理512采样点）
             client_have_voice = False
@@ -54,8 +91,7 @@ class VADProvider(VADProviderBase):
                 audio_tensor = torch.from_numpy(audio_float32)
 
                 # 检测语音活动
-                with torch.no_grad():
-                    speech_prob = self.model(audio_tensor, 16000).item()
+                speech_prob = self._infer(state, audio_tensor)
 
                 # 双阈值判断
                 if speech_prob >= self.vad_threshold:
@@ -0,0 +1,207 @@
+"""
+本地ASR微批推理
+共享本地模型（fun_local / sherpa_onnx_local）的识别请求统一进入一个队列，由专用推理线程按
+最大批量和最大等待时间组成动态微批，一次调用模型的批量接口，再通过 Future 把结果分发回各连接。
+CPU 机器上多句短语音合批推理，比多个连接各自单句解码争抢CPU核心效率更高。
+模型和推理线程按模型配置登记在进程级注册表中（get_asr_batcher），同一模型无论创建多少个provider实例
+都只加载一次、只有一个推理线程；batch_fn 只持有模型，不持有provider实例
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT_MS = 20
+
+
+class ASRBatcher:
+    """
+    进程级ASR推理线程（每个共享模型一个实例）
+    Args:
+        name: 统计名称
+        batch_fn: 批量推理函数，输入一批请求，按相同顺序返回结果
+        model: 该推理线程使用的模型（供provider创建流等非批量操作使用）
+        max_batch_size: 单批最多请求数
+        max_wait_ms: 第一条请求入队后，最多等待多久凑批
+        retry_individually: 整批失败时是否逐条重试；只有 batch_fn 可重复执行（无副作用）时才能开启，
+            流式解码会在失败前修改部分流的状态，重试会重复送入音频
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        model: Any = None,
+        retry_individually: bool = False,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.model = model
+        self.retry_individually = retry_individually
+        self.max_batch_size = max(1, int(max_batch_size or DEFAULT_MAX_BATCH_SIZE))
+        self.max_wait = max(0.0, float(max_wait_ms or 0)) / 1000
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future, float]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch": 0,
+            "errors": 0,
+            "wait_ms_total": 0.0,
+            "infer_ms_total": 0.0,
+        }
+        self._thread = threading.Thread(
+            target=self._run, name=f"asr-batch-{name}", daemon=True
+        )
+        self._thread.start()
+
+        from core.utils.cache.manager import cache_manager
+
+        cache_manager.register_stats(f"asr_batch_{name}", self.get_stats)
+
+    def submit(self, item: Any) -> Future:
+        """提交一条识别请求，返回 concurrent.futures.Future（可用 asyncio.wrap_future 等待）"""
+        future: Future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(None)
+
+    def _collect(self) -> Optional[List[Tuple[Any, Future, float]]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # 等待时间用完后仍取走已在排队的请求，不再额外等待
+                entry = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # 已被取消的请求（如连接已关闭）不再推理
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            start = time.monotonic()
+            self._infer(batch)
+            infer_ms = (time.monotonic() - start) * 1000
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+                self._stats["wait_ms_total"] += sum(
+                    (start - enqueued) * 1000 for _, _, enqueued in batch
+                )
+                self._stats["infer_ms_total"] += infer_ms
+            logger.bind(tag=TAG).debug(
+                f"ASR批量推理: {self.name} | 批大小: {len(batch)} | 耗时: {infer_ms:.1f}ms"
+            )
+
+    def _infer(self, batch: List[Tuple[Any, Future, float]]) -> None:
+        try:
+            results = self.batch_fn([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"批量推理结果数量不匹配: {len(results)} != {len(batch)}"
+                )
+        except Exception as e:
+            if len(batch) == 1 or not self.retry_individually:
+                with self._lock:
+                    self._stats["errors"] += len(batch)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                return
+            # 整批失败时逐条重试，避免一条异常音频拖累同批的其他请求
+            logger.bind(tag=TAG).warning(f"ASR批量推理失败，改为逐条推理: {e}")
+            for entry in batch:
+                self._infer([entry])
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        requests, batches = stats.pop("requests"), stats.pop("batches")
+        wait_total, infer_total = stats.pop("wait_ms_total"), stats.pop("infer_ms_total")
+        stats.update(
+            {
+                "requests": requests,
+                "batches": batches,
+                "queued": self._queue.qsize(),
+                "avg_batch": round(requests / batches, 2) if batches else 0.0,
+                "avg_wait_ms": round(wait_total / requests, 1) if requests else 0.0,
+                "avg_infer_ms": round(infer_total / batches, 1) if batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+            }
+        )
+        return stats
+
+
+_asr_batchers: Dict[Hashable, ASRBatcher] = {}
+_asr_batchers_lock = threading.Lock()
+
+
+def get_asr_batcher(
+    name: str,
+    key: Hashable,
+    load_model: Callable[[], Any],
+    batch_fn: Callable[[Any, List[Any]], List[Any]],
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    retry_individually: bool = False,
+) -> ASRBatcher:
+    """
+    获取进程级共享的模型推理线程，不存在时加载模型并创建
+    Args:
+        name: 统计名称前缀
+        key: 模型标识（如模型类型和模型目录），相同标识共享同一个模型和推理线程
+        load_model: 加载模型的函数
+        batch_fn: 批量推理函数 batch_fn(model, items)
+        retry_individually: 整批失败时是否逐条重试（见 ASRBatcher）
+    """
+    with _asr_batchers_lock:
+        batcher = _asr_batchers.get(key)
+        if batcher is None:
+            model = load_model()
+            index = sum(1 for other in _asr_batchers.values() if other.name.startswith(name))
+            batcher = ASRBatcher(
+                f"{name}_{index}" if index else name,
+                partial(batch_fn, model),
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                model=model,
+                retry_individually=retry_individually,
+            )
+            _asr_batchers[key] = batcher
+        return batcher
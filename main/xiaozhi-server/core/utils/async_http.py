@@ -0,0 +1,165 @@
+"""
+事件循环线程中的异步HTTP客户端
+部分provider的协程运行在识别线程临时创建的事件循环中，httpx.AsyncClient 的连接池绑定在创建它的事件循环上，
+无法跨这些临时循环复用。因此由一个独立线程持有事件循环和长连接客户端（keep-alive，可用时启用HTTP/2），
+各调用方在自己的事件循环中提交协程并等待结果，工作线程也可同步等待。
+管理端客户端、聊天记录上报服务和共享的 get_async_http_client() 都基于 LoopHTTPClient
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Optional
+
+import httpx
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+try:
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class LoopHTTPClient:
+    """
+    在专用事件循环线程中运行的 httpx.AsyncClient
+    Args:
+        name: 线程名称
+        max_connections: 连接池最大连接数
+        max_keepalive_connections: 最多保持的空闲长连接数
+        keepalive_expiry: 空闲长连接保持时间（秒）
+        client_kwargs: 传给 httpx.AsyncClient 的其他参数（base_url、headers、timeout等）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60,
+        **client_kwargs,
+    ):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(ready,), name=name, daemon=True
+        )
+        self._thread.start()
+        ready.wait(timeout=5)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.client: httpx.AsyncClient = self.run_sync(
+            self._create_client(limits, client_kwargs), timeout=5
+        )
+
+    def _run(self, ready: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    async def _create_client(
+        self, limits: httpx.Limits, client_kwargs: Dict[str, Any]
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=limits, **client_kwargs)
+
+    def submit(self, coro: Coroutine) -> Future:
+        """把协程提交到客户端的事件循环，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro: Coroutine) -> Any:
+        """在任意事件循环中等待协程在客户端事件循环中的执行结果"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def run_sync(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """在工作线程中同步等待（不可在客户端自身的事件循环中调用）"""
+        return self.submit(coro).result(timeout=timeout)
+
+    def call_soon(self, callback, *args) -> None:
+        """在客户端事件循环中调度回调，可在任意线程调用"""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    async def _shutdown(self):
+        try:
+            await self.client.aclose()
+        finally:
+            self.loop.call_soon(self.loop.stop)
+
+    def close(self, timeout: float = 5) -> None:
+        """关闭连接池并停止事件循环线程；在客户端事件循环中调用时不等待"""
+        if self.loop.is_closed():
+            return
+        try:
+            future = self.submit(self._shutdown())
+        except RuntimeError:
+            return
+        if threading.current_thread() is self._thread:
+            return
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            pass
+
+
+class AsyncHTTPClient(LoopHTTPClient):
+    """进程级共享的 httpx.AsyncClient，供运行在临时事件循环中的provider发送请求"""
+
+    def __init__(self, **kwargs):
+        super().__init__("async-http", **kwargs)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "errors": 0, "bytes_sent": 0}
+
+    async def post(self, url: str, body_size: int = 0, **kwargs) -> httpx.Response:
+        """
+        在任意事件循环中发送POST请求，实际请求在共享客户端的事件循环中执行（响应体已完整读取）
+        Args:
+            url: 请求地址
+            body_size: 请求体字节数（仅用于统计）
+            kwargs: 传给 httpx.AsyncClient.post 的参数
+        """
+        try:
+            response = await self.run(self.client.post(url, **kwargs))
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["bytes_sent"] += body_size
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["http2"] = HTTP2_AVAILABLE
+        return stats
+
+
+_async_http_client: Optional[AsyncHTTPClient] = None
+_async_http_client_lock = threading.Lock()
+
+
+def get_async_http_client() -> AsyncHTTPClient:
+    """获取进程级共享的异步HTTP客户端"""
+    global _async_http_client
+    if _async_http_client is None:
+        with _async_http_client_lock:
+            if _async_http_client is None:
+                from core.utils.cache.manager import cache_manager
+
+                _async_http_client = AsyncHTTPClient()
+                cache_manager.register_stats("async_http", _async_http_client.get_stats)
+    return _async_http_client
@@ -0,0 +1,135 @@
+"""
+asyncio原生会话管线
+开启 async_pipeline 后，ASR、TTS文本与音频发送阶段以事件循环上的任务运行，
+阶段之间通过 LoopQueue 连接；阻塞型工作交给进程级线程池（对话、TTS合成、
+连接初始化各用一个），不再为每个连接创建专属线程
+"""
+
+import os
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+DEFAULT_PIPELINE_WORKERS = 32
+DEFAULT_CHAT_WORKERS = 16
+DEFAULT_INIT_WORKERS = 4
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def is_async_pipeline_enabled(config: Dict[str, Any]) -> bool:
+    """是否启用asyncio原生会话管线（配置优先，环境变量 ASYNC_PIPELINE 兜底）"""
+    value = (config or {}).get("async_pipeline", os.getenv("ASYNC_PIPELINE", "0"))
+    return str(value).lower() in ("true", "1", "yes")
+
+
+def _get_executor(
+    name: str, config: Optional[Dict[str, Any]], key: str, default: int
+) -> ThreadPoolExecutor:
+    """按名称获取进程级线程池，首次调用时按配置创建"""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                try:
+                    max_workers = int((config or {}).get(key, default))
+                except (TypeError, ValueError):
+                    max_workers = default
+                executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix=name
+                )
+                _executors[name] = executor
+    return executor
+
+
+def get_shared_executor(config: Optional[Dict[str, Any]] = None) -> ThreadPoolExecutor:
+    """进程级共享线程池：TTS合成等短小的阻塞工作"""
+    return _get_executor(
+        "pipeline", config, "async_pipeline_workers", DEFAULT_PIPELINE_WORKERS
+    )
+
+
+def get_chat_executor(config: Optional[Dict[str, Any]] = None) -> ThreadPoolExecutor:
+    """
+    对话线程池：LLM流式请求和工具调用后的回复会长时间占用线程，单独限流，
+    避免并发对话占满共享线程池、拖慢其他连接的TTS合成
+    """
+    return _get_executor(
+        "chat", config, "async_pipeline_chat_workers", DEFAULT_CHAT_WORKERS
+    )
+
+
+def get_init_executor(config: Optional[Dict[str, Any]] = None) -> ThreadPoolExecutor:
+    """连接初始化线程池：初始化组件时的模型加载、远程配置请求不占用对话和合成线程"""
+    return _get_executor(
+        "init", config, "async_pipeline_init_workers", DEFAULT_INIT_WORKERS
+    )
+
+
+def is_shared_executor(executor) -> bool:
+    return executor is not None and any(
+        executor is shared for shared in list(_executors.values())
+    )
+
+
+class LoopQueue:
+    """
+    绑定到事件循环的 asyncio.Queue 包装
+
+    生产者可以在任意线程调用 put（兼容 queue.Queue 的同步接口），
+    消费者在事件循环上 await get()
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def put(self, item, block=True, timeout=None):
+        if self._in_loop_thread():
+            self._queue.put_nowait(item)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def get_nowait(self):
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    def task_done(self):
+        try:
+            self._queue.task_done()
+        except ValueError:
+            pass
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+
+def migrate_queue(old_queue, new_queue: LoopQueue) -> LoopQueue:
+    """把旧 queue.Queue 中尚未消费的数据按顺序转移到 LoopQueue"""
+    while True:
+        try:
+            new_queue.put(old_queue.get_nowait())
+        except queue.Empty:
+            break
+    return new_queue
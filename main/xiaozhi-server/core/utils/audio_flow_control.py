@@ -1,139 +1,165 @@
 """
 音频流控模块
-包含令牌桶算法和音频流控制器的实现
+按Opus帧时长推算播放截止时间，实现定时唤醒的音频发送节奏控制
 """
 
 import asyncio
 import time
 import threading
-from collections import deque
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any
 
 
-class TokenBucket:
-    """令牌桶实现，用于限流控制"""
-
-    def __init__(self, capacity: int, refill_rate: float, initial_tokens: Optional[int] = None):
+class AudioFlowController:
+    """
+    音频流控制器，基于播放截止时间调度音频帧的发送
+
+    按Opus帧时长推算设备端的播放时间线，每一帧的发送时间都可以精确计算出来，
+    发送方按计算出的时间等待（定时唤醒）而不是轮询；开始播放时允许预先突发
+    发送 pre_roll_frames 帧，之后保持设备端缓冲维持在预缓冲帧数左右
+    """
+
+    def __init__(
+        self,
+        max_device_buffer: int = 40,
+        frame_duration_ms: float = 60,
+        pre_roll_frames: int = 3,
+        device_feedback: bool = False,
+    ):
         """
-        初始化令牌桶
+        初始化音频流控制器
 
         Args:
-            capacity: 桶容量（最大令牌数）
-            refill_rate: 令牌补充速率（每秒补充的令牌数）
-            initial_tokens: 初始令牌数，默认为桶容量
+            max_device_buffer: 设备端最大缓冲区大小（Opus帧数）
+            frame_duration_ms: 单个Opus帧的播放时长（毫秒）
+            pre_roll_frames: 播放开始时预先突发发送的帧数
+            device_feedback: 是否使用设备上报的实际播放进度校准时间线
         """
-        self.capacity = capacity
-        self.refill_rate = refill_rate
-        self.tokens = initial_tokens if initial_tokens is not None else capacity
-        self.last_refill_time = time.time()
-        self.lock = threading.Lock()
+        self.max_device_buffer = max_device_buffer
+        self.frame_duration = frame_duration_ms / 1000.0
+        self.pre_roll_frames = max(1, min(pre_roll_frames, max_device_buffer))
+        self.device_feedback = device_feedback
+        self.sent_frames_count = 0  # 已发送帧数计数
+        self.device_consumed_frames = 0  # 设备端上报的已消费帧数
+        self._play_end = 0.0  # 设备端播放完已发送音频的预计时刻（monotonic）
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def _buffered_duration(self, now: float) -> float:
+        """设备端尚未播放的音频时长（秒）"""
+        return max(0.0, self._play_end - now)
 
-    def get_tokens(self, requested_tokens: int = 1) -> bool:
+    def get_send_delay(self, frame_count: int = 1) -> float:
         """
-        获取指定数量的令牌
+        计算距离允许发送指定数量帧还需等待的时间
 
         Args:
-            requested_tokens: 请求的令牌数量
+            frame_count: 要发送的帧数
 
         Returns:
-            bool: 是否成功获取到令牌
+            float: 需要等待的秒数，0 表示可以立即发送
         """
-        with self.lock:
-            self._refill_tokens()
-
-            if self.tokens >= requested_tokens:
-                self.tokens -= requested_tokens
-                return True
-            else:
-                return False
-
-    def get_available_tokens(self) -> int:
-        """获取当前可用令牌数"""
-        with self.lock:
-            self._refill_tokens()
-            return int(self.tokens)
-
-    def _refill_tokens(self):
-        """内部方法：补充令牌"""
-        current_time = time.time()
-        time_passed = current_time - self.last_refill_time
-        tokens_to_add = time_passed * self.refill_rate
-
-        self.tokens = min(self.capacity, self.tokens + tokens_to_add)
-        self.last_refill_time = current_time
-
-
-class AudioFlowController:
-    """音频流控制器，基于令牌桶算法控制音频数据发送"""
+        with self._lock:
+            now = time.monotonic()
+            buffered = self._buffered_duration(now)
+            # 设备端缓冲保持在预缓冲帧数以内，同时不得超过设备最大缓冲
+            limit = (
+                min(self.pre_roll_frames, self.max_device_buffer) - frame_count
+            ) * self.frame_duration
+            return max(0.0, buffered - max(0.0, limit))
 
-    def __init__(self, max_device_buffer: int = 3000, refill_rate: float = 20):
+    def can_send_frames(self, frame_count: int) -> bool:
         """
-        初始化音频流控制器
+        检查是否可以立即发送指定数量的帧
 
         Args:
-            max_device_buffer: 设备端最大缓冲区大小（Opus帧数）
-            refill_rate: 令牌补充速率（每秒允许发送的帧数）
+            frame_count: 要发送的帧数
+
+        Returns:
+            bool: 是否可以发送
         """
-        self.max_device_buffer = max_device_buffer
-        self.token_bucket = TokenBucket(
-            capacity=max_device_buffer,
-            refill_rate=refill_rate,
-            initial_tokens=max_device_buffer // 2  # 初始令牌为容量的一半
-        )
-        self.sent_frames_count = 0  # 已发送帧数计数
-        self.device_consumed_frames = 0  # 设备端已消费帧数
-        self.pending_queue = deque()  # 等待发送的数据队列
-        self._lock = threading.Lock()
+        return self.get_send_delay(frame_count) <= 0
 
-    def can_send_frames(self, frame_count: int) -> bool:
+    def wait_for_slot(self, frame_count: int, max_wait: float, should_stop: Callable[[], bool]) -> bool:
         """
-        检查是否可以发送指定数量的帧
+        阻塞等待到帧的发送时间（线程中使用）
 
         Args:
             frame_count: 要发送的帧数
+            max_wait: 最大等待时间（秒）
+            should_stop: 返回 True 时放弃等待
 
         Returns:
-            bool: 是否可以发送
+            bool: 到达发送时间返回 True，超时或被停止返回 False
         """
-        with self._lock:
-            # 检查设备端缓冲区是否会溢出
-            estimated_device_buffer = self.sent_frames_count - self.device_consumed_frames
-            if estimated_device_buffer + frame_count > self.max_device_buffer:
+        deadline = time.monotonic() + max_wait
+        while True:
+            if should_stop():
                 return False
-
-            # 检查令牌桶是否有足够令牌
-            return self.token_bucket.get_tokens(frame_count)
+            delay = self.get_send_delay(frame_count)
+            if delay <= 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._wakeup.clear()
+            self._wakeup.wait(min(delay, remaining))
+
+    async def wait_for_slot_async(
+        self, frame_count: int, max_wait: float, should_stop: Callable[[], bool]
+    ) -> bool:
+        """等待到帧的发送时间（事件循环中使用），语义同 wait_for_slot"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            if should_stop():
+                return False
+            delay = self.get_send_delay(frame_count)
+            if delay <= 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
 
     def update_device_consumption(self, consumed_frames: int):
         """
-        更新设备端消费的帧数
+        更新设备端消费的帧数（设备播放进度反馈）
+
+        启用 device_feedback 时按实际剩余帧数重新校准播放时间线
 
         Args:
             consumed_frames: 设备端消费的帧数
         """
         with self._lock:
             self.device_consumed_frames += consumed_frames
+            if self.device_feedback:
+                remaining = max(0, self.sent_frames_count - self.device_consumed_frames)
+                self._play_end = time.monotonic() + remaining * self.frame_duration
+        self._wakeup.set()
 
     def record_sent_frames(self, frame_count: int):
         """
-        记录已发送的帧数
+        记录已发送的帧数，并顺延设备端的播放时间线
 
         Args:
             frame_count: 发送的帧数
         """
         with self._lock:
             self.sent_frames_count += frame_count
+            now = time.monotonic()
+            # 设备缓冲已空时从当前时刻重新开始计时
+            self._play_end = max(self._play_end, now) + frame_count * self.frame_duration
 
     def get_status(self) -> Dict[str, Any]:
         """获取流控状态信息"""
         with self._lock:
-            estimated_buffer = self.sent_frames_count - self.device_consumed_frames
+            buffered = self._buffered_duration(time.monotonic())
+            estimated_buffer = int(round(buffered / self.frame_duration))
             return {
                 "sent_frames": self.sent_frames_count,
                 "consumed_frames": self.device_consumed_frames,
                 "estimated_device_buffer": estimated_buffer,
-                "available_tokens": self.token_bucket.get_available_tokens(),
-                "pending_queue_size": len(self.pending_queue),
+                "buffered_ms": int(buffered * 1000),
+                "pre_roll_frames": self.pre_roll_frames,
                 "buffer_usage_percent": (estimated_buffer / self.max_device_buffer) * 100
             }
 
@@ -142,13 +168,8 @@ class AudioFlowController:
         with self._lock:
             self.sent_frames_count = 0
             self.device_consumed_frames = 0
-            self.pending_queue.clear()
-            # 重新初始化令牌桶
-            self.token_bucket = TokenBucket(
-                capacity=self.max_device_buffer,
-                refill_rate=self.token_bucket.refill_rate,
-                initial_tokens=self.max_device_buffer // 2
-            )
+            self._play_end = 0.0
+        self._wakeup.set()
 
 
 # 流控配置常量
@@ -160,27 +181,29 @@ class FlowControlConfig:
 
     # 默认流控参数
     DEFAULT_MAX_DEVICE_BUFFER = 40  # 设备端最大缓冲帧数
-    DEFAULT_REFILL_RATE = OPUS_FRAMES_PER_SECOND  # 默认令牌补充速率（帧/秒）
     DEFAULT_MAX_WAIT_TIME = 5.0  # 流控最大等待时间（秒）
-    DEFAULT_RETRY_INTERVAL = 0.06  # 流控重试间隔（秒）
 
     # 预缓冲参数
-    PRE_BUFFER_FRAMES = 3  # 预缓冲帧数
+    PRE_BUFFER_FRAMES = 3  # 预缓冲帧数（播放开始时的突发发送帧数）
 
     @classmethod
     def create_flow_controller(cls, max_buffer: Optional[int] = None,
-                               refill_rate: Optional[float] = None) -> AudioFlowController:
+                               pre_roll_frames: Optional[int] = None,
+                               device_feedback: bool = False) -> AudioFlowController:
         """
         创建流控制器的工厂方法
 
         Args:
             max_buffer: 最大缓冲区大小，使用默认值如果为None
-            refill_rate: 令牌补充速率，使用默认值如果为None
+            pre_roll_frames: 预缓冲帧数，使用默认值如果为None
+            device_feedback: 是否使用设备播放进度反馈
 
         Returns:
             AudioFlowController: 配置好的流控制器实例
         """
         return AudioFlowController(
             max_device_buffer=max_buffer or cls.DEFAULT_MAX_DEVICE_BUFFER,
-            refill_rate=refill_rate or cls.DEFAULT_REFILL_RATE
-        )
\ No newline at end of file
+            frame_duration_ms=cls.OPUS_FRAME_DURATION_MS,
+            pre_roll_frames=cls.PRE_BUFFER_FRAMES if pre_roll_frames is None else pre_roll_frames,
+            device_feedback=device_feedback,
+        )
@@ -0,0 +1,263 @@
+"""
+流式PCM转Opus编码
+原生解析WAV/PCM头部，使用有状态的多相加窗sinc重采样器（带抗混叠低通）转换为16kHz单声道，
+随数据到达逐帧（60ms）编码输出，WAV/PCM音频无需经过pydub/ffmpeg
+"""
+
+import math
+import struct
+from typing import Callable, Any, Optional
+
+import numpy as np
+import opuslib_next
+
+TARGET_SAMPLE_RATE = 16000
+FRAME_DURATION_MS = 60
+FRAME_SIZE = TARGET_SAMPLE_RATE * FRAME_DURATION_MS // 1000  # 960 samples/frame
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# 重采样低通滤波器：单侧过零点数、截止频率相对奈奎斯特频率的比例、Kaiser窗参数
+RESAMPLE_ZERO_CROSSINGS = 16
+RESAMPLE_ROLLOFF = 0.9
+RESAMPLE_KAISER_BETA = 8.0
+MAX_FILTER_PHASES = 1024
+
+
+class StreamingResampler:
+    """
+    有状态的多相加窗sinc重采样器（Kaiser窗），跨数据块保持相位连续
+    截止频率取输入、输出奈奎斯特频率中较低者，24k/44.1k/48k降到16k时先滤除8kHz以上的成分，避免混叠
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int = TARGET_SAMPLE_RATE):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        g = math.gcd(src_rate, dst_rate)
+        self.up = dst_rate // g
+        self.down = src_rate // g
+        # 截止频率（周期/输入样本）和滤波器单侧长度（输入样本）
+        self._cutoff = 0.5 * min(1.0, dst_rate / src_rate) * RESAMPLE_ROLLOFF
+        self._half_width = RESAMPLE_ZERO_CROSSINGS / (2 * self._cutoff)
+        self._half = int(math.ceil(self._half_width))
+        self._taps = np.arange(2 * self._half)
+        # 相位数不多时预先计算每个相位的系数，否则按输出位置即时计算
+        self._table = (
+            self._kernel(np.arange(self.up) / self.up)
+            if self.up <= MAX_FILTER_PHASES
+            else None
+        )
+        self.reset()
+
+    def _kernel(self, fracs: np.ndarray) -> np.ndarray:
+        """输出样本相对左侧输入样本的小数位置 -> 各输入样本的权重（每行归一化）"""
+        tau = fracs[:, None] + (self._half - 1) - self._taps
+        x = np.clip(tau / self._half_width, -1.0, 1.0)
+        window = np.i0(RESAMPLE_KAISER_BETA * np.sqrt(1.0 - x * x)) / np.i0(
+            RESAMPLE_KAISER_BETA
+        )
+        h = np.sinc(2 * self._cutoff * tau) * window
+        h /= h.sum(axis=1, keepdims=True)
+        return h.astype(np.float32)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """重采样一块float32样本，返回float32样本（滤波器需要前瞻，输出比输入滞后约半个滤波器长度）"""
+        if self.src_rate == self.dst_rate:
+            return samples
+        self._buf = np.concatenate((self._buf, samples.astype(np.float32, copy=False)))
+        self._received += len(samples)
+        return self._emit(self._received)
+
+    def flush(self) -> np.ndarray:
+        """输入结束：补零输出滞留在滤波器中的样本，并重置状态"""
+        if self.src_rate == self.dst_rate:
+            return np.zeros(0, dtype=np.float32)
+        end = -(-self._received * self.up // self.down)
+        self._buf = np.concatenate((self._buf, np.zeros(self._half, dtype=np.float32)))
+        out = self._emit(self._received + self._half, end)
+        self.reset()
+        return out
+
+    def _emit(self, available: int, limit: Optional[int] = None) -> np.ndarray:
+        # 输出样本 n 位于输入位置 n*down/up，需要其左右各 half 个输入样本
+        last_base = available - 1 - self._half
+        stop = ((last_base + 1) * self.up - 1) // self.down + 1 if last_base >= 0 else 0
+        if limit is not None:
+            stop = min(stop, limit)
+        if stop <= self._next_out:
+            return np.zeros(0, dtype=np.float32)
+
+        pos = np.arange(self._next_out, stop, dtype=np.int64) * self.down
+        base, phase = pos // self.up, pos % self.up
+        start = base - (self._half - 1) - self._buf_start
+        frames = self._buf[start[:, None] + self._taps]
+        weights = (
+            self._table[phase]
+            if self._table is not None
+            else self._kernel(phase / self.up)
+        )
+        out = np.einsum("ij,ij->i", frames, weights)
+        self._next_out = stop
+
+        # 丢弃后续输出不再需要的样本
+        keep_from = stop * self.down // self.up - (self._half - 1)
+        drop = min(keep_from - self._buf_start, len(self._buf))
+        if drop > 0:
+            self._buf = self._buf[drop:]
+            self._buf_start += drop
+        return out.astype(np.float32, copy=False)
+
+    def reset(self):
+        # 缓冲区从输入样本 -(half-1) 开始，流开始之前视为静音
+        self._buf = np.zeros(self._half - 1, dtype=np.float32)
+        self._buf_start = -(self._half - 1)
+        self._received = 0
+        self._next_out = 0
+
+
+class PCMOpusTranscoder:
+    """
+    流式WAV/PCM转Opus（或16kHz PCM帧）
+
+    通过 feed() 逐块输入音频数据，每凑满一帧60ms就立即回调输出，
+    finish() 时补零输出最后一帧。编码器可以跨句子复用（每个连接一个）
+    """
+
+    def __init__(
+        self,
+        is_opus: bool = True,
+        file_type: str = "wav",
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        channels: int = 1,
+        sample_width: int = 2,
+        encoder: Optional[opuslib_next.Encoder] = None,
+    ):
+        self.is_opus = is_opus
+        self.encoder = encoder
+        if is_opus and self.encoder is None:
+            self.encoder = create_opus_encoder()
+        self._pending = bytearray()
+        self._frame_buf = np.zeros(0, dtype=np.int16)
+        self._resampler: Optional[StreamingResampler] = None
+        self._header_parsed = file_type != "wav"
+        if self._header_parsed:
+            self._set_format(WAVE_FORMAT_PCM, channels, sample_rate, sample_width * 8)
+
+    def _set_format(self, fmt: int, channels: int, sample_rate: int, bits: int):
+        if fmt == WAVE_FORMAT_IEEE_FLOAT and bits != 32:
+            raise ValueError(f"不支持的浮点位深: {bits}")
+        if fmt == WAVE_FORMAT_PCM and bits not in (8, 16, 24, 32):
+            raise ValueError(f"不支持的PCM位深: {bits}")
+        if fmt not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+            raise ValueError(f"不支持的WAV编码格式: {fmt}")
+        if channels < 1 or sample_rate <= 0:
+            raise ValueError("无效的WAV头部参数")
+        self.format_tag = fmt
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.sample_width = bits // 8
+        self._resampler = StreamingResampler(sample_rate, TARGET_SAMPLE_RATE)
+
+    def _parse_wav_header(self) -> bool:
+        """解析WAV头部，成功时剥离头部并返回 True；数据不足时返回 False"""
+        data = self._pending
+        if len(data) < 12:
+            return False
+        if data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+            raise ValueError("不是有效的WAV数据")
+        offset = 12
+        fmt_found = False
+        while True:
+            if len(data) < offset + 8:
+                return False
+            chunk_id = bytes(data[offset : offset + 4])
+            chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+            body = offset + 8
+            if chunk_id == b"data":
+                if not fmt_found:
+                    raise ValueError("WAV缺少fmt块")
+                # 流式WAV的data长度可能为0或0xFFFFFFFF，忽略长度直接读取到结尾
+                del self._pending[:body]
+                self._header_parsed = True
+                return True
+            if len(data) < body + chunk_size:
+                return False
+            if chunk_id == b"fmt ":
+                fmt, channels, sample_rate = struct.unpack_from("<HHI", data, body)
+                bits = struct.unpack_from("<H", data, body + 14)[0]
+                if fmt == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                    fmt = struct.unpack_from("<H", data, body + 24)[0]
+                self._set_format(fmt, channels, sample_rate, bits)
+                fmt_found = True
+            offset = body + chunk_size + (chunk_size & 1)
+
+    def _to_float(self, raw: bytes) -> np.ndarray:
+        """将原始样本转换为单声道float32（范围-1~1）"""
+        width = self.sample_width
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            samples = np.frombuffer(raw, dtype="<f4")
+        elif width == 2:
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+        elif width == 1:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif width == 3:
+            b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+            ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+            samples = ints.astype(np.float32) / 8388608.0
+        else:
+            samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples.astype(np.float32, copy=False)
+
+    def feed(self, data: bytes, callback: Callable[[Any], Any]) -> None:
+        """输入一块音频数据，凑满的帧立即通过 callback 输出"""
+        if data:
+            self._pending += data
+        if not self._header_parsed and not self._parse_wav_header():
+            return
+        block = self.sample_width * self.channels
+        usable = len(self._pending) - len(self._pending) % block
+        if usable <= 0:
+            return
+        raw = bytes(self._pending[:usable])
+        del self._pending[:usable]
+
+        self._push(self._resampler.process(self._to_float(raw)), callback)
+
+    def _push(self, samples: np.ndarray, callback: Callable[[Any], Any]) -> None:
+        pcm = np.clip(samples * 32768.0, -32768, 32767).astype(np.int16)
+        if len(self._frame_buf):
+            pcm = np.concatenate((self._frame_buf, pcm))
+        full = len(pcm) - len(pcm) % FRAME_SIZE
+        for i in range(0, full, FRAME_SIZE):
+            self._emit(pcm[i : i + FRAME_SIZE], callback)
+        self._frame_buf = pcm[full:]
+
+    def finish(self, callback: Callable[[Any], Any]) -> None:
+        """流结束，最后不足一帧的数据补零输出"""
+        if not self._header_parsed:
+            raise ValueError("WAV头部不完整")
+        if self._resampler is not None:
+            self._push(self._resampler.flush(), callback)
+        if len(self._frame_buf):
+            last = np.zeros(FRAME_SIZE, dtype=np.int16)
+            last[: len(self._frame_buf)] = self._frame_buf
+            self._emit(last, callback)
+        self._frame_buf = np.zeros(0, dtype=np.int16)
+        self._pending.clear()
+
+    def _emit(self, frame: np.ndarray, callback: Callable[[Any], Any]) -> None:
+        if self.is_opus:
+            callback(self.encoder.encode(frame.tobytes(), FRAME_SIZE))
+        else:
+            callback(frame.tobytes())
+
+
+def create_opus_encoder() -> opuslib_next.Encoder:
+    return opuslib_next.Encoder(
+        TARGET_SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO
+    )
@@ -0,0 +1,177 @@
+"""
+意图识别结果缓存（两级）
+1. 全局层：与对话历史无关的意图（天气、时间、音乐、退出等），按归一化文本和可用函数集合缓存，所有设备共享。
+   只有识别时没有带入对话历史，或者所有参数值都出现在用户原话中时才写入全局层，
+   避免“好的”“明天呢”这类依赖上下文的结果（如沿用上一轮地点的天气查询）被其他设备命中
+2. 设备层：其他意图（包括continue_chat）依赖对话历史，按设备、归一化文本和最近历史缓存
+两级缓存都存放在 GlobalCacheManager 的 INTENT 缓存中，命中率和节省的LLM耗时计入缓存统计
+"""
+
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from core.utils.textUtils import normalize_for_match
+from .config import CacheType
+from .manager import cache_manager
+
+FLEET_NAMESPACE = "fleet"
+DEVICE_NAMESPACE = "device"
+
+DEFAULT_STATELESS_FUNCTIONS = (
+    "get_weather",
+    "get_time",
+    "get_lunar",
+    "play_music",
+    "handle_exit_intent",
+    "get_news_from_chinanews",
+    "get_news_from_newsnow",
+)
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class IntentCache:
+    """两级意图缓存"""
+
+    def __init__(self, stateless_functions: Optional[Iterable[str]] = None):
+        self.stateless_functions = frozenset(
+            stateless_functions
+            if stateless_functions is not None
+            else DEFAULT_STATELESS_FUNCTIONS
+        )
+        self._lock = threading.Lock()
+        self._llm_time_avg = 0.0  # LLM意图识别平均耗时（秒），用于估算节省的时间
+        self._stats = {
+            "fleet_hits": 0,
+            "device_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "latency_saved_ms": 0.0,
+        }
+
+    @staticmethod
+    def functions_fingerprint(functions) -> str:
+        """可用函数集合的指纹，函数不同的设备不共享全局层"""
+        names = sorted(
+            (func.get("function") or {}).get("name", "") for func in functions or []
+        )
+        return _digest(*names)
+
+    @staticmethod
+    def history_fingerprint(dialogue_history, count: int) -> str:
+        recent = dialogue_history[-count:] if count > 0 else []
+        return _digest(*(f"{msg.role}:{msg.content}" for msg in recent))
+
+    def get(self, text: str, functions_fp: str, device_id: str, history_fp: str) -> Optional[str]:
+        normalized = normalize_for_match(text)
+        if not normalized:
+            return None
+        intent = cache_manager.get(
+            CacheType.INTENT, _digest(functions_fp, normalized), FLEET_NAMESPACE
+        )
+        tier = "fleet_hits"
+        if intent is None:
+            intent = cache_manager.get(
+                CacheType.INTENT,
+                _digest(device_id, functions_fp, normalized, history_fp),
+                DEVICE_NAMESPACE,
+            )
+            tier = "device_hits"
+        with self._lock:
+            if intent is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats[tier] += 1
+                self._stats["latency_saved_ms"] += self._llm_time_avg * 1000
+        return intent
+
+    def put(
+        self,
+        text: str,
+        functions_fp: str,
+        device_id: str,
+        history_fp: str,
+        intent: str,
+        calls: Iterable[Tuple[str, Any]],
+        llm_time: float,
+        history_used: bool = True,
+    ) -> None:
+        """
+        Args:
+            calls: 识别结果中的 (函数名, 参数) 列表
+            history_used: 识别时是否带入了对话历史
+        """
+        normalized = normalize_for_match(text)
+        with self._lock:
+            # 指数滑动平均
+            self._llm_time_avg = (
+                llm_time if self._llm_time_avg == 0 else self._llm_time_avg * 0.9 + llm_time * 0.1
+            )
+        if not normalized:
+            return
+        calls = [(name, arguments) for name, arguments in calls if name]
+        if self._is_fleet_cacheable(normalized, calls, history_used):
+            cache_manager.set(
+                CacheType.INTENT, _digest(functions_fp, normalized), intent,
+                namespace=FLEET_NAMESPACE,
+            )
+        else:
+            cache_manager.set(
+                CacheType.INTENT,
+                _digest(device_id, functions_fp, normalized, history_fp),
+                intent,
+                namespace=DEVICE_NAMESPACE,
+            )
+        with self._lock:
+            self._stats["stores"] += 1
+
+    def _is_fleet_cacheable(self, normalized: str, calls, history_used: bool) -> bool:
+        if not calls or any(name not in self.stateless_functions for name, _ in calls):
+            return False
+        if not history_used:
+            return True
+        # 带入了历史时，只有结果完全由原话决定（有参数且每个参数值都出现在原话中）才能共享
+        for _, arguments in calls:
+            if isinstance(arguments, str):
+                try:
+                    arguments = json.loads(arguments)
+                except ValueError:
+                    return False
+            if not isinstance(arguments, dict) or not arguments:
+                return False
+            for value in arguments.values():
+                value = normalize_for_match(str(value))
+                if not value or value not in normalized:
+                    return False
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["fleet_hits"] + stats["device_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            round((stats["fleet_hits"] + stats["device_hits"]) / lookups, 3)
+            if lookups
+            else 0.0
+        )
+        stats["latency_saved_ms"] = round(stats["latency_saved_ms"], 1)
+        return stats
+
+
+_intent_cache: Optional[IntentCache] = None
+_intent_cache_lock = threading.Lock()
+
+
+def get_intent_cache(config: Optional[Dict[str, Any]] = None) -> IntentCache:
+    """获取进程级意图缓存；全局层函数列表可通过意图配置 fleet_cache_functions 覆盖"""
+    global _intent_cache
+    if _intent_cache is None:
+        with _intent_cache_lock:
+            if _intent_cache is None:
+                _intent_cache = IntentCache((config or {}).get("fleet_cache_functions"))
+                cache_manager.register_stats("intent", _intent_cache.get_stats)
+    return _intent_cache
@@ -4,7 +4,7 @@
 
 import time
 import threading
-from typing import Any, Optional, Dict
+from typing import Any, Callable, Optional, Dict
 from collections import OrderedDict
 from .strategies import CacheStrategy, CacheEntry
 from .config import CacheConfig, CacheType
@@ -21,6 +21,7 @@ class GlobalCacheManager:
         self._global_lock = threading.RLock()
         self._last_cleanup = time.time()
         self._stats = {"hits": 0, "misses": 0, "evictions": 0, "cleanups": 0}
+        self._stats_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
 
     @property
     def logger(self):
@@ -181,6 +182,25 @@ class GlobalCacheManager:
 
         return deleted_count
 
+    def register_stats(
+        self, name: str, provider: Callable[[], Dict[str, Any]]
+    ) -> None:
+        """注册独立缓存（如TTS音频缓存）的统计信息，与全局统计一起输出"""
+        with self._global_lock:
+            self._stats_providers[name] = provider
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        stats = dict(self._stats)
+        with self._global_lock:
+            providers = list(self._stats_providers.items())
+        for name, provider in providers:
+            try:
+                stats[name] = provider()
+            except Exception as e:
+                self.logger.debug(f"获取缓存统计失败 {name}: {e}")
+        return stats
+
     def _cleanup_expired(self, cache_name: str) -> int:
         """清理过期条目"""
         if cache_name not in self._caches:
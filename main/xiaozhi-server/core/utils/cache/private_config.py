@@ -0,0 +1,203 @@
+"""
+设备私有配置缓存
+按 device-id 缓存从 manager-api 获取的差异化配置：
+1. TTL内直接返回缓存
+2. 过期但未超过 stale_ttl 时先返回旧配置，后台重新获取（stale-while-revalidate）
+3. 同一设备的并发请求合并为一次获取
+4. 设备未找到/需要绑定等异常不缓存；后台刷新遇到这类异常时删除旧配置（设备已删除或解绑），
+   配置变更时可通过接口主动失效
+"""
+
+import copy
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from .manager import cache_manager
+
+DEFAULT_TTL = 300
+DEFAULT_STALE_TTL = 86400
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value: Dict[str, Any], fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class PrivateConfigCache:
+    """进程级设备私有配置缓存"""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        stale_ttl: float = DEFAULT_STALE_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        evict_on: Tuple[Type[BaseException], ...] = (),
+    ):
+        """
+        Args:
+            evict_on: 获取配置时抛出这些异常说明设备已不可用，删除缓存的旧配置而不是继续使用
+        """
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self._entries: Dict[str, _Entry] = {}
+        self._inflight: Dict[str, Future] = {}
+        # 失效时递增，丢弃失效前发出的请求结果：全部失效用全局代数，单设备失效只影响该设备
+        self._generation = 0
+        self._device_generations: Dict[str, int] = {}
+        self.evict_on = tuple(evict_on)
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="private-config"
+        )
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "evictions": 0,
+        }
+
+    def get(self, device_id: str, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """获取设备配置（返回副本，调用方可以修改）"""
+        if not device_id:
+            return fetch()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is not None:
+                age = now - entry.fetched_at
+                if age < self.ttl:
+                    self._stats["hits"] += 1
+                    return copy.deepcopy(entry.value)
+                if age < self.stale_ttl:
+                    self._stats["stale_hits"] += 1
+                    if device_id not in self._inflight:
+                        self._start_fetch_locked(device_id, fetch, background=True)
+                    return copy.deepcopy(entry.value)
+            future = self._inflight.get(device_id)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                owner = False
+            else:
+                self._stats["misses"] += 1
+                future = self._start_fetch_locked(device_id, fetch, background=False)
+                owner = True
+
+        if owner:
+            self._run_fetch(device_id, fetch, future)
+        return copy.deepcopy(future.result())
+
+    def _start_fetch_locked(self, device_id: str, fetch, background: bool) -> Future:
+        future: Future = Future()
+        future.generation = self._generation_locked(device_id)
+        self._inflight[device_id] = future
+        if background:
+            self._stats["refreshes"] += 1
+            self._refresher.submit(self._run_fetch, device_id, fetch, future)
+        return future
+
+    def _run_fetch(self, device_id: str, fetch, future: Future) -> None:
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(device_id, None)
+                if self.evict_on and isinstance(e, self.evict_on):
+                    # 设备已删除或解绑，不能继续提供旧配置
+                    if self._entries.pop(device_id, None) is not None:
+                        self._stats["evictions"] += 1
+                elif device_id in self._entries:
+                    # 后台刷新失败时继续使用旧配置
+                    self._stats["refresh_errors"] += 1
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._inflight.pop(device_id, None)
+            if value is not None and future.generation == self._generation_locked(
+                device_id
+            ):
+                self._entries.pop(device_id, None)
+                self._entries[device_id] = _Entry(value, time.monotonic())
+                while len(self._entries) > self.max_entries:
+                    # 字典按插入顺序，最早获取的条目最先淘汰
+                    self._entries.pop(next(iter(self._entries)))
+        future.set_result(value)
+
+    def _generation_locked(self, device_id: str) -> Tuple[int, int]:
+        return self._generation, self._device_generations.get(device_id, 0)
+
+    def invalidate(self, device_id: Optional[str] = None) -> int:
+        """使指定设备（或全部设备）的配置失效，返回删除的条目数"""
+        with self._lock:
+            if device_id is None:
+                self._generation += 1
+                self._device_generations.clear()
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            self._device_generations[device_id] = (
+                self._device_generations.get(device_id, 0) + 1
+            )
+            return 1 if self._entries.pop(device_id, None) is not None else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._stats, entries=len(self._entries), inflight=len(self._inflight)
+            )
+
+
+_private_config_cache: Optional[PrivateConfigCache] = None
+_private_config_cache_lock = threading.Lock()
+
+
+def get_private_config_cache(
+    config: Optional[Dict[str, Any]] = None,
+) -> Optional[PrivateConfigCache]:
+    """获取进程级私有配置缓存，private_config_cache_ttl 为0时返回 None"""
+    global _private_config_cache
+    config = config or {}
+    try:
+        ttl = float(config.get("private_config_cache_ttl", DEFAULT_TTL))
+    except (TypeError, ValueError):
+        ttl = DEFAULT_TTL
+    if ttl <= 0:
+        return None
+    if _private_config_cache is None:
+        with _private_config_cache_lock:
+            if _private_config_cache is None:
+                try:
+                    stale_ttl = float(
+                        config.get("private_config_stale_ttl", DEFAULT_STALE_TTL)
+                    )
+                except (TypeError, ValueError):
+                    stale_ttl = DEFAULT_STALE_TTL
+                from config.manage_api_client import (
+                    DeviceBindException,
+                    DeviceNotFoundException,
+                )
+
+                _private_config_cache = PrivateConfigCache(
+                    ttl,
+                    stale_ttl,
+                    evict_on=(DeviceNotFoundException, DeviceBindException),
+                )
+                cache_manager.register_stats(
+                    "private_config", _private_config_cache.get_stats
+                )
+    return _private_config_cache
+
+
+def invalidate_private_config_cache(device_id: Optional[str] = None) -> int:
+    """使设备私有配置缓存失效，缓存未启用时返回0"""
+    cache = _private_config_cache
+    return cache.invalidate(device_id) if cache is not None else 0
@@ -0,0 +1,176 @@
+"""
+TTS音频缓存
+按 (provider, voice, 归一化文本, 输出格式) 内容寻址，缓存最终的 Opus 帧列表；
+内存层为按字节预算淘汰的LRU，可选磁盘层使用现有的 .p3 帧格式持久化
+"""
+
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from core.utils import p3
+from .manager import cache_manager
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_TEXT_LEN = 64
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_tts_text(text: str) -> str:
+    """归一化文本：去除首尾空白并合并连续空白"""
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+class TTSAudioCache:
+    """进程级TTS音频缓存"""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        disk_dir: Optional[str] = None,
+        max_text_len: int = DEFAULT_MAX_TEXT_LEN,
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_text_len = max_text_len
+        self._entries: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(provider: str, voice: str, text: str, audio_format: str) -> str:
+        raw = "\x1f".join(
+            (provider or "", voice or "", normalize_tts_text(text), audio_format or "")
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, text: str) -> bool:
+        """只缓存较短的文本（问候语、固定回复等），长文本几乎不会重复"""
+        text = normalize_tts_text(text)
+        return bool(text) and len(text) <= self.max_text_len
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.p3")
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        """查询缓存，返回 Opus 帧列表；未命中返回 None"""
+        with self._lock:
+            frames = self._entries.get(key)
+            if frames is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return frames
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                frames = []
+                try:
+                    p3.decode_opus_from_file_stream(path, callback=frames.append)
+                except (OSError, ValueError):
+                    frames = None
+                if frames:
+                    self._put_memory(key, frames)
+                    with self._lock:
+                        self._stats["disk_hits"] += 1
+                    return frames
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, frames: List[bytes]) -> None:
+        """写入缓存（内存层，开启磁盘层时同时写入 .p3 文件）"""
+        if not frames:
+            return
+        frames = list(frames)
+        self._put_memory(key, frames)
+        with self._lock:
+            self._stats["stores"] += 1
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                p3.encode_opus_to_file(frames, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _put_memory(self, key: str, frames: List[bytes]) -> None:
+        size = sum(len(frame) for frame in frames)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = frames
+            self._sizes[key] = size
+            self._bytes += size
+            # 超出字节预算时淘汰最久未使用的条目
+            while self._bytes > self.max_bytes and self._entries:
+                oldest_key, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(oldest_key)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
+
+
+_tts_audio_cache: Optional[TTSAudioCache] = None
+_tts_audio_cache_lock = threading.Lock()
+
+
+def get_tts_audio_cache(config: Optional[Dict[str, Any]] = None) -> Optional[TTSAudioCache]:
+    """获取进程级TTS音频缓存，未开启 tts_cache_enabled 时返回 None"""
+    global _tts_audio_cache
+    config = config or {}
+    if str(config.get("tts_cache_enabled", False)).lower() not in ("true", "1", "yes"):
+        return None
+    if _tts_audio_cache is None:
+        with _tts_audio_cache_lock:
+            if _tts_audio_cache is None:
+                try:
+                    max_bytes = int(config.get("tts_cache_max_bytes", DEFAULT_MAX_BYTES))
+                except (TypeError, ValueError):
+                    max_bytes = DEFAULT_MAX_BYTES
+                try:
+                    max_text_len = int(
+                        config.get("tts_cache_max_text_len", DEFAULT_MAX_TEXT_LEN)
+                    )
+                except (TypeError, ValueError):
+                    max_text_len = DEFAULT_MAX_TEXT_LEN
+                _tts_audio_cache = TTSAudioCache(
+                    max_bytes=max_bytes,
+                    disk_dir=config.get("tts_cache_dir") or None,
+                    max_text_len=max_text_len,
+                )
+                cache_manager.register_stats("tts_audio", _tts_audio_cache.get_stats)
+    return _tts_audio_cache
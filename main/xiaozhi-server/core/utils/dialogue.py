@@ -1,8 +1,10 @@
 import uuid
 import re
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from datetime import datetime
 
+from core.utils.textUtils import estimate_tokens
+
 
 class Message:
     def __init__(
@@ -21,13 +23,116 @@ class Message:
 
 
 class Dialogue:
-    def __init__(self):
-        self.dialogue: List[Message] = []
+    """
+    对话上下文
+    - 非系统消息在 put 时渲染一次，之后增量追加，不再每轮重建
+    - 系统消息按（提示词版本, 时间, 记忆, 说话人, 历史摘要）缓存渲染结果
+    - max_turns / max_tokens 限制上下文窗口，移出窗口的消息交给 on_evict 回调（可用于生成摘要，
+      摘要通过 set_summary 写回系统消息），并保留在 archived 中供会话结束时保存记忆
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 0,
+        max_tokens: int = 0,
+        on_evict: Optional[Callable[[List[Message]], None]] = None,
+    ):
+        self.max_turns = max(0, int(max_turns or 0))
+        self.max_tokens = max(0, int(max_tokens or 0))
+        self.on_evict = on_evict
+        self.archived: List[Message] = []
+        self.summary: Optional[str] = None
+        self._system_version = 0
+        self._system_cache_key = None
+        self._system_cache: Optional[str] = None
+        self.dialogue = []
         # 获取当前时间
         self.current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+    @property
+    def dialogue(self) -> List[Message]:
+        return self._messages
+
+    @dialogue.setter
+    def dialogue(self, messages: List[Message]):
+        """整体替换消息列表时重建渲染缓存"""
+        self._messages: List[Message] = list(messages)
+        self._system_message: Optional[Message] = next(
+            (msg for msg in self._messages if msg.role == "system"), None
+        )
+        self._rendered: List[Dict] = []
+        self._tokens: List[int] = []
+        self._token_total = 0
+        self._turns = 0
+        for m in self._messages:
+            if m.role != "system":
+                self._append_rendered(m)
+        self._system_version += 1
+
     def put(self, message: Message):
-        self.dialogue.append(message)
+        self._messages.append(message)
+        if message.role == "system":
+            if self._system_message is None:
+                self._system_message = message
+                self._system_version += 1
+            return
+        self._append_rendered(message)
+        self._enforce_window()
+
+    def _append_rendered(self, m: Message):
+        rendered = []
+        self.getMessages(m, rendered)
+        self._rendered.append(rendered[0])
+        tokens = estimate_tokens(m.content if isinstance(m.content, str) else "")
+        self._tokens.append(tokens)
+        self._token_total += tokens
+        if m.role == "user":
+            self._turns += 1
+
+    def _enforce_window(self):
+        """超出轮数或token上限时，从最早的一轮开始整轮移出（至少保留最近一轮）"""
+        if not self.max_turns and not self.max_tokens:
+            return
+        evicted: List[Message] = []
+        while self._turns > 1 and (
+            (self.max_turns and self._turns > self.max_turns)
+            or (self.max_tokens and self._token_total > self.max_tokens)
+        ):
+            evicted.extend(self._evict_oldest_turn())
+        if evicted:
+            self.archived.extend(evicted)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def _evict_oldest_turn(self) -> List[Message]:
+        # 找到第二个用户消息的位置，之前的非系统消息构成最早的一轮（含工具调用及其结果）
+        seen_user = False
+        cut = 0
+        for index, msg in enumerate(self._non_system_messages()):
+            if msg.role == "user":
+                if seen_user:
+                    break
+                seen_user = True
+            cut = index + 1
+        removed = self._non_system_messages()[:cut]
+        removed_ids = {id(msg) for msg in removed}
+        self._messages = [msg for msg in self._messages if id(msg) not in removed_ids]
+        del self._rendered[:cut]
+        self._token_total -= sum(self._tokens[:cut])
+        del self._tokens[:cut]
+        self._turns -= sum(1 for msg in removed if msg.role == "user")
+        return removed
+
+    def _non_system_messages(self) -> List[Message]:
+        return [msg for msg in self._messages if msg.role != "system"]
+
+    def full_history(self) -> List[Message]:
+        """包括已移出窗口的消息在内的完整对话，用于保存记忆"""
+        return self.archived + self._messages
+
+    def set_summary(self, summary: Optional[str]):
+        """设置已移出窗口的历史摘要，附加在系统消息之后"""
+        self.summary = summary or None
 
     def getMessages(self, m, dialogue):
         if m.tool_calls is not None:
@@ -52,13 +157,72 @@ class Dialogue:
 
     def update_system_message(self, new_content: str):
         """更新或添加系统消息"""
-        # 查找第一个系统消息
-        system_msg = next((msg for msg in self.dialogue if msg.role == "system"), None)
-        if system_msg:
-            system_msg.content = new_content
+        if self._system_message:
+            self._system_message.content = new_content
+            self._system_version += 1
         else:
             self.put(Message(role="system", content=new_content))
 
+    @staticmethod
+    def _render_speakers(speakers) -> str:
+        speakers_info = "\n\n<speakers_info>"
+        for speaker_str in speakers:
+            try:
+                parts = speaker_str.split(",", 2)
+                if len(parts) >= 2:
+                    name = parts[1].strip()
+                    # 如果描述为空，则为""
+                    description = parts[2].strip() if len(parts) >= 3 else ""
+                    speakers_info += f"\n- {name}：{description}"
+            except:
+                pass
+        return speakers_info + "\n\n</speakers_info>"
+
+    def _render_system_prompt(
+        self, memory_str: str = None, voiceprint_config: dict = None
+    ) -> str:
+        content = self._system_message.content
+        current_time = (
+            datetime.now().strftime("%H:%M") if "{{current_time}}" in content else None
+        )
+        try:
+            speakers = tuple(voiceprint_config.get("speakers", []) or ())
+        except:
+            # 配置读取失败时忽略错误，不影响其他功能
+            speakers = ()
+        key = (self._system_version, current_time, memory_str, speakers, self.summary)
+        if key == self._system_cache_key:
+            return self._system_cache
+
+        # 替换时间占位符
+        enhanced_system_prompt = content
+        if current_time is not None:
+            enhanced_system_prompt = enhanced_system_prompt.replace(
+                "{{current_time}}", current_time
+            )
+
+        # 添加说话人个性化描述
+        if speakers:
+            enhanced_system_prompt += self._render_speakers(speakers)
+
+        # 使用正则表达式匹配 <memory> 标签，不管中间有什么内容
+        if memory_str is not None:
+            enhanced_system_prompt = re.sub(
+                r"<memory>.*?</memory>",
+                lambda _: f"<memory>\n{memory_str}\n</memory>",
+                enhanced_system_prompt,
+                flags=re.DOTALL,
+            )
+
+        if self.summary:
+            enhanced_system_prompt += (
+                f"\n\n<history_summary>\n{self.summary}\n</history_summary>"
+            )
+
+        self._system_cache_key = key
+        self._system_cache = enhanced_system_prompt
+        return enhanced_system_prompt
+
     def get_llm_dialogue_with_memory(
         self, memory_str: str = None, voiceprint_config: dict = None
     ) -> List[Dict[str, str]]:
@@ -66,53 +230,15 @@ class Dialogue:
         dialogue = []
 
         # 添加系统提示和记忆
-        system_message = next(
-            (msg for msg in self.dialogue if msg.role == "system"), None
-        )
-
-        if system_message:
-            # 基础系统提示
-            enhanced_system_prompt = system_message.content
-            # 替换时间占位符
-            enhanced_system_prompt = enhanced_system_prompt.replace(
-                "{{current_time}}", datetime.now().strftime("%H:%M")
+        if self._system_message:
+            dialogue.append(
+                {
+                    "role": "system",
+                    "content": self._render_system_prompt(memory_str, voiceprint_config),
+                }
             )
 
-            # 添加说话人个性化描述
-            try:
-                speakers = voiceprint_config.get("speakers", [])
-                if speakers:
-                    enhanced_system_prompt += "\n\n<speakers_info>"
-                    for speaker_str in speakers:
-                        try:
-                            parts = speaker_str.split(",", 2)
-                            if len(parts) >= 2:
-                                name = parts[1].strip()
-                                # 如果描述为空，则为""
-                                description = (
-                                    parts[2].strip() if len(parts) >= 3 else ""
-                                )
-                                enhanced_system_prompt += f"\n- {name}：{description}"
-                        except:
-                            pass
-                    enhanced_system_prompt += "\n\n</speakers_info>"
-            except:
-                # 配置读取失败时忽略错误，不影响其他功能
-                pass
-
-            # 使用正则表达式匹配 <memory> 标签，不管中间有什么内容
-            if memory_str is not None:
-                enhanced_system_prompt = re.sub(
-                    r"<memory>.*?</memory>",
-                    f"<memory>\n{memory_str}\n</memory>",
-                    enhanced_system_prompt,
-                    flags=re.DOTALL,
-                )
-            dialogue.append({"role": "system", "content": enhanced_system_prompt})
-
-        # 添加用户和助手的对话
-        for m in self.dialogue:
-            if m.role != "system":  # 跳过原始的系统消息
-                self.getMessages(m, dialogue)
+        # 添加用户和助手的对话（部分LLM实现会修改最后一条消息，因此返回副本）
+        dialogue.extend(dict(m) for m in self._rendered)
 
         return dialogue
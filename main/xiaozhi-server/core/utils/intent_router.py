@@ -0,0 +1,238 @@
+"""
+意图快速路由
+在调用意图识别LLM之前，用预编译的关键词前缀树和逐函数的正则模板匹配高置信度的指令：
+1. 退出指令（exit_commands 及常见说法）-> handle_exit_intent
+2. 播放音乐（通用说法或音乐库中的歌名）-> play_music
+3. 无地点的天气查询 -> get_weather
+4. 明确数值的音量设置 -> 设备MCP音量工具
+只有恰好一个函数命中且该函数在当前连接可用时才直接返回，其余情况交给LLM
+"""
+
+import re
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.utils.textUtils import normalize_for_match
+from core.utils.cache.manager import cache_manager
+
+# 设备端MCP音量工具（self.audio_speaker.set_volume 经 sanitize_tool_name 后的名称）
+VOLUME_TOOL_NAME = "self_audio_speaker_set_volume"
+
+# 退出指令前后允许出现的语气词（短语本身可能以这些字结尾，如“……说话了”，因此逐层剥离、每层都查询）
+_EXIT_PREFIXES = ("请", "麻烦", "你", "帮我")
+_EXIT_SUFFIXES = ("好了", "一下", "吧", "啦", "了", "呀", "啊")
+EXIT_PHRASES = ("退出系统", "结束对话", "退下", "我不想和你说话了", "exit", "quit")
+
+_PLAY_PREFIX = re.compile(
+    r"^(请|帮我|给我|我想|我要|再)*(播放|放|来|唱|听|play)(一首|一下|一曲|首|个|点|一段)?(?P<rest>.*)$"
+)
+_SONG_SUFFIX = re.compile(r"(这首歌|的歌|歌曲|吧|呀|啊|好吗|可以吗)*$")
+# 必须出现明确的音乐名词或已知歌名；只有动词（“再来”“我想听”“放”）时交给LLM结合上下文判断
+GENERIC_MUSIC_WORDS = frozenset(
+    ("歌", "音乐", "歌曲", "首歌", "一首歌", "歌吧", "音乐吧", "music", "song", "asong", "somemusic")
+)
+
+_WEATHER = re.compile(r"^(今天|现在|今日|当前)?的?天气(怎么样|如何|好吗|咋样|情况)?$")
+_VOLUME = re.compile(r"^(把|将)?音量(调到|调成|设置为|设为|设成|调为|改成|改为)(?P<value>\d{1,3})(%|百分之)?$")
+
+
+class KeywordTrie:
+    """字符前缀树，支持整句匹配和从指定位置开始的最长匹配"""
+
+    _END = "\0"
+
+    def __init__(self, words: Optional[Dict[str, Any]] = None):
+        self._root: Dict[str, Any] = {}
+        self.size = 0
+        for word, value in (words or {}).items():
+            self.add(word, value)
+
+    def add(self, word: str, value: Any) -> None:
+        if not word:
+            return
+        node = self._root
+        for char in word:
+            node = node.setdefault(char, {})
+        if self._END not in node:
+            self.size += 1
+        node[self._END] = value
+
+    def get(self, text: str) -> Optional[Any]:
+        node = self._root
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node.get(self._END)
+
+    def longest_prefix(self, text: str, start: int = 0) -> Optional[Tuple[int, Any]]:
+        """返回 text[start:] 上最长的匹配（结束位置, 值）"""
+        node = self._root
+        found = None
+        for index in range(start, len(text)):
+            node = node.get(text[index])
+            if node is None:
+                break
+            if self._END in node:
+                found = (index + 1, node[self._END])
+        return found
+
+
+def _strip_once(text: str, affixes: Tuple[str, ...], prefix: bool) -> Optional[str]:
+    for affix in affixes:
+        if len(text) > len(affix) and (
+            text.startswith(affix) if prefix else text.endswith(affix)
+        ):
+            return text[len(affix) :] if prefix else text[: -len(affix)]
+    return None
+
+
+def _exit_candidates(text: str) -> Iterable[str]:
+    """原文，以及逐个去掉开头/结尾语气词后的各种形式"""
+    head: Optional[str] = text
+    while head is not None:
+        body: Optional[str] = head
+        while body is not None:
+            yield body
+            body = _strip_once(body, _EXIT_SUFFIXES, prefix=False)
+        head = _strip_once(head, _EXIT_PREFIXES, prefix=True)
+
+
+def _function_call(name: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+    call: Dict[str, Any] = {"name": name}
+    if arguments:
+        call["arguments"] = arguments
+    return json.dumps({"function_call": call}, ensure_ascii=False)
+
+
+class IntentRouter:
+    """进程级意图快速路由（关键词索引变化时整体重建后替换）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._exit_key: Optional[Tuple[str, ...]] = None
+        self._exit_trie = KeywordTrie()
+        self._music_version: Optional[float] = None
+        self._music_trie = KeywordTrie()
+        self._rules: List[Tuple[str, Callable[[str], Optional[str]]]] = [
+            ("handle_exit_intent", self._match_exit),
+            ("play_music", self._match_music),
+            ("get_weather", self._match_weather),
+            (VOLUME_TOOL_NAME, self._match_volume),
+        ]
+        self._stats: Dict[str, Any] = {"hits": {}, "ambiguous": 0, "fallbacks": 0}
+
+    def update_exit_commands(self, commands: Iterable[str]) -> None:
+        key = tuple(commands or ())
+        if key == self._exit_key:
+            return
+        trie = KeywordTrie(
+            {normalize_for_match(word): True for word in key + EXIT_PHRASES}
+        )
+        with self._lock:
+            self._exit_key, self._exit_trie = key, trie
+
+    def update_music(self, music_cache: Dict[str, Any]) -> None:
+        """音乐列表重新扫描后（scan_time 变化）重建歌名索引"""
+        version = music_cache.get("scan_time")
+        if version is None or version == self._music_version:
+            return
+        trie = KeywordTrie()
+        for name in music_cache.get("music_file_names") or []:
+            # 子目录中的歌曲同时按文件名索引
+            trie.add(normalize_for_match(name), name)
+            trie.add(normalize_for_match(re.split(r"[\\/]", name)[-1]), name)
+        with self._lock:
+            self._music_version, self._music_trie = version, trie
+
+    def _match_exit(self, text: str) -> Optional[str]:
+        trie = self._exit_trie
+        if any(trie.get(candidate) for candidate in _exit_candidates(text)):
+            return _function_call("handle_exit_intent")
+        return None
+
+    def _match_music(self, text: str) -> Optional[str]:
+        match = _PLAY_PREFIX.match(text)
+        if not match:
+            return None
+        rest = match.group("rest")
+        if not rest:
+            return None
+        if rest in GENERIC_MUSIC_WORDS:
+            return _function_call("play_music", {"song_name": "random"})
+        found = self._music_trie.longest_prefix(rest)
+        if found is None:
+            return None
+        end, song_name = found
+        # 歌名之后只允许出现语气词
+        if _SONG_SUFFIX.fullmatch(rest[end:]) is None:
+            return None
+        return _function_call("play_music", {"song_name": song_name})
+
+    @staticmethod
+    def _match_weather(text: str) -> Optional[str]:
+        if _WEATHER.match(text):
+            return _function_call("get_weather", {"lang": "zh_CN"})
+        return None
+
+    @staticmethod
+    def _match_volume(text: str) -> Optional[str]:
+        match = _VOLUME.match(text)
+        if not match:
+            return None
+        value = int(match.group("value"))
+        if value > 100:
+            return None
+        return _function_call(VOLUME_TOOL_NAME, {"volume": value})
+
+    def route(self, text: str, available: Set[str]) -> Optional[str]:
+        """
+        返回高置信度的 function_call JSON，没有匹配或存在歧义时返回 None
+        Args:
+            text: 用户原始输入
+            available: 当前连接可用的函数名
+        """
+        normalized = normalize_for_match(text)
+        if not normalized:
+            return None
+        results = []
+        for function_name, matcher in self._rules:
+            if function_name not in available:
+                continue
+            result = matcher(normalized)
+            if result is not None:
+                results.append((function_name, result))
+        with self._lock:
+            if len(results) == 1:
+                function_name = results[0][0]
+                self._stats["hits"][function_name] = (
+                    self._stats["hits"].get(function_name, 0) + 1
+                )
+                return results[0][1]
+            self._stats["ambiguous" if results else "fallbacks"] += 1
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = dict(self._stats["hits"])
+            stats = dict(self._stats, hits=hits)
+        total = sum(hits.values()) + stats["ambiguous"] + stats["fallbacks"]
+        stats["hit_rate"] = round(sum(hits.values()) / total, 3) if total else 0.0
+        stats["music_names"] = self._music_trie.size
+        return stats
+
+
+_intent_router: Optional[IntentRouter] = None
+_intent_router_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    """获取进程级意图快速路由"""
+    global _intent_router
+    if _intent_router is None:
+        with _intent_router_lock:
+            if _intent_router is None:
+                _intent_router = IntentRouter()
+                cache_manager.register_stats("intent_router", _intent_router.get_stats)
+    return _intent_router
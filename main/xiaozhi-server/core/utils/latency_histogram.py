@@ -0,0 +1,36 @@
+"""
+耗时直方图（毫秒）
+管理端接口耗时统计和单句时延时间线共用的固定分桶直方图
+"""
+
+import bisect
+from typing import Dict
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """耗时直方图（毫秒）"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.errors = 0
+
+    def observe(self, elapsed_ms: float, ok: bool = True):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+        if not ok:
+            self.errors += 1
+
+    def snapshot(self) -> Dict:
+        buckets = {f"le_{b}": c for b, c in zip(LATENCY_BUCKETS_MS, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else 0.0,
+            "buckets": buckets,
+        }
@@ -0,0 +1,191 @@
+"""
+单句时延时间线
+每个连接持有一个 LatencyRecorder，按 utt_seq / sentence_id 记录一句话从说完到首帧音频发出的各阶段单调时间戳：
+最后一帧人声 -> 断句(EoS) -> ASR请求/返回 -> 意图识别 -> 记忆查询 -> LLM请求/首token -> 首段TTS -> 首个Opus帧 -> 首帧发送
+首帧发出（或下一句开始）时时间线结束，输出一条结构化日志记录，并计入进程级直方图
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config.logger import setup_logging
+from core.utils.latency_histogram import LatencyHistogram
+
+TAG = __name__
+logger = setup_logging()
+
+STAGES = (
+    "last_voice",
+    "eos",
+    "asr_request",
+    "asr_response",
+    "intent_start",
+    "intent_done",
+    "memory_request",
+    "memory_ready",
+    "llm_request",
+    "llm_first_token",
+    "tts_first_segment",
+    "first_opus_frame",
+    "first_frame_sent",
+)
+
+# 聚合指标：名称 -> (起始阶段, 结束阶段)
+METRICS = {
+    "vad_hangover": ("last_voice", "eos"),
+    "asr": ("asr_request", "asr_response"),
+    "eos_to_stt": ("eos", "asr_response"),
+    "intent": ("intent_start", "intent_done"),
+    "memory_wait": ("memory_request", "memory_ready"),
+    "llm_first_token": ("llm_request", "llm_first_token"),
+    "tts_first_audio": ("tts_first_segment", "first_opus_frame"),
+    "send_wait": ("first_opus_frame", "first_frame_sent"),
+    "time_to_first_audio": ("eos", "first_frame_sent"),
+}
+
+RECENT_RECORDS = 200
+
+
+class UtteranceTimeline:
+    """一句话的阶段时间戳（同一阶段只记录第一次）"""
+
+    __slots__ = ("utt_seq", "sentence_id", "marks")
+
+    def __init__(self, utt_seq: int):
+        self.utt_seq = utt_seq
+        self.sentence_id: Optional[str] = None
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, stage: str, timestamp: Optional[float] = None) -> None:
+        if stage not in self.marks:
+            self.marks[stage] = time.monotonic() if timestamp is None else timestamp
+
+    def metrics(self) -> Dict[str, float]:
+        result = {}
+        for name, (start, end) in METRICS.items():
+            if start in self.marks and end in self.marks:
+                result[name] = round((self.marks[end] - self.marks[start]) * 1000, 1)
+        return result
+
+    def to_record(self) -> Dict[str, Any]:
+        origin = self.marks.get("eos", min(self.marks.values(), default=0.0))
+        return {
+            "utt_seq": self.utt_seq,
+            "sentence_id": self.sentence_id,
+            # 各阶段相对断句时刻的偏移（毫秒，last_voice 为负值）
+            "offsets_ms": {
+                stage: round((self.marks[stage] - origin) * 1000, 1)
+                for stage in STAGES
+                if stage in self.marks
+            },
+            "metrics_ms": self.metrics(),
+            "complete": "first_frame_sent" in self.marks,
+        }
+
+
+class LatencyStats:
+    """进程级时延聚合：每个指标一个直方图，并保留最近的记录"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: LatencyHistogram() for name in METRICS}
+        self._recent = deque(maxlen=RECENT_RECORDS)
+        self._incomplete = 0
+
+    def observe(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            for name, value in record["metrics_ms"].items():
+                self._histograms[name].observe(value)
+            if not record["complete"]:
+                self._incomplete += 1
+            self._recent.append(record)
+
+    def recent(self, limit: int = 50):
+        with self._lock:
+            return list(self._recent)[-limit:]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {name: hist.snapshot() for name, hist in self._histograms.items()}
+            stats["incomplete"] = self._incomplete
+        return stats
+
+
+class LatencyRecorder:
+    """连接级时间线记录器，可在事件循环和工作线程中调用"""
+
+    def __init__(self, conn, enabled: bool = True):
+        self.conn = conn
+        self.enabled = enabled
+        self.current: Optional[UtteranceTimeline] = None
+        self._lock = threading.Lock()
+
+    def begin(self, utt_seq: int, last_voice_ms: Optional[float] = None) -> None:
+        """断句（EoS）时开始新的时间线；上一句未发出音频时作为不完整记录结束"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        timeline = UtteranceTimeline(utt_seq)
+        if last_voice_ms:
+            # last_voice_ms 为墙钟毫秒，换算到单调时钟
+            timeline.mark(
+                "last_voice", now - max(0.0, time.time() * 1000 - last_voice_ms) / 1000
+            )
+        timeline.mark("eos", now)
+        with self._lock:
+            previous, self.current = self.current, timeline
+        if previous is not None:
+            self._export(previous)
+
+    def mark(self, stage: str) -> None:
+        timeline = self.current
+        if timeline is not None:
+            timeline.mark(stage)
+
+    def set_sentence_id(self, sentence_id: str) -> None:
+        timeline = self.current
+        if timeline is not None and timeline.sentence_id is None:
+            timeline.sentence_id = sentence_id
+
+    def frame_sent(self) -> None:
+        """首帧音频发出后结束当前时间线"""
+        with self._lock:
+            timeline, self.current = self.current, None
+        if timeline is not None:
+            timeline.mark("first_frame_sent")
+            self._export(timeline)
+
+    def close(self) -> None:
+        with self._lock:
+            timeline, self.current = self.current, None
+        if timeline is not None:
+            self._export(timeline)
+
+    def _export(self, timeline: UtteranceTimeline) -> None:
+        record = timeline.to_record()
+        record["device_id"] = getattr(self.conn, "device_id", None)
+        record["session_id"] = getattr(self.conn, "session_id", None)
+        get_latency_stats().observe(record)
+        logger.bind(tag=TAG).info(
+            f"[LATENCY] {json.dumps(record, ensure_ascii=False, separators=(',', ':'))}"
+        )
+
+
+_latency_stats: Optional[LatencyStats] = None
+_latency_stats_lock = threading.Lock()
+
+
+def get_latency_stats() -> LatencyStats:
+    """获取进程级时延聚合"""
+    global _latency_stats
+    if _latency_stats is None:
+        with _latency_stats_lock:
+            if _latency_stats is None:
+                from core.utils.cache.manager import cache_manager
+
+                _latency_stats = LatencyStats()
+                cache_manager.register_stats("latency", _latency_stats.get_stats)
+    return _latency_stats
@@ -21,3 +21,18 @@ def create_instance(class_name, *args, **kwargs):
         return sys.modules[lib_name].LLMProvider(*args, **kwargs)
 
     raise ValueError(f"不支持的LLM类型: {class_name}，请检查该配置的type是否设置正确")
+
+
+def acquire_instance(class_name, config, leases=None):
+    """
+    从进程级注册表获取LLM实例，配置相同的连接共享同一个实例和HTTP连接池
+    leases 为连接持有的实例列表，连接关闭时通过注册表统一释放
+    """
+    from core.utils.provider_registry import get_provider_registry
+
+    instance = get_provider_registry().acquire(
+        "llm", class_name, config, lambda: create_instance(class_name, config)
+    )
+    if leases is not None:
+        leases.append(instance)
+    return instance
@@ -0,0 +1,86 @@
+"""
+记忆预取
+连接初始化时预取记忆快照，每轮对话在意图识别的同时发起记忆查询，
+LLM请求前最多等待 deadline，超时则使用上一次的快照，查询完成后在后台更新快照
+"""
+
+import asyncio
+import threading
+import concurrent.futures
+from typing import Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_DEADLINE_MS = 300
+
+
+class MemoryPrefetcher:
+    """每连接的记忆快照"""
+
+    def __init__(self, memory, loop: asyncio.AbstractEventLoop, deadline_ms: int = DEFAULT_DEADLINE_MS):
+        self.memory = memory
+        self.loop = loop
+        self.deadline = max(0, deadline_ms) / 1000
+        self.snapshot: Optional[str] = getattr(memory, "short_memory", None) or None
+        self._query: Optional[str] = None
+        self._future: Optional[concurrent.futures.Future] = None
+        self._lock = threading.Lock()
+
+    def _start(self, query: str) -> concurrent.futures.Future:
+        with self._lock:
+            if self._future is not None and not self._future.done() and self._query == query:
+                return self._future
+            future = asyncio.run_coroutine_threadsafe(
+                self.memory.query_memory(query), self.loop
+            )
+            self._query = query
+            self._future = future
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: concurrent.futures.Future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.bind(tag=TAG).warning(f"记忆查询失败，继续使用旧快照: {error}")
+            return
+        result = future.result()
+        if not result:
+            return
+        with self._lock:
+            # 已被更新的查询取代的结果可能晚于新结果完成，不能覆盖快照
+            if future is self._future:
+                self.snapshot = result
+
+    def refresh(self, query: str = "") -> None:
+        """后台刷新快照（连接初始化、记忆保存后调用）"""
+        try:
+            self._start(query)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"记忆预取失败: {e}")
+
+    def prefetch(self, query: str) -> None:
+        """为本轮对话提前发起查询（与意图识别并行）"""
+        if self.deadline > 0:
+            self.refresh(query)
+
+    def get(self, query: str) -> Optional[str]:
+        """
+        获取本轮对话使用的记忆（在工作线程中调用）
+        优先使用本轮查询结果，超过 deadline 时返回上一次的快照，查询继续在后台完成
+        """
+        if self.deadline <= 0:
+            return self.snapshot
+        try:
+            future = self._start(query)
+            result = future.result(timeout=self.deadline)
+            return result or self.snapshot
+        except concurrent.futures.TimeoutError:
+            logger.bind(tag=TAG).debug("记忆查询超时，使用上一次的快照")
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"记忆查询失败，使用上一次的快照: {e}")
+        return self.snapshot
@@ -1,6 +1,7 @@
 from typing import Dict, Any
 from config.logger import setup_logging
 from core.utils import tts, llm, intent, memory, vad, asr
+from core.utils.provider_registry import get_provider_registry
 
 TAG = __name__
 logger = setup_logging()
@@ -15,12 +16,14 @@ def initialize_modules(
     init_tts=False,
     init_memory=False,
     init_intent=False,
+    leases=None,
 ) -> Dict[str, Any]:
     """
     初始化所有模块组件
 
     Args:
         config: 配置字典
+        leases: 连接持有的共享实例列表，连接关闭时释放（LLM按配置在连接间共享）
 
     Returns:
         Dict[str, Any]: 包含所有初始化后的模块的字典
@@ -46,7 +49,8 @@ def initialize_modules(
         select_llm_module = config["selected_module"]["LLM"]
         llm_conf = _sel_conf("LLM", select_llm_module)
         llm_type = llm_conf.get("type", select_llm_module)
-        modules["llm"] = llm.create_instance(llm_type, llm_conf)
+        get_provider_registry(config)
+        modules["llm"] = llm.acquire_instance(llm_type, llm_conf, leases)
         logger.bind(tag=TAG).info(f"初始化组件: llm成功 {select_llm_module}")
 
     # 初始化Intent模块
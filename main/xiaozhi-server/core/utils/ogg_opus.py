@@ -0,0 +1,106 @@
+"""
+PCM编码为Ogg Opus（RFC 7845）
+在内存中把16kHz单声道PCM编码为Opus并封装为Ogg容器，用于上传给支持ogg格式的识别接口，
+相比WAV上传体积约缩小十倍
+"""
+
+import struct
+from typing import List
+
+import opuslib_next
+
+SAMPLE_RATE = 16000
+FRAME_DURATION_MS = 60
+FRAME_SIZE = SAMPLE_RATE * FRAME_DURATION_MS // 1000  # 960 samples/frame
+# Ogg Opus 的 granule position 固定按 48kHz 计数
+GRANULE_RATE = 48000
+PRE_SKIP = 312
+# 每页最多的数据包数（60ms一包，约1秒一页）
+PACKETS_PER_PAGE = 16
+
+
+def _crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    """Ogg使用的CRC32（多项式0x04C11DB7，不反转，初值0）"""
+    crc = 0
+    table = _CRC_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ table[((crc >> 24) ^ byte) & 0xFF]
+    return crc
+
+
+def _page(
+    packets: List[bytes], granule: int, serial: int, sequence: int, header_type: int
+) -> bytes:
+    lacing = bytearray()
+    for packet in packets:
+        lacing.extend(b"\xff" * (len(packet) // 255))
+        lacing.append(len(packet) % 255)
+    header = struct.pack(
+        "<4sBBqIIIB",
+        b"OggS",
+        0,
+        header_type,
+        granule,
+        serial,
+        sequence,
+        0,
+        len(lacing),
+    )
+    page = bytearray(header + lacing + b"".join(packets))
+    struct.pack_into("<I", page, 22, _ogg_crc(page))
+    return bytes(page)
+
+
+def encode_pcm_to_ogg_opus(
+    pcm: bytes, bitrate: int = 24000, serial: int = 0x58495A48
+) -> bytes:
+    """
+    16kHz单声道16位PCM编码为Ogg Opus文件
+    Args:
+        pcm: PCM数据
+        bitrate: Opus编码码率（bps）
+        serial: Ogg逻辑流序列号
+    """
+    encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_VOIP)
+    encoder.bitrate = bitrate
+
+    frame_bytes = FRAME_SIZE * 2
+    pcm = bytes(pcm)
+    if len(pcm) % frame_bytes:
+        # 最后不足一帧的数据补零
+        pcm += b"\x00" * (frame_bytes - len(pcm) % frame_bytes)
+    packets = [
+        encoder.encode(pcm[offset : offset + frame_bytes], FRAME_SIZE)
+        for offset in range(0, len(pcm), frame_bytes)
+    ]
+
+    head = struct.pack(
+        "<8sBBHIhB", b"OpusHead", 1, 1, PRE_SKIP, SAMPLE_RATE, 0, 0
+    )
+    vendor = b"xiaozhi-server"
+    tags = struct.pack("<8sI", b"OpusTags", len(vendor)) + vendor + struct.pack("<I", 0)
+    pages = [_page([head], 0, serial, 0, 0x02), _page([tags], 0, serial, 1, 0)]
+
+    granule = PRE_SKIP
+    samples_per_packet = FRAME_SIZE * GRANULE_RATE // SAMPLE_RATE
+    sequence = 2
+    for start in range(0, len(packets), PACKETS_PER_PAGE):
+        chunk = packets[start : start + PACKETS_PER_PAGE]
+        granule += samples_per_packet * len(chunk)
+        last = start + PACKETS_PER_PAGE >= len(packets)
+        pages.append(_page(chunk, granule, serial, sequence, 0x04 if last else 0))
+        sequence += 1
+    return b"".join(pages)
@@ -0,0 +1,127 @@
+"""
+Opus解码工具类
+每个连接持有一个解码阶段：每个上行Opus数据包只解码一次，
+解码后的PCM同时供VAD、ASR和声纹识别使用，语句PCM直接写入 UtteranceBuffer
+"""
+
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import opuslib_next
+from config.logger import setup_logging
+from core.utils.utterance_buffer import UtteranceBuffer
+
+TAG = __name__
+logger = setup_logging()
+
+
+class OpusDecodeStage:
+    """每连接的Opus解码阶段"""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        frame_size: int = 960,
+        recent_size: int = 8,
+    ):
+        """
+        初始化解码阶段
+
+        Args:
+            sample_rate: 解码输出采样率 (Hz)
+            channels: 解码输出通道数
+            frame_size: 单个数据包最大解码样本数（60ms@16kHz = 960）
+            recent_size: 最近解码结果环形缓冲区大小
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_size = frame_size
+        self.decoder = opuslib_next.Decoder(sample_rate, channels)
+        # 最近解码的 (数据包, PCM)，同一数据包在VAD/RMS/ASR间复用
+        self._recent: Deque[Tuple[bytes, bytes]] = deque(maxlen=recent_size)
+        # 当前语句的PCM缓冲，以及与之对应的Opus帧（与 conn.asr_audio 一一对应）
+        self.utterance = UtteranceBuffer(sample_rate=sample_rate, channels=channels)
+        self._utterance_packets: List[bytes] = []
+        self.decoded_packets = 0
+        self.reused_packets = 0
+
+    def _lookup(self, packet: bytes) -> Optional[bytes]:
+        for recent_packet, pcm in reversed(self._recent):
+            if recent_packet is packet:
+                return pcm
+        return None
+
+    def decode(self, packet: bytes) -> bytes:
+        """解码一个Opus数据包，同一数据包对象只会真正解码一次"""
+        pcm = self._lookup(packet)
+        if pcm is not None:
+            self.reused_packets += 1
+            return pcm
+        pcm = self.decoder.decode(packet, self.frame_size)
+        self._recent.append((packet, pcm))
+        self.decoded_packets += 1
+        return pcm
+
+    def append_utterance(self, packet: bytes) -> None:
+        """将数据包的PCM加入当前语句缓冲（复用已解码结果）"""
+        try:
+            pcm = self.decode(packet)
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).warning(f"Opus解码错误，跳过数据包: {e}")
+            return
+        if pcm:
+            self.utterance.append(pcm)
+            self._utterance_packets.append(packet)
+
+    def append_pcm(self, pcm: bytes) -> None:
+        """PCM格式上行时直接写入语句缓冲"""
+        if pcm:
+            self.utterance.append(pcm)
+            self._utterance_packets.append(pcm)
+
+    @property
+    def utterance_bytes(self) -> int:
+        """当前语句已缓冲的PCM字节数（O(1)）"""
+        return len(self.utterance)
+
+    def take_utterance(self, packets: List[bytes]) -> Optional[UtteranceBuffer]:
+        """
+        取出当前语句缓冲并换上新的空缓冲
+
+        Args:
+            packets: 本次要识别的音频帧（conn.asr_audio的快照）
+
+        Returns:
+            与packets内容一致的语句缓冲；若两者未对齐（有数据包未被解码过）
+            则返回None，调用方应回退到整段解码
+        """
+        utterance = self.utterance
+        buffered = self._utterance_packets
+        self._new_utterance(len(utterance))
+        expected = [packet for packet in packets if packet]
+        if len(expected) != len(buffered) or any(
+            a is not b for a, b in zip(expected, buffered)
+        ):
+            return None
+        return utterance
+
+    def _new_utterance(self, capacity: int = 0) -> None:
+        # 已交出的缓冲可能仍被识别线程引用（memoryview），因此换新而不是原地清空
+        self.utterance = UtteranceBuffer(
+            capacity=max(capacity, 0) or 64 * 1024,
+            sample_rate=self.sample_rate,
+            channels=self.channels,
+        )
+        self._utterance_packets = []
+
+    def clear_utterance(self) -> None:
+        """丢弃当前语句缓冲（开始新的拾音窗口时调用）"""
+        self.utterance.clear()
+        self._utterance_packets = []
+
+    def reset(self) -> None:
+        """重置解码器状态和所有缓冲"""
+        self.decoder = opuslib_next.Decoder(self.sample_rate, self.channels)
+        self._recent.clear()
+        self._new_utterance()
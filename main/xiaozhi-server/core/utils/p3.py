@@ -40,3 +40,13 @@ def decode_opus_from_bytes_stream(input_bytes, callback: Callable[[Any], Any]):
         if len(opus_data) != data_len:
             raise ValueError(f"Data length({len(opus_data)}) mismatch({data_len}) in the bytes.")
         callback(opus_data)
+
+
+def encode_opus_to_file(opus_frames, output_file):
+    """
+    将 Opus 数据包列表按 p3 格式写入文件（每帧4字节头部 + Opus 数据）。
+    """
+    with open(output_file, 'wb') as f:
+        for opus_data in opus_frames:
+            f.write(struct.pack('>BBH', 0, 0, len(opus_data)))
+            f.write(opus_data)
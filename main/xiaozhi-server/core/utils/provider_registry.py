@@ -0,0 +1,158 @@
+"""
+提供者实例注册表（进程级）
+
+按提供者的有效配置计算指纹，配置相同的连接共享同一个实例（及其HTTP连接池），
+避免每个新设备连接都重新建立TLS连接、各自持有空闲连接池：
+1. acquire/release 引用计数，连接关闭时释放
+2. 引用计数归零后保留 idle_ttl 秒以便重连复用，超时后关闭并淘汰
+3. 只用于无连接状态的提供者（如LLM，会话状态通过 session_id 传入）；
+   带连接状态的模块（TTS、记忆、意图）仍然每连接创建，只共享其内部的LLM
+"""
+
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from config.logger import setup_logging
+from core.utils.cache.manager import cache_manager
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_IDLE_TTL = 300
+
+
+def config_fingerprint(kind: str, provider_type: str, config: Dict[str, Any]) -> str:
+    """计算提供者配置指纹"""
+    raw = json.dumps(
+        [kind, provider_type, config or {}], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("key", "instance", "refs", "idle_since")
+
+    def __init__(self, key: str, instance: Any):
+        self.key = key
+        self.instance = instance
+        self.refs = 0
+        self.idle_since = 0.0
+
+
+class ProviderRegistry:
+    """按配置指纹共享提供者实例"""
+
+    def __init__(self, idle_ttl: float = DEFAULT_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._entries: Dict[str, _Entry] = {}
+        self._by_id: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "creates": 0, "evictions": 0}
+
+    def acquire(
+        self,
+        kind: str,
+        provider_type: str,
+        config: Dict[str, Any],
+        factory: Callable[[], Any],
+    ) -> Any:
+        """获取共享实例（引用计数+1），不存在时调用 factory 创建"""
+        key = config_fingerprint(kind, provider_type, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                self._stats["hits"] += 1
+                return entry.instance
+
+        # 在锁外创建实例，避免慢构造阻塞其他连接
+        instance = factory()
+        stale = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(key, instance)
+                self._entries[key] = entry
+                self._by_id[id(instance)] = entry
+                self._stats["creates"] += 1
+            else:
+                # 并发创建时保留先创建的实例
+                stale = instance
+            entry.refs += 1
+            evicted = self._collect_idle_locked()
+        if stale is not None:
+            evicted.append(stale)
+        self._close_all(evicted)
+        return entry.instance
+
+    def release(self, instance: Any) -> None:
+        """释放一次引用；非注册表创建的实例直接忽略"""
+        if instance is None:
+            return
+        with self._lock:
+            entry = self._by_id.get(id(instance))
+            if entry is None or entry.instance is not instance:
+                return
+            entry.refs = max(0, entry.refs - 1)
+            if entry.refs == 0:
+                entry.idle_since = time.monotonic()
+            evicted = self._collect_idle_locked()
+        self._close_all(evicted)
+
+    def release_all(self, instances: List[Any]) -> None:
+        for instance in instances:
+            self.release(instance)
+        instances.clear()
+
+    def _collect_idle_locked(self) -> List[Any]:
+        now = time.monotonic()
+        evicted = []
+        for key, entry in list(self._entries.items()):
+            if entry.refs == 0 and now - entry.idle_since >= self.idle_ttl:
+                del self._entries[key]
+                self._by_id.pop(id(entry.instance), None)
+                self._stats["evictions"] += 1
+                evicted.append(entry.instance)
+        return evicted
+
+    @staticmethod
+    def _close_all(instances: List[Any]) -> None:
+        for instance in instances:
+            close = getattr(instance, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"关闭提供者实例失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                in_use=sum(1 for entry in self._entries.values() if entry.refs),
+            )
+
+
+_provider_registry: Optional[ProviderRegistry] = None
+_provider_registry_lock = threading.Lock()
+
+
+def get_provider_registry(config: Optional[Dict[str, Any]] = None) -> ProviderRegistry:
+    """获取进程级提供者注册表"""
+    global _provider_registry
+    if _provider_registry is None:
+        with _provider_registry_lock:
+            if _provider_registry is None:
+                try:
+                    idle_ttl = float(
+                        (config or {}).get("provider_idle_ttl", DEFAULT_IDLE_TTL)
+                    )
+                except (TypeError, ValueError):
+                    idle_ttl = DEFAULT_IDLE_TTL
+                _provider_registry = ProviderRegistry(idle_ttl)
+                cache_manager.register_stats("providers", _provider_registry.get_stats)
+    return _provider_registry
@@ -0,0 +1,250 @@
+"""
+聊天记录上报服务（进程级）
+
+所有连接共享一个上报线程和独立的事件循环，不占用连接的线程池和主事件循环：
+1. 有界队列，过载时优先丢弃音频数据，其次丢弃最旧的记录
+2. 按条数和时间批量发送，配置了批量接口时多条记录合并为一次请求
+3. 在 LoopHTTPClient 的事件循环线程中用带连接池的 httpx.AsyncClient 异步发送
+"""
+
+import os
+import asyncio
+import base64
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config.logger import setup_logging
+from core.utils.async_http import LoopHTTPClient
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MAX_QUEUE_SIZE = 2000
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_MAX_CONCURRENCY = 8
+# 队列占用超过该比例时新记录不再携带音频
+AUDIO_HIGH_WATERMARK = 0.75
+
+
+class ReportItem:
+    __slots__ = ("device_id", "session_id", "chat_type", "content", "opus_data", "report_time")
+
+    def __init__(self, device_id, session_id, chat_type, content, opus_data, report_time):
+        self.device_id = device_id
+        self.session_id = session_id
+        self.chat_type = chat_type
+        self.content = content
+        self.opus_data = opus_data
+        self.report_time = report_time
+
+
+class ChatReportService:
+    """进程级聊天记录上报服务"""
+
+    def __init__(self, api_config: Dict[str, Any], service_config: Optional[Dict[str, Any]] = None):
+        service_config = service_config or {}
+        self.api_config = api_config
+        self.endpoint = "/agent/chat-history/report"
+        self.batch_endpoint = service_config.get("batch_endpoint")
+        self.max_queue_size = int(service_config.get("max_queue_size", DEFAULT_MAX_QUEUE_SIZE))
+        self.batch_size = int(service_config.get("batch_size", DEFAULT_BATCH_SIZE))
+        self.flush_interval = float(service_config.get("flush_interval", DEFAULT_FLUSH_INTERVAL))
+        self.max_concurrency = int(service_config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+        self.max_retries = int(service_config.get("max_retries", 2))
+
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._http: Optional[LoopHTTPClient] = None
+        self._running = False
+        self._stats = {
+            "submitted": 0,
+            "sent": 0,
+            "failed": 0,
+            "requests": 0,
+            "dropped": 0,
+            "audio_dropped": 0,
+        }
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._http = LoopHTTPClient(
+            "chat-report",
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+            base_url=self.api_config.get("url"),
+            headers={
+                "User-Agent": f"PythonClient/2.0 (PID:{os.getpid()})",
+                "Accept": "application/json",
+                "Authorization": "Bearer " + self.api_config.get("secret", ""),
+            },
+            timeout=self.api_config.get("timeout", 30),
+        )
+        self._wakeup = self._http.run_sync(self._create_wakeup(), timeout=5)
+        # 上报循环结束（stop）后关闭连接池和事件循环线程
+        self._http.submit(self._serve()).add_done_callback(
+            lambda _: self._http.close()
+        )
+
+    async def _create_wakeup(self) -> asyncio.Event:
+        return asyncio.Event()
+
+    def submit(self, device_id, session_id, chat_type, content, opus_data, report_time=None):
+        """提交一条上报记录，可在任意线程调用，不会阻塞"""
+        if not content:
+            return
+        item = ReportItem(
+            device_id,
+            session_id,
+            chat_type,
+            content,
+            list(opus_data) if opus_data else None,
+            report_time or int(time.time()),
+        )
+        with self._lock:
+            self._stats["submitted"] += 1
+            size = len(self._items)
+            if item.opus_data and size >= self.max_queue_size * AUDIO_HIGH_WATERMARK:
+                item.opus_data = None
+                self._stats["audio_dropped"] += 1
+            if size >= self.max_queue_size:
+                self._shed_locked()
+            self._items.append(item)
+            should_wake = len(self._items) >= self.batch_size
+        if should_wake:
+            self._notify()
+
+    def _shed_locked(self):
+        """队列已满：先去掉最旧记录的音频，实在没有音频可丢时丢弃最旧的记录"""
+        for queued in self._items:
+            if queued.opus_data:
+                queued.opus_data = None
+                self._stats["audio_dropped"] += 1
+                return
+        self._items.popleft()
+        self._stats["dropped"] += 1
+
+    def _notify(self):
+        if self._http is not None and self._wakeup is not None:
+            self._http.call_soon(self._wakeup.set)
+
+    def _take_batch(self) -> List[ReportItem]:
+        with self._lock:
+            count = min(self.batch_size, len(self._items))
+            return [self._items.popleft() for _ in range(count)]
+
+    async def _serve(self):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                await self._send_batch(batch, semaphore)
+                if len(batch) < self.batch_size:
+                    break
+
+    async def _send_batch(self, batch: List[ReportItem], semaphore: asyncio.Semaphore):
+        payloads = [self._build_payload(item) for item in batch]
+        if self.batch_endpoint:
+            async with semaphore:
+                ok = await self._post(self.batch_endpoint, {"records": payloads})
+            self._record_result(ok, len(payloads))
+            return
+        # 未配置批量接口时逐条发送，但共享连接池并发执行
+        async def send_one(payload):
+            async with semaphore:
+                ok = await self._post(self.endpoint, payload)
+            self._record_result(ok, 1)
+
+        await asyncio.gather(*(send_one(p) for p in payloads))
+
+    def _record_result(self, ok: bool, count: int):
+        with self._lock:
+            self._stats["sent" if ok else "failed"] += count
+
+    def _build_payload(self, item: ReportItem) -> Dict[str, Any]:
+        audio = None
+        if item.opus_data:
+            from core.handle.reportHandle import opus_to_wav
+
+            try:
+                audio = opus_to_wav(None, item.opus_data)
+            except Exception as e:
+                logger.bind(tag=TAG).debug(f"上报音频转换失败: {e}")
+        return {
+            "macAddress": item.device_id,
+            "sessionId": item.session_id,
+            "chatType": item.chat_type,
+            "content": item.content,
+            "reportTime": item.report_time,
+            "audioBase64": base64.b64encode(audio).decode("utf-8") if audio else None,
+        }
+
+    async def _post(self, endpoint: str, payload: Dict[str, Any]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._lock:
+                    self._stats["requests"] += 1
+                response = await self._http.client.post(endpoint, json=payload)
+                response.raise_for_status()
+                result = response.json()
+                if result.get("code") != 0:
+                    logger.bind(tag=TAG).error(f"聊天记录上报失败: {result.get('msg')}")
+                    return False
+                return True
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or (
+                    e.response.status_code in (408, 429, 500, 502, 503, 504)
+                )
+                if attempt < self.max_retries and retryable:
+                    await asyncio.sleep((2 ** attempt) * (0.5 + random.random()))
+                    continue
+                logger.bind(tag=TAG).error(f"聊天记录上报失败: {e}")
+                return False
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"聊天记录上报失败: {e}")
+                return False
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, queued=len(self._items))
+
+    def stop(self):
+        self._running = False
+        self._notify()
+
+
+_report_service: Optional[ChatReportService] = None
+_report_service_lock = threading.Lock()
+
+
+def get_report_service(config: Optional[Dict[str, Any]] = None) -> Optional[ChatReportService]:
+    """获取进程级上报服务，未配置manager-api时返回 None"""
+    global _report_service
+    if _report_service is None:
+        with _report_service_lock:
+            if _report_service is None:
+                api_config = (config or {}).get("manager-api")
+                if not api_config or not api_config.get("url"):
+                    return None
+                _report_service = ChatReportService(
+                    api_config, (config or {}).get("chat_report", {})
+                )
+                _report_service.start()
+    return _report_service
@@ -1,4 +1,5 @@
 import json
+import unicodedata
 
 TAG = __name__
 EMOJI_MAP = {
@@ -111,3 +112,39 @@ def is_emoji(char):
 def check_emoji(text):
     """去除文本中的所有emoji表情"""
     return ''.join(char for char in text if not is_emoji(char) and char != "\n")
+
+
+def fold_kana(text):
+    """将片假名转换为平假名"""
+    return "".join(
+        chr(ord(char) - 0x60) if "\u30a1" <= char <= "\u30f6" else char
+        for char in text
+    )
+
+
+def normalize_for_match(text):
+    """
+    归一化文本用于匹配和缓存键：全角/半角统一（NFKC）、英文小写、
+    片假名转平假名，去除所有空白、标点和表情符号
+    """
+    text = fold_kana(unicodedata.normalize("NFKC", text or "").lower())
+    return "".join(
+        char
+        for char in text
+        if not (
+            char.isspace()
+            or unicodedata.category(char).startswith("P")
+            or is_punctuation_or_emoji(char)
+        )
+    )
+
+
+def estimate_tokens(text):
+    """粗略估算token数：CJK字符约1个token，其他字符约4个字符1个token"""
+    text = text or ""
+    cjk = sum(
+        1
+        for char in text
+        if "\u2e80" <= char <= "\u9fff" or "\uac00" <= char <= "\ud7af"
+    )
+    return cjk + (len(text) - cjk + 3) // 4
@@ -109,4 +109,95 @@ class MarkdownCleaner:
         """
         for regex, replacement in MarkdownCleaner.REGEXES:
             text = regex.sub(replacement, text)
-        return text.strip()
\ No newline at end of file
+        return text.strip()
+
+class SentenceSegmenter:
+    """
+    LLM流式输出的增量分句器
+
+    只保留尚未输出的尾部文本，每段新文本只用预编译的字符类扫描一次，记录每种标点最后出现的位置；
+    断句位置与原逐标点 rfind 的规则一致：取各标点最后一次出现位置中最靠前的一个。
+    第一句话使用更宽松的标点集合（含逗号）以尽快开始合成；超过最大长度仍没有标点时强制输出
+    """
+
+    def __init__(
+        self,
+        punctuations,
+        first_sentence_punctuations,
+        min_length: int = 0,
+        first_min_length: int = 0,
+        max_length: int = 0,
+    ):
+        self._punctuations = frozenset(punctuations)
+        self._first_punctuations = frozenset(first_sentence_punctuations)
+        self._pattern = self._compile(self._punctuations | self._first_punctuations)
+        self.min_length = min_length
+        self.first_min_length = first_min_length
+        self.max_length = max_length
+        self.reset()
+
+    @staticmethod
+    def _compile(punctuations):
+        return re.compile(
+            "|".join(re.escape(p) for p in sorted(punctuations, key=len, reverse=True))
+        )
+
+    def reset(self):
+        self._tail = ""
+        self._scan_pos = 0
+        # 标点 -> 在尾部文本中最后一次出现的结束位置
+        self._last_end = {}
+        self.is_first_sentence = True
+
+    @property
+    def tail(self) -> str:
+        """尚未输出的文本"""
+        return self._tail
+
+    def _scan(self, start: int) -> None:
+        for match in self._pattern.finditer(self._tail, start):
+            self._last_end[match.group()] = match.end()
+        self._scan_pos = len(self._tail)
+
+    def feed(self, text: str):
+        """
+        输入一段新文本
+
+        Returns:
+            可以合成的分段原文（含标点），没有可输出的分段时返回 None
+        """
+        if text:
+            self._tail += text
+        self._scan(self._scan_pos)
+        if self.is_first_sentence:
+            punctuations, min_length = self._first_punctuations, self.first_min_length
+        else:
+            punctuations, min_length = self._punctuations, self.min_length
+
+        candidates = [
+            end
+            for punct, end in self._last_end.items()
+            if punct in punctuations and end >= min_length
+        ]
+        if candidates:
+            return self._take(min(candidates))
+        if self.max_length and len(self._tail) >= self.max_length:
+            # 没有标点的长文本：尽量在空白处切分，否则按最大长度切分
+            cut = self._tail.rfind(" ", self.max_length // 2, self.max_length)
+            return self._take(cut + 1 if cut != -1 else self.max_length)
+        return None
+
+    def flush(self) -> str:
+        """取出剩余的全部文本并重置状态"""
+        segment = self._tail
+        self.reset()
+        return segment
+
+    def _take(self, end: int) -> str:
+        segment = self._tail[:end]
+        self._tail = self._tail[end:]
+        self._last_end = {}
+        self.is_first_sentence = False
+        # 剩余文本中可能已经包含标点
+        self._scan(0)
+        return segment
@@ -12,7 +12,7 @@ import requests
 # opuslib_next and pydub are imported inside functions that need them.
 import copy
 from pydub import AudioSegment
-import opuslib_next
+from core.utils.audio_transcoder import PCMOpusTranscoder, create_opus_encoder
 
 TAG = __name__
 emoji_map = {
@@ -218,6 +218,10 @@ def audio_to_data_stream(audio_file_path, is_opus=True, callback: Callable[[Any]
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
         file_type = file_type.lstrip(".")
+    if file_type == "wav":
+        with open(audio_file_path, "rb") as f:
+            audio_bytes_to_data_stream(f.read(), "wav", is_opus, callback)
+        return
     # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
     audio = AudioSegment.from_file(
         audio_file_path, format=file_type, parameters=["-nostdin"]
@@ -231,9 +235,17 @@ def audio_to_data_stream(audio_file_path, is_opus=True, callback: Callable[[Any]
     pcm_to_data_stream(raw_data, is_opus, callback)
 
 
-def audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback: Callable[[Any], Any]) -> None:
+def audio_bytes_to_data_stream(
+    audio_bytes,
+    file_type,
+    is_opus,
+    callback: Callable[[Any], Any],
+    sample_rate: int = 16000,
+    encoder=None,
+) -> None:
     """
-    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3
+    直接用音频二进制数据转为opus/pcm数据，支持wav、pcm、mp3、p3
+    wav/pcm 使用进程内流式转码，其他格式仍经过pydub；encoder 为可复用的Opus编码器
     """
     try:
         print(f"※ここだよ！ audio_bytes_to_data_stream開始 file_type={file_type}, is_opus={is_opus}, bytes={len(audio_bytes) if audio_bytes else 'None'}")
@@ -242,6 +254,27 @@ def audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback: Callab
             # 直接用p3解码
             print(f"※ここだよ！ p3形式で解码开始")
             return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
+        elif file_type in ("wav", "pcm"):
+            try:
+                transcoder = PCMOpusTranscoder(
+                    is_opus=is_opus,
+                    file_type=file_type,
+                    sample_rate=sample_rate,
+                    encoder=encoder,
+                )
+                transcoder.feed(audio_bytes, callback)
+                transcoder.finish(callback)
+                return
+            except ValueError as e:
+                # 头部无法原生解析（如压缩编码的WAV）时回退到pydub
+                if file_type == "pcm":
+                    raise
+                print(f"※ここだよ！ WAV原生解析失败，回退到pydub: {e}")
+            audio = AudioSegment.from_file(
+                BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
+            )
+            audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+            pcm_to_data_stream(audio.raw_data, is_opus, callback, encoder=encoder)
         else:
             # 其他格式用pydub
             print(f"※ここだよ！ pydub形式で解析开始 format={file_type}")
@@ -252,7 +285,7 @@ def audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback: Callab
             audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
             raw_data = audio.raw_data
             print(f"※ここだよ！ raw_data取得完了 bytes={len(raw_data)}")
-            pcm_to_data_stream(raw_data, is_opus, callback)
+            pcm_to_data_stream(raw_data, is_opus, callback, encoder=encoder)
             print(f"※ここだよ！ pcm_to_data_stream完了")
     except Exception as e:
         print(f"※ここだよ！ audio_bytes_to_data_stream エラー: {e}")
@@ -261,9 +294,10 @@ def audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback: Callab
         raise
 
 
-def pcm_to_data_stream(raw_data, is_opus=True, callback: Callable[[Any], Any] = None):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
+def pcm_to_data_stream(raw_data, is_opus=True, callback: Callable[[Any], Any] = None, encoder=None):
+    # 初始化Opus编码器（调用方传入时复用）
+    if is_opus and encoder is None:
+        encoder = create_opus_encoder()
 
     # 编码参数
     frame_duration = 60  # 60ms per frame
@@ -0,0 +1,88 @@
+"""
+语句音频缓冲
+预分配、可增长的PCM缓冲区，头部预留WAV文件头位置；长度O(1)获取，
+ASR、声纹识别和保存文件通过 memoryview 读取同一份数据，无需拼接复制
+"""
+
+import struct
+
+WAV_HEADER_SIZE = 44
+DEFAULT_CAPACITY = 64 * 1024  # 约2秒 16kHz/16bit/单声道
+
+
+class UtteranceBuffer:
+    """单句PCM缓冲（16bit小端）"""
+
+    __slots__ = ("sample_rate", "channels", "sample_width", "frames", "_buf", "_size")
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        sample_width: int = 2,
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.frames = 0  # 已写入的数据块数
+        self._buf = bytearray(WAV_HEADER_SIZE + max(capacity, 0))
+        self._size = 0  # PCM字节数
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, data) -> None:
+        """追加一块PCM数据；容量不足时按倍数扩容"""
+        n = len(data)
+        if not n:
+            return
+        end = WAV_HEADER_SIZE + self._size + n
+        if end > len(self._buf):
+            new_len = max(end, len(self._buf) * 2)
+            self._buf.extend(bytes(new_len - len(self._buf)))
+        self._buf[WAV_HEADER_SIZE + self._size : end] = data
+        self._size += n
+        self.frames += 1
+
+    def pcm_view(self) -> memoryview:
+        """PCM数据视图（不复制）。导出视图后不应再追加数据"""
+        size = self._size - self._size % self.sample_width
+        return memoryview(self._buf)[WAV_HEADER_SIZE : WAV_HEADER_SIZE + size]
+
+    def wav_view(self) -> memoryview:
+        """就地写入WAV头部，返回完整WAV文件视图（不复制）"""
+        size = self._size - self._size % self.sample_width
+        byte_rate = self.sample_rate * self.channels * self.sample_width
+        struct.pack_into(
+            "<4sI4s4sIHHIIHH4sI",
+            self._buf,
+            0,
+            b"RIFF",
+            36 + size,
+            b"WAVE",
+            b"fmt ",
+            16,
+            1,
+            self.channels,
+            self.sample_rate,
+            byte_rate,
+            self.channels * self.sample_width,
+            self.sample_width * 8,
+            b"data",
+            size,
+        )
+        return memoryview(self._buf)[: WAV_HEADER_SIZE + size]
+
+    def clear(self) -> None:
+        """清空数据，保留已分配的容量"""
+        self._size = 0
+        self.frames = 0
+
+    @classmethod
+    def from_chunks(cls, chunks, **kwargs) -> "UtteranceBuffer":
+        """由PCM数据块列表构建缓冲（只复制一次）"""
+        buffer = cls(capacity=sum(len(chunk) for chunk in chunks), **kwargs)
+        for chunk in chunks:
+            buffer.append(chunk)
+        return buffer
@@ -130,9 +130,11 @@ class WebSocketServer:
             use_tuple = True
         else:
             websocket = args[0]
-            request_headers = args[1]
+            request = args[1]
+            # websockets>=14 passes a Request object; headers live in request.headers
+            request_headers = getattr(request, "headers", request)
             # derive path if available
-            path = kwargs.get("path", "/")
+            path = getattr(request, "path", kwargs.get("path", "/"))
             use_tuple = False
         # 非WSのHTTPヘルスチェック/OTA応答をここで返す
         # WebSocketハンドシェイク以外のリクエストはここに来る
@@ -166,14 +168,24 @@ class WebSocketServer:
             if use_tuple:
                 return 200, headers, body
             else:
-                return await websocket.respond(200, body=body, headers=headers)
+                return self._respond(websocket, 200, body, headers)
         except Exception:
             body = b"Internal Server Error\n"
             headers = [("Content-Type", "text/plain; charset=utf-8")]
             if use_tuple:
                 return 500, headers, body
             else:
-                return await websocket.respond(500, body=body, headers=headers)
+                return self._respond(websocket, 500, body, headers)
+
+    @staticmethod
+    def _respond(websocket, status, body, headers):
+        # websockets>=14: respond(status, text) builds a text/plain response synchronously
+        response = websocket.respond(status, body.decode("utf-8"))
+        for name, value in headers:
+            if name in response.headers:
+                del response.headers[name]
+            response.headers[name] = value
+        return response
 
     async def update_config(self) -> bool:
         """更新服务器配置并重新初始化组件
@@ -0,0 +1,447 @@
+"""
+端到端离线压测：在子进程中启动 WebSocketServer（ASR/LLM/TTS使用内置桩模块，不访问网络），
+模拟N台ESP32设备完成 hello 握手、按实时节奏发送Opus音频（listen start/stop，手动拾音模式）并接收TTS音频，
+统计首帧音频时延、说完话到STT结果的时延（p50/p95/p99）以及服务进程的CPU、内存和线程数
+
+用法:
+  python performance_tester/performance_tester_load.py --devices 50 --turns 3 --ramp 10
+  python performance_tester/performance_tester_load.py --wav config/assets/test.wav --json tmp/load.json
+"""
+
+import os
+import sys
+import math
+import copy
+import json
+import time
+import wave
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+description = "端到端离线压测（模拟设备 + 桩ASR/LLM/TTS）"
+
+SAMPLE_RATE = 16000
+FRAME_DURATION_MS = 60
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_DURATION_MS // 1000
+
+
+def build_stub_config(base_config: Dict, args) -> Dict:
+    """在主配置基础上替换为桩模块，并关闭认证、智控台和TTS缓存"""
+    config = copy.deepcopy(base_config)
+    config["read_config_from_api"] = False
+    config.pop("manager-api", None)
+    server = config.setdefault("server", {})
+    server["ip"] = "127.0.0.1"
+    server["port"] = args.port
+    server.setdefault("auth", {})["enabled"] = False
+    config["tts_cache_enabled"] = bool(args.tts_cache)
+    config.setdefault("log", {})["log_level"] = args.log_level
+
+    config.setdefault("ASR", {})["StubASR"] = {
+        "type": "stub",
+        "latency_ms": args.asr_latency_ms,
+        "output_dir": "tmp/",
+    }
+    config.setdefault("LLM", {})["StubLLM"] = {
+        "type": "stub",
+        "first_token_ms": args.llm_first_token_ms,
+        "token_ms": args.llm_token_ms,
+    }
+    config.setdefault("TTS", {})["StubTTS"] = {
+        "type": "stub",
+        "latency_ms": args.tts_latency_ms,
+        "output_dir": "tmp/",
+    }
+    config.setdefault("Memory", {})["nomem"] = {"type": "nomem"}
+    config.setdefault("Intent", {})["nointent"] = {"type": "nointent"}
+
+    selected = config.setdefault("selected_module", {})
+    selected.update(
+        {
+            "ASR": "StubASR",
+            "LLM": "StubLLM",
+            "TTS": "StubTTS",
+            "Memory": "nomem",
+            "Intent": "nointent",
+        }
+    )
+    # 移除依赖外部服务的可选模块
+    for module in ("VLLM", "VoicePrint"):
+        selected.pop(module, None)
+    config.pop("voiceprint", None)
+    return config
+
+
+def _serve(config_path: str):
+    """子进程入口：只运行WebSocket服务"""
+    os.chdir(PROJECT_ROOT)
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    from core.websocket_server import WebSocketServer
+
+    async def run():
+        await WebSocketServer(config).start()
+
+    asyncio.run(run())
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _synthetic_speech(seconds: float) -> np.ndarray:
+    """没有提供WAV时生成类语音信号（音节节奏调制的谐波 + 噪声），确定性可复现"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    # 音节之间不降到静音，否则服务端VAD会在句中判定说话结束、提前切分
+    envelope = 0.4 + 0.6 * np.clip(np.sin(2 * np.pi * 3.5 * t), 0, None)
+    signal = (voiced + 0.05 * rng.standard_normal(t.size)) * envelope
+    return (signal / np.max(np.abs(signal)) * 12000).astype("<i2")
+
+
+def _read_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: 仅支持16bit PCM WAV")
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+        if wf.getnchannels() > 1:
+            pcm = pcm.reshape(-1, wf.getnchannels())[:, 0]
+        rate = wf.getframerate()
+    if rate != SAMPLE_RATE:
+        # 线性插值重采样，压测夹具对音质没有要求
+        positions = np.arange(0, len(pcm), rate / SAMPLE_RATE)
+        pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype("<i2")
+    return pcm
+
+
+def encode_fixture(pcm: np.ndarray) -> List[bytes]:
+    """PCM编码为60ms一帧的Opus包（与ESP32固件一致）"""
+    import opuslib_next
+
+    encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_VOIP)
+    remainder = len(pcm) % FRAME_SAMPLES
+    if remainder:
+        pcm = np.concatenate([pcm, np.zeros(FRAME_SAMPLES - remainder, dtype="<i2")])
+    return [
+        encoder.encode(pcm[i : i + FRAME_SAMPLES].tobytes(), FRAME_SAMPLES)
+        for i in range(0, len(pcm), FRAME_SAMPLES)
+    ]
+
+
+class DeviceResult:
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.connect_ms: Optional[float] = None
+        self.eos_to_stt_ms: List[float] = []
+        self.first_audio_ms: List[float] = []
+        self.turn_ms: List[float] = []
+        self.audio_frames = 0
+        self.errors: List[str] = []
+
+
+async def run_device(index: int, args, fixtures: List[List[bytes]], start_delay: float) -> DeviceResult:
+    import websockets
+
+    device_id = f"load-test-{index:04d}"
+    result = DeviceResult(device_id)
+    await asyncio.sleep(start_delay)
+    uri = f"ws://127.0.0.1:{args.port}/xiaozhi/v1/?device-id={device_id}&client-id={device_id}"
+    loop = asyncio.get_running_loop()
+    try:
+        connect_start = loop.time()
+        # 服务端要求协商子协议（v1 / xiaozhi-v1）
+        async with websockets.connect(
+            uri, max_size=None, open_timeout=30, subprotocols=["v1"]
+        ) as ws:
+            await ws.send(
+                json.dumps(
+                    {
+                        "type": "hello",
+                        "version": 1,
+                        "transport": "websocket",
+                        "audio_params": {
+                            "format": "opus",
+                            "sample_rate": SAMPLE_RATE,
+                            "channels": 1,
+                            "frame_duration": FRAME_DURATION_MS,
+                        },
+                    }
+                )
+            )
+            while True:
+                message = await asyncio.wait_for(ws.recv(), timeout=30)
+                if isinstance(message, str) and json.loads(message).get("type") == "hello":
+                    break
+            result.connect_ms = (loop.time() - connect_start) * 1000
+
+            for turn in range(args.turns):
+                frames = fixtures[(index + turn) % len(fixtures)]
+                await _run_turn(ws, frames, result, args.turn_timeout)
+                await asyncio.sleep(args.think)
+    except Exception as e:
+        result.errors.append(f"{type(e).__name__}: {e}")
+    return result
+
+
+async def _run_turn(ws, frames: List[bytes], result: DeviceResult, timeout: float):
+    loop = asyncio.get_running_loop()
+    await ws.send(json.dumps({"type": "listen", "state": "start", "mode": "manual"}))
+    # 按播放时间线发送，模拟麦克风实时采集
+    started = loop.time()
+    for i, frame in enumerate(frames):
+        delay = started + i * FRAME_DURATION_MS / 1000 - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await ws.send(frame)
+    await ws.send(json.dumps({"type": "listen", "state": "stop", "mode": "manual"}))
+    end_of_speech = loop.time()
+
+    got_stt = got_audio = False
+    deadline = end_of_speech + timeout
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            result.errors.append("turn timeout")
+            return
+        message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+        now = loop.time()
+        if isinstance(message, bytes):
+            result.audio_frames += 1
+            if not got_audio:
+                got_audio = True
+                result.first_audio_ms.append((now - end_of_speech) * 1000)
+            continue
+        data = json.loads(message)
+        if data.get("type") == "stt" and not got_stt:
+            got_stt = True
+            result.eos_to_stt_ms.append((now - end_of_speech) * 1000)
+        elif data.get("type") == "tts" and data.get("state") == "stop":
+            result.turn_ms.append((now - end_of_speech) * 1000)
+            return
+
+
+class ResourceSampler:
+    """定时采样服务进程的CPU、RSS和线程数"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        import psutil
+
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self.process.cpu_percent(None)
+
+    def sample(self) -> Dict[str, float]:
+        with self.process.oneshot():
+            sample = {
+                "cpu": self.process.cpu_percent(None),
+                "rss_mb": self.process.memory_info().rss / 1024 / 1024,
+                "threads": self.process.num_threads(),
+            }
+        self.samples.append(sample)
+        return sample
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.sample()
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # nearest-rank 百分位
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(results: List[DeviceResult], baseline: Dict[str, float], sampler: ResourceSampler, devices: int) -> Dict:
+    def stats(values: List[float]) -> Dict:
+        return {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else None,
+        }
+
+    peak = {
+        key: max(sample[key] for sample in sampler.samples)
+        for key in ("cpu", "rss_mb", "threads")
+    } if sampler.samples else dict(baseline)
+    avg_cpu = (
+        sum(sample["cpu"] for sample in sampler.samples) / len(sampler.samples)
+        if sampler.samples
+        else 0.0
+    )
+    connected = sum(1 for r in results if r.connect_ms is not None)
+    per_connection = max(connected, 1)
+    return {
+        "devices": devices,
+        "connected": connected,
+        "errors": [f"{r.device_id}: {e}" for r in results for e in r.errors],
+        "connect_ms": stats([r.connect_ms for r in results if r.connect_ms is not None]),
+        "time_to_first_audio_ms": stats([v for r in results for v in r.first_audio_ms]),
+        "eos_to_stt_ms": stats([v for r in results for v in r.eos_to_stt_ms]),
+        "turn_ms": stats([v for r in results for v in r.turn_ms]),
+        "server": {
+            "baseline": baseline,
+            "peak": peak,
+            "avg_cpu": avg_cpu,
+            "cpu_per_connection": avg_cpu / per_connection,
+            "rss_mb_per_connection": (peak["rss_mb"] - baseline["rss_mb"]) / per_connection,
+            "threads_per_connection": (peak["threads"] - baseline["threads"]) / per_connection,
+        },
+    }
+
+
+def print_report(report: Dict):
+    from tabulate import tabulate
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    rows = [
+        [name, report[key]["count"], fmt(report[key]["p50"]), fmt(report[key]["p95"]),
+         fmt(report[key]["p99"]), fmt(report[key]["max"])]
+        for name, key in (
+            ("连接握手", "connect_ms"),
+            ("说完话→STT", "eos_to_stt_ms"),
+            ("说完话→首帧音频", "time_to_first_audio_ms"),
+            ("说完话→TTS结束", "turn_ms"),
+        )
+    ]
+    print(f"\n设备数: {report['devices']}，成功连接: {report['connected']}，错误: {len(report['errors'])}")
+    print(tabulate(rows, headers=["指标(ms)", "样本", "p50", "p95", "p99", "max"], tablefmt="github"))
+    server = report["server"]
+    print(
+        tabulate(
+            [
+                ["CPU %", fmt(server["baseline"]["cpu"]), fmt(server["peak"]["cpu"]), f"{server['cpu_per_connection']:.2f}"],
+                ["RSS MB", fmt(server["baseline"]["rss_mb"]), fmt(server["peak"]["rss_mb"]), f"{server['rss_mb_per_connection']:.2f}"],
+                ["线程", server["baseline"]["threads"], server["peak"]["threads"], f"{server['threads_per_connection']:.2f}"],
+            ],
+            headers=["服务进程", "空载", "峰值", "每连接"],
+            tablefmt="github",
+        )
+    )
+    for error in report["errors"][:10]:
+        print(f"  错误 {error}")
+
+
+async def run_load_test(args) -> Dict:
+    from config.settings import load_config
+
+    os.chdir(PROJECT_ROOT)
+    config = build_stub_config(load_config(), args)
+
+    if args.wav:
+        fixtures = [encode_fixture(_read_wav(path)) for path in args.wav]
+    else:
+        fixtures = [encode_fixture(_synthetic_speech(args.speech_seconds))]
+
+    os.makedirs("tmp", exist_ok=True)
+    config_path = os.path.join("tmp", f"load_test_config_{args.port}.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    server_log = open(os.path.join("tmp", "load_test_server.log"), "wb")
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", config_path],
+        stdout=server_log,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        if not _wait_for_port(args.port, args.startup_timeout):
+            raise RuntimeError("服务进程启动超时，请查看 tmp/load_test_server.log")
+        sampler = ResourceSampler(server.pid)
+        await asyncio.sleep(1)
+        baseline = sampler.sample()
+        sampler.samples.clear()
+
+        stop = asyncio.Event()
+        sampler_task = asyncio.create_task(sampler.run(stop))
+        ramp_step = args.ramp / args.devices if args.devices > 1 else 0
+        results = await asyncio.gather(
+            *(run_device(i, args, fixtures, i * ramp_step) for i in range(args.devices))
+        )
+        stop.set()
+        await sampler_task
+        return summarize(results, baseline, sampler, args.devices)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        server_log.close()
+        os.remove(config_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--devices", type=int, default=10, help="模拟设备数")
+    parser.add_argument("--turns", type=int, default=3, help="每台设备的对话轮数")
+    parser.add_argument("--ramp", type=float, default=5.0, help="所有设备在多少秒内陆续接入")
+    parser.add_argument("--think", type=float, default=1.0, help="每轮结束后的停顿秒数")
+    parser.add_argument("--wav", nargs="*", help="16bit PCM WAV夹具，不指定时使用合成语音")
+    parser.add_argument("--speech-seconds", type=float, default=2.0, help="合成语音时长")
+    parser.add_argument("--port", type=int, default=0, help="服务端口，0为自动选择")
+    parser.add_argument("--asr-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--tts-latency-ms", type=float, default=150)
+    parser.add_argument("--tts-cache", action="store_true", help="开启TTS音频缓存")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+    if args.port == 0:
+        args.port = _free_port()
+    return args
+
+
+async def main(argv=None):
+    args = parse_args(argv or [])
+    report = await run_load_test(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--serve":
+        _serve(sys.argv[2])
+    else:
+        asyncio.run(main(sys.argv[1:]))
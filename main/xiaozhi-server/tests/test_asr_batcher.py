@@ -0,0 +1,60 @@
+import time
+
+from core.utils.asr_batcher import ASRBatcher, get_asr_batcher
+
+
+def test_registry_loads_each_model_once():
+    loads = []
+
+    def load():
+        loads.append(1)
+        return "model"
+
+    def batch(model, items):
+        return [f"{model}:{item}" for item in items]
+
+    first = get_asr_batcher("test_model", ("test_model", "a"), load, batch)
+    second = get_asr_batcher("test_model", ("test_model", "a"), load, batch)
+    other = get_asr_batcher("test_model", ("test_model", "b"), load, batch)
+    assert first is second and first is not other
+    assert len(loads) == 2
+    assert first.model == "model"
+    assert first.submit("x").result(timeout=5) == "model:x"
+
+
+def test_requests_are_batched_and_failures_isolated():
+    sizes = []
+
+    def batch(items):
+        sizes.append(len(items))
+        time.sleep(0.02)
+        if "bad" in items:
+            raise ValueError("bad")
+        return [item.upper() for item in items]
+
+    batcher = ASRBatcher(
+        "test_isolated", batch, max_batch_size=4, max_wait_ms=50, retry_individually=True
+    )
+    futures = [batcher.submit(item) for item in ("a", "bad", "c", "d")]
+    assert [f.result(timeout=5) for f in (futures[0], futures[2], futures[3])] == ["A", "C", "D"]
+    assert isinstance(futures[1].exception(timeout=5), ValueError)
+    assert sizes[0] == 4
+    batcher.close()
+
+
+def test_failed_batch_is_not_retried_unless_opted_in():
+    calls = []
+
+    def batch(items):
+        calls.append(list(items))
+        if len(items) > 1 or "bad" in items:
+            raise ValueError("decode failed")
+        return [item.upper() for item in items]
+
+    batcher = ASRBatcher("test_no_retry", batch, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(item) for item in ("a", "b")]
+    for future in futures:
+        assert isinstance(future.exception(timeout=5), ValueError)
+    # 不可重复执行的 batch_fn（如流式解码）只调用一次
+    assert calls == [["a", "b"]]
+    batcher.close()
@@ -0,0 +1,48 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.utils.async_http import LoopHTTPClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_requests_from_any_loop_and_worker_thread(server_url):
+    http = LoopHTTPClient("test-loop-http", base_url=server_url, trust_env=False)
+    try:
+        response = http.run_sync(http.client.post("/sync"), timeout=5)
+        assert response.json() == {"path": "/sync"}
+
+        async def caller():
+            response = await http.run(http.client.post("/async"))
+            return response.json()
+
+        # 调用方的事件循环与客户端事件循环不同
+        assert asyncio.run(caller()) == {"path": "/async"}
+        assert asyncio.run(caller()) == {"path": "/async"}
+    finally:
+        http.close()
+    assert http.client.is_closed
+    http._thread.join(timeout=5)
+    assert not http._thread.is_alive()
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from core.utils import async_pipeline
+from core.utils.async_pipeline import (
+    get_chat_executor,
+    get_init_executor,
+    get_shared_executor,
+    is_async_pipeline_enabled,
+    is_shared_executor,
+)
+
+
+def test_chat_init_and_synthesis_use_separate_bounded_pools(monkeypatch):
+    monkeypatch.setattr(async_pipeline, "_executors", {})
+    config = {"async_pipeline_workers": 8, "async_pipeline_chat_workers": 3}
+
+    shared = get_shared_executor(config)
+    chat = get_chat_executor(config)
+    init = get_init_executor(config)
+    try:
+        assert len({id(shared), id(chat), id(init)}) == 3
+        assert shared._max_workers == 8
+        assert chat._max_workers == 3
+        assert init._max_workers == async_pipeline.DEFAULT_INIT_WORKERS
+        # 进程级单例：后续连接拿到同一个池，配置只在首次创建时生效
+        assert get_chat_executor({"async_pipeline_chat_workers": 99}) is chat
+        assert all(is_shared_executor(e) for e in (shared, chat, init))
+    finally:
+        for executor in (shared, chat, init):
+            executor.shutdown(wait=False)
+
+
+def test_per_connection_executor_is_not_shared(monkeypatch):
+    monkeypatch.setattr(async_pipeline, "_executors", {})
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        assert not is_shared_executor(executor)
+        assert not is_shared_executor(None)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def test_pipeline_switch_reads_config():
+    assert is_async_pipeline_enabled({"async_pipeline": True})
+    assert not is_async_pipeline_enabled({"async_pipeline": "false"})
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+try:
+    from core.utils.audio_transcoder import StreamingResampler
+except Exception as e:  # 依赖 libopus 等运行环境
+    pytest.skip(f"音频转码模块不可用: {e}", allow_module_level=True)
+
+
+def _tone(freq, rate, seconds=0.5):
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _resample(samples, src_rate, chunk=None):
+    resampler = StreamingResampler(src_rate)
+    chunk = chunk or len(samples)
+    parts = [resampler.process(samples[i : i + chunk]) for i in range(0, len(samples), chunk)]
+    parts.append(resampler.flush())
+    return np.concatenate(parts)
+
+
+def _rms(samples):
+    # 去掉首尾过渡段
+    middle = samples[len(samples) // 8 : -len(samples) // 8]
+    return float(np.sqrt(np.mean(middle**2)))
+
+
+@pytest.mark.parametrize("src_rate", [24000, 44100, 48000])
+def test_tones_above_target_nyquist_are_filtered(src_rate):
+    # 10kHz 降到16k 后会混叠到 6kHz，必须被低通滤掉
+    out = _resample(_tone(10000, src_rate), src_rate)
+    assert _rms(out) < 0.5 / np.sqrt(2) * 10 ** (-50 / 20)
+
+
+@pytest.mark.parametrize("src_rate", [8000, 22050, 24000, 44100, 48000])
+def test_passband_tone_keeps_level_and_length(src_rate):
+    samples = _tone(1000, src_rate)
+    out = _resample(samples, src_rate)
+    assert len(out) == -(-len(samples) * 16000 // src_rate)
+    assert _rms(out) == pytest.approx(0.5 / np.sqrt(2), rel=0.01)
+    expected = _tone(1000, 16000)[: len(out)]
+    assert np.max(np.abs(out - expected)[len(out) // 8 : -len(out) // 8]) < 1e-2
+
+
+def test_chunked_input_matches_single_block():
+    samples = np.random.default_rng(0).uniform(-0.5, 0.5, 44100).astype(np.float32)
+    whole = _resample(samples, 44100)
+    for chunk in (1, 441, 1000, 4096):
+        np.testing.assert_allclose(_resample(samples, 44100, chunk), whole, atol=1e-5)
@@ -0,0 +1,61 @@
+from core.utils.dialogue import Dialogue, Message
+
+
+def _tool_turn(dialogue, index):
+    """一轮带工具调用的对话：user -> assistant(tool_calls) -> tool -> assistant"""
+    call_id = f"call_{index}"
+    dialogue.put(Message(role="user", content=f"问题{index}"))
+    dialogue.put(
+        Message(
+            role="assistant",
+            tool_calls=[{"id": call_id, "type": "function", "function": {"name": "f", "arguments": "{}"}}],
+        )
+    )
+    dialogue.put(Message(role="tool", content=f"结果{index}", tool_call_id=call_id))
+    dialogue.put(Message(role="assistant", content=f"回答{index}"))
+
+
+def _non_system(dialogue):
+    return [m for m in dialogue.get_llm_dialogue() if m["role"] != "system"]
+
+
+def test_window_evicts_whole_turns_including_tool_messages():
+    evicted_batches = []
+    dialogue = Dialogue(max_turns=2, on_evict=evicted_batches.append)
+    dialogue.put(Message(role="system", content="系统"))
+    for i in range(3):
+        _tool_turn(dialogue, i)
+
+    messages = _non_system(dialogue)
+    assert [m["role"] for m in messages] == ["user", "assistant", "tool", "assistant"] * 2
+    assert messages[0]["content"] == "问题1"
+    # 不会留下孤立的工具结果：每个 tool 消息前都有对应的 tool_calls
+    for i, m in enumerate(messages):
+        if m["role"] == "tool":
+            assert messages[i - 1]["tool_calls"][0]["id"] == m["tool_call_id"]
+
+    assert len(evicted_batches) == 1
+    assert [m.role for m in evicted_batches[0]] == ["user", "assistant", "tool", "assistant"]
+    assert dialogue.archived == evicted_batches[0]
+    assert dialogue.dialogue[0].role == "system"
+    assert len(dialogue.full_history()) == 1 + 4 * 3
+
+
+def test_token_limit_keeps_at_least_latest_turn():
+    dialogue = Dialogue(max_tokens=1)
+    dialogue.put(Message(role="system", content="系统"))
+    _tool_turn(dialogue, 0)
+    _tool_turn(dialogue, 1)
+
+    messages = _non_system(dialogue)
+    assert [m["role"] for m in messages] == ["user", "assistant", "tool", "assistant"]
+    assert messages[0]["content"] == "问题1"
+    assert dialogue.get_llm_dialogue()[0]["role"] == "system"
+
+
+def test_no_limit_keeps_everything():
+    dialogue = Dialogue()
+    for i in range(30):
+        _tool_turn(dialogue, i)
+    assert len(dialogue.dialogue) == 4 * 30
+    assert dialogue.archived == []
@@ -0,0 +1,41 @@
+import json
+
+from core.utils.cache.intent_cache import IntentCache
+
+
+def _intent(name, arguments=None):
+    call = {"name": name}
+    if arguments is not None:
+        call["arguments"] = arguments
+    return json.dumps({"function_call": call}, ensure_ascii=False)
+
+
+def _store(cache, text, name, arguments, history_used, device_id="dev-a"):
+    cache.put(
+        text, "fp", device_id, "history-a", _intent(name, arguments),
+        [(name, arguments)], 0.5, history_used=history_used,
+    )
+
+
+def _fleet_hit(cache, text):
+    return cache.get(text, "fp", "dev-b", "history-b")
+
+
+def test_context_dependent_results_stay_per_device():
+    cache = IntentCache()
+    _store(cache, "好的", "play_music", {"song_name": "random"}, True)
+    _store(cache, "明天呢", "get_weather", {"location": "上海"}, True)
+    _store(cache, "是的", "handle_exit_intent", None, True)
+    assert _fleet_hit(cache, "好的") is None
+    assert _fleet_hit(cache, "明天呢") is None
+    assert _fleet_hit(cache, "是的") is None
+    # 原设备、相同历史仍可命中
+    assert cache.get("明天呢", "fp", "dev-a", "history-a") is not None
+
+
+def test_results_determined_by_utterance_are_shared():
+    cache = IntentCache()
+    _store(cache, "上海天气怎么样", "get_weather", {"location": "上海"}, True)
+    _store(cache, "现在几点", "get_time", None, False)
+    assert _fleet_hit(cache, "上海天气怎么样") is not None
+    assert _fleet_hit(cache, "现在几点") is not None
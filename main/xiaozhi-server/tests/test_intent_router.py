@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from core.utils.intent_router import IntentRouter, VOLUME_TOOL_NAME
+
+AVAILABLE = {"handle_exit_intent", "play_music", "get_weather", VOLUME_TOOL_NAME}
+
+
+@pytest.fixture
+def router():
+    router = IntentRouter()
+    router.update_exit_commands(["退出", "关闭"])
+    router.update_music({"scan_time": 1.0, "music_file_names": ["小星星", "儿歌/两只老虎"]})
+    return router
+
+
+def _call(result):
+    return json.loads(result)["function_call"]
+
+
+@pytest.mark.parametrize(
+    "text", ["再来", "我想听", "听", "唱", "放", "来一下", "听一下", "再来一首", "播放"]
+)
+def test_bare_verbs_fall_back_to_llm(router, text):
+    assert router.route(text, AVAILABLE) is None
+
+
+@pytest.mark.parametrize(
+    "text,song",
+    [("播放音乐", "random"), ("来首歌", "random"), ("放点音乐", "random"),
+     ("播放小星星", "小星星"), ("我想听两只老虎", "儿歌/两只老虎")],
+)
+def test_explicit_music_requests_are_routed(router, text, song):
+    call = _call(router.route(text, AVAILABLE))
+    assert call == {"name": "play_music", "arguments": {"song_name": song}}
+
+
+@pytest.mark.parametrize(
+    "text", ["退出吧", "我不想和你说话了", "我不想和你说话了吧", "请退出系统吧", "你退下吧", "帮我关闭一下"]
+)
+def test_exit_phrases_are_routed(router, text):
+    assert _call(router.route(text, AVAILABLE))["name"] == "handle_exit_intent"
+
+
+@pytest.mark.parametrize("text", ["好了", "我不想退出", "说话了"])
+def test_non_exit_phrases_are_not_routed_to_exit(router, text):
+    result = router.route(text, AVAILABLE)
+    assert result is None or _call(result)["name"] != "handle_exit_intent"
+
+
+def test_other_rules(router):
+    assert _call(router.route("今天天气怎么样", AVAILABLE))["name"] == "get_weather"
+    assert _call(router.route("音量调到50", AVAILABLE))["arguments"] == {"volume": 50}
+    assert router.route("音量调到150", AVAILABLE) is None
+
+
+def test_unavailable_function_is_not_routed(router):
+    assert router.route("播放音乐", AVAILABLE - {"play_music"}) is None
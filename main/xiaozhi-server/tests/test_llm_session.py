@@ -0,0 +1,14 @@
+import pytest
+
+try:
+    from core.providers.llm.dify.dify import LLMProvider as DifyLLM
+except Exception as e:  # 依赖 libopus 等运行环境
+    pytest.skip(f"Dify LLM不可用: {e}", allow_module_level=True)
+
+
+def test_end_session_drops_only_that_conversation():
+    llm = DifyLLM({"api_key": "test-key"})
+    llm.session_conversation_map.update({"s1": "c1", "s2": "c2"})
+    llm.end_session("s1")
+    llm.end_session("missing")
+    assert llm.session_conversation_map == {"s2": "c2"}
@@ -0,0 +1,98 @@
+import os
+import importlib.util
+from types import SimpleNamespace
+
+# 项目根目录下的 performance_tester.py 会遮蔽同名目录，按路径加载压测脚本
+_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "performance_tester", "performance_tester_load.py"
+)
+_spec = importlib.util.spec_from_file_location("performance_tester_load", _PATH)
+load_tester = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(load_tester)
+
+DeviceResult = load_tester.DeviceResult
+build_stub_config = load_tester.build_stub_config
+parse_args = load_tester.parse_args
+percentile = load_tester.percentile
+summarize = load_tester.summarize
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile([], 50) is None
+    assert percentile([7.0], 99) == 7.0
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([3, 1, 2], 50) == 2
+
+
+def test_build_stub_config_replaces_external_modules():
+    base = {
+        "read_config_from_api": True,
+        "manager-api": {"url": "http://x", "secret": "s"},
+        "server": {"port": 8000, "auth": {"enabled": True, "tokens": []}},
+        "selected_module": {"ASR": "FunASR", "LLM": "ChatGLMLLM", "TTS": "EdgeTTS", "VLLM": "x", "VoicePrint": "y"},
+        "voiceprint": {"url": "http://vp"},
+        "TTS": {"EdgeTTS": {"type": "edge"}},
+    }
+    args = parse_args(["--port", "9100", "--tts-latency-ms", "50", "--tts-cache"])
+    config = build_stub_config(base, args)
+
+    assert config["read_config_from_api"] is False
+    assert "manager-api" not in config and "voiceprint" not in config
+    assert config["server"]["port"] == 9100
+    assert config["server"]["auth"]["enabled"] is False
+    assert config["tts_cache_enabled"] is True
+    assert config["selected_module"] == {
+        "ASR": "StubASR",
+        "LLM": "StubLLM",
+        "TTS": "StubTTS",
+        "Memory": "nomem",
+        "Intent": "nointent",
+    }
+    assert config["TTS"]["StubTTS"]["latency_ms"] == 50
+    assert config["TTS"]["EdgeTTS"] == {"type": "edge"}
+    # 不修改传入的主配置
+    assert base["selected_module"]["ASR"] == "FunASR"
+    assert base["server"]["auth"]["enabled"] is True
+
+
+def test_summarize_per_connection_resources():
+    ok = DeviceResult("d0")
+    ok.connect_ms = 10.0
+    ok.eos_to_stt_ms = [200.0, 300.0]
+    ok.first_audio_ms = [900.0]
+    ok.turn_ms = [1500.0]
+    failed = DeviceResult("d1")
+    failed.errors.append("turn timeout")
+
+    sampler = SimpleNamespace(
+        samples=[
+            {"cpu": 20.0, "rss_mb": 110.0, "threads": 12},
+            {"cpu": 40.0, "rss_mb": 120.0, "threads": 10},
+        ]
+    )
+    baseline = {"cpu": 0.0, "rss_mb": 100.0, "threads": 4}
+    report = summarize([ok, failed], baseline, sampler, devices=2)
+
+    assert report["connected"] == 1
+    assert report["errors"] == ["d1: turn timeout"]
+    assert report["eos_to_stt_ms"]["count"] == 2
+    assert report["eos_to_stt_ms"]["p50"] == 200.0
+    assert report["eos_to_stt_ms"]["max"] == 300.0
+    assert report["time_to_first_audio_ms"]["p99"] == 900.0
+    server = report["server"]
+    assert server["peak"] == {"cpu": 40.0, "rss_mb": 120.0, "threads": 12}
+    assert server["avg_cpu"] == 30.0
+    assert server["rss_mb_per_connection"] == 20.0
+    assert server["threads_per_connection"] == 8.0
+
+
+def test_summarize_without_samples_uses_baseline():
+    report = summarize([DeviceResult("d0")], {"cpu": 1.0, "rss_mb": 50.0, "threads": 3}, SimpleNamespace(samples=[]), devices=1)
+    assert report["connected"] == 0
+    assert report["turn_ms"] == {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    assert report["server"]["peak"] == {"cpu": 1.0, "rss_mb": 50.0, "threads": 3}
+    assert report["server"]["rss_mb_per_connection"] == 0.0
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+try:
+    from core.providers.tools.server_mcp.mcp_manager import MCPServerSessions, MCPSession
+except Exception as e:  # 依赖 mcp 等运行环境
+    pytest.skip(f"服务端MCP模块不可用: {e}", allow_module_level=True)
+
+
+class ToolError(Exception):
+    pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.release = asyncio.Event()
+        self.calls = []
+        self.tools_dict = {}
+
+    def get_available_tools(self):
+        return []
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    async def call_tool(self, name, args):
+        self.calls.append(name)
+        if name == "bad_args":
+            raise ToolError("invalid arguments")
+        if name == "slow":
+            await self.release.wait()
+        return f"{name}-ok"
+
+    async def cleanup(self):
+        self.closed = True
+
+
+def _pool(max_sessions=1):
+    pool = MCPServerSessions("test", {}, max_sessions, 8)
+    clients = []
+
+    async def open_session():
+        client = FakeClient()
+        clients.append(client)
+        return MCPSession(client, 8)
+
+    pool._open_session = open_session
+    return pool, clients
+
+
+def test_tool_error_does_not_restart_shared_session():
+    async def scenario():
+        pool, clients = _pool()
+        await pool.start()
+        slow = asyncio.create_task(pool.call_tool("slow", {}, 3, 0))
+        await asyncio.sleep(0)
+        with pytest.raises(ToolError):
+            await pool.call_tool("bad_args", {}, 3, 0)
+        clients[0].release.set()
+        assert await slow == "slow-ok"
+        # 参数错误不重试、不重启会话
+        assert clients[0].calls.count("bad_args") == 1
+        assert len(clients) == 1 and not clients[0].closed
+
+    asyncio.run(scenario())
+
+
+def test_broken_session_closes_after_inflight_calls_drain():
+    async def scenario():
+        pool, clients = _pool()
+        await pool.start()
+        first = clients[0]
+        slow = asyncio.create_task(pool.call_tool("slow", {}, 3, 0))
+        await asyncio.sleep(0)
+
+        async def broken(name, args):
+            first.connected = False
+            raise BrokenPipeError("stdio closed")
+
+        first.call_tool = broken
+        assert await pool.call_tool("echo", {}, 3, 0) == "echo-ok"
+        assert len(clients) == 2 and first not in [s.client for s in pool.sessions]
+        # 进行中的调用结束前不关闭旧会话
+        assert not first.closed
+        first.release.set()
+        await slow
+        await asyncio.sleep(0)
+        assert first.closed
+
+    asyncio.run(scenario())
+
+
+def test_opening_a_session_does_not_block_calls_on_existing_sessions():
+    async def run():
+        pool, clients = _pool(max_sessions=2)
+        await pool.start()
+        pool_open = pool._open_session
+
+        async def slow_open():
+            await asyncio.sleep(0.5)
+            return await pool_open()
+
+        pool._open_session = slow_open
+        slow = asyncio.create_task(pool.call_tool("slow", {}, 3, 0))
+        await asyncio.sleep(0)
+        # 唯一的会话繁忙，扩容在后台进行，本次调用直接复用现有会话
+        result = await asyncio.wait_for(pool.call_tool("echo", {}, 3, 0), timeout=0.2)
+        assert result == "echo-ok"
+        clients[0].release.set()
+        await slow
+        await asyncio.sleep(0.6)
+        assert len(pool.sessions) == 2
+
+    asyncio.run(run())
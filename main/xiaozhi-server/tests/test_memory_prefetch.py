@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.utils.memory_prefetch import MemoryPrefetcher
+
+
+class GatedMemory:
+    """每个查询等到测试放行后才返回，用于控制完成顺序"""
+
+    short_memory = None
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.gates = {}
+
+    async def query_memory(self, query):
+        gate = self.gates.setdefault(query, asyncio.Event())
+        await gate.wait()
+        return f"记忆:{query}"
+
+    def release(self, query):
+        def _set():
+            self.gates.setdefault(query, asyncio.Event()).set()
+
+        self.loop.call_soon_threadsafe(_set)
+
+
+def _settled(future):
+    """在 _on_done 之后注册的回调：触发时说明快照更新已执行完毕"""
+    done = threading.Event()
+    future.add_done_callback(lambda _: done.set())
+    return done
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=1)
+    loop.close()
+
+
+def test_superseded_query_does_not_overwrite_snapshot(loop):
+    memory = GatedMemory(loop)
+    prefetcher = MemoryPrefetcher(memory, loop, deadline_ms=300)
+
+    prefetcher.refresh("旧")
+    old_future = prefetcher._future
+    prefetcher.refresh("新")
+    new_future = prefetcher._future
+
+    new_done, old_done = _settled(new_future), _settled(old_future)
+
+    memory.release("新")
+    assert new_done.wait(timeout=1)
+    memory.release("旧")
+    assert old_done.wait(timeout=1)
+    assert prefetcher.snapshot == "记忆:新"
+
+
+def test_latest_query_updates_snapshot(loop):
+    memory = GatedMemory(loop)
+    prefetcher = MemoryPrefetcher(memory, loop, deadline_ms=300)
+    memory.release("q")
+    assert prefetcher.get("q") == "记忆:q"
+    assert prefetcher.snapshot == "记忆:q"
@@ -0,0 +1,70 @@
+import json
+
+import yaml
+
+from core.providers.memory.mem_local_short.memory_store import ShortMemoryStore
+
+
+def _write_log(path, records, tail=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for role_id, memory in records:
+            f.write(json.dumps({"role_id": role_id, "memory": memory}, ensure_ascii=False) + "\n")
+        f.write(tail)
+
+
+def test_log_replays_over_snapshot(tmp_path):
+    snapshot = tmp_path / ".memory.yaml"
+    snapshot.write_text(yaml.dump({"a": "old-a", "b": "old-b"}), encoding="utf-8")
+    _write_log(str(snapshot) + ".log", [("a", "new-a"), ("c", "记忆c")])
+
+    store = ShortMemoryStore(str(snapshot))
+    assert store.get("a") == "new-a"
+    assert store.get("b") == "old-b"
+    assert store.get("c") == "记忆c"
+
+
+def test_truncated_last_line_is_dropped_and_later_writes_survive(tmp_path):
+    snapshot = tmp_path / ".memory.yaml"
+    log_path = str(snapshot) + ".log"
+    _write_log(log_path, [("a", "1")], tail='{"role_id": "b", "mem')
+
+    store = ShortMemoryStore(str(snapshot))
+    assert store.get("a") == "1" and store.get("b") is None
+    store.put("c", "3")
+
+    reloaded = ShortMemoryStore(str(snapshot))
+    assert reloaded.get("a") == "1"
+    assert reloaded.get("c") == "3"
+
+
+def test_compaction_writes_snapshot_and_clears_log(tmp_path):
+    snapshot = tmp_path / ".memory.yaml"
+    store = ShortMemoryStore(str(snapshot), compact_threshold=3)
+    for i in range(3):
+        store.put(f"role{i}", f"memory{i}")
+
+    assert yaml.safe_load(snapshot.read_text(encoding="utf-8")) == {
+        "role0": "memory0",
+        "role1": "memory1",
+        "role2": "memory2",
+    }
+    assert (tmp_path / ".memory.yaml.log").read_text() == ""
+    store.put("role0", "updated")
+    reloaded = ShortMemoryStore(str(snapshot))
+    assert reloaded.get("role0") == "updated"
+    assert reloaded.get("role2") == "memory2"
+
+
+def test_unreadable_snapshot_is_never_overwritten(tmp_path):
+    snapshot = tmp_path / ".memory.yaml"
+    broken = "a: [unclosed\n"
+    snapshot.write_text(broken, encoding="utf-8")
+
+    store = ShortMemoryStore(str(snapshot), compact_threshold=2)
+    store.put("x", "1")
+    store.put("y", "2")
+    store.compact()
+
+    assert snapshot.read_text(encoding="utf-8") == broken
+    reloaded = ShortMemoryStore(str(snapshot))
+    assert reloaded.get("x") == "1" and reloaded.get("y") == "2"
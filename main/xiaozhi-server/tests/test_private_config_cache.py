@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from core.utils.cache.private_config import PrivateConfigCache
+
+
+class DeviceGone(Exception):
+    pass
+
+
+def _wait_idle(cache, device_id):
+    for _ in range(200):
+        if device_id not in cache._inflight:
+            return
+        time.sleep(0.005)
+
+
+def test_background_refresh_evicts_deleted_device():
+    cache = PrivateConfigCache(ttl=0.01, stale_ttl=60, evict_on=(DeviceGone,))
+    assert cache.get("dev", lambda: {"v": 1}) == {"v": 1}
+    time.sleep(0.02)
+
+    def gone():
+        raise DeviceGone()
+
+    # 过期后先返回旧配置，后台刷新发现设备已删除
+    assert cache.get("dev", gone) == {"v": 1}
+    _wait_idle(cache, "dev")
+    with pytest.raises(DeviceGone):
+        cache.get("dev", gone)
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_other_refresh_errors_keep_stale_config():
+    cache = PrivateConfigCache(ttl=0.01, stale_ttl=60, evict_on=(DeviceGone,))
+    cache.get("dev", lambda: {"v": 1})
+    time.sleep(0.02)
+
+    def broken():
+        raise ConnectionError()
+
+    cache.get("dev", broken)
+    _wait_idle(cache, "dev")
+    assert cache.get("dev", broken) == {"v": 1}
+
+
+def test_invalidating_one_device_keeps_other_inflight_fetches():
+    cache = PrivateConfigCache(ttl=60)
+    release = threading.Event()
+    results = {}
+
+    def slow():
+        release.wait(5)
+        return {"v": "b"}
+
+    worker = threading.Thread(target=lambda: results.setdefault("b", cache.get("dev-b", slow)))
+    worker.start()
+    time.sleep(0.05)
+    cache.invalidate("dev-a")
+    release.set()
+    worker.join()
+    assert results["b"] == {"v": "b"}
+    # dev-b 的结果没有因为 dev-a 失效而被丢弃
+    assert cache.get("dev-b", lambda: {"v": "new"}) == {"v": "b"}
@@ -0,0 +1,22 @@
+import pytest
+
+try:
+    from core.providers.tts.base import _config_fingerprint
+except Exception as e:  # 依赖 libopus 等运行环境
+    pytest.skip(f"TTS基类不可用: {e}", allow_module_level=True)
+
+
+def test_voice_fields_outside_voice_attribute_change_identity():
+    base = {"type": "fishspeech", "reference_id": "a", "format": "wav"}
+    assert _config_fingerprint(base) != _config_fingerprint(dict(base, reference_id="b"))
+    assert _config_fingerprint(base) != _config_fingerprint(dict(base, format="mp3"))
+    assert _config_fingerprint({"params": {"spk": 1}}) != _config_fingerprint(
+        {"params": {"spk": 2}}
+    )
+
+
+def test_secrets_and_output_dir_do_not_change_identity():
+    base = {"type": "doubao", "voice": "x", "speed": 1.0}
+    assert _config_fingerprint(base) == _config_fingerprint(
+        dict(base, api_key="k1", access_token="t", output_dir="tmp/a")
+    )
@@ -0,0 +1,86 @@
+import pytest
+
+from core.utils.tts import SentenceSegmenter
+
+PUNCTUATIONS = ("。", "？", "?", "！", "!", "；", ";", "：")
+FIRST_PUNCTUATIONS = ("，", "~", "、", ",") + PUNCTUATIONS
+
+
+def legacy_cut(text, punctuations):
+    """原实现：各标点最后一次出现位置中最靠前的一个"""
+    last = -1
+    for punct in punctuations:
+        pos = text.rfind(punct)
+        if pos != -1 and (last == -1 or pos < last):
+            last = pos
+    return text[: last + 1] if last != -1 else None
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["你好。今天天气不错！要出去吗？", "第一句。第二句。第三", "没有标点", "好的！是的。对吗！"],
+)
+def test_segmenter_matches_legacy_cut(text):
+    segmenter = SentenceSegmenter(PUNCTUATIONS, FIRST_PUNCTUATIONS)
+    segmenter.is_first_sentence = False
+    assert segmenter.feed(text) == legacy_cut(text, PUNCTUATIONS)
+
+
+def test_segmenter_incremental_feed():
+    segmenter = SentenceSegmenter(PUNCTUATIONS, FIRST_PUNCTUATIONS)
+    assert segmenter.feed("好的") is None
+    assert segmenter.feed("，正在") == "好的，"
+    assert segmenter.feed("播放。下") == "正在播放。"
+    assert segmenter.tail == "下"
+    assert segmenter.flush() == "下"
+    assert segmenter.tail == ""
+
+
+try:
+    from core.providers.tts.base import TTSProviderBase
+    from core.providers.tts.dto.dto import ContentType, SentenceType, TTSMessageDTO
+except Exception as e:  # 依赖 libopus 等运行环境
+    TTSProviderBase = None
+    _import_error = e
+
+
+class _Conn:
+    client_abort = False
+
+
+def _make_provider():
+    if TTSProviderBase is None:
+        pytest.skip(f"TTS基类不可用: {_import_error}")
+
+    class RecordingTTS(TTSProviderBase):
+        async def text_to_speak(self, text, output_file):
+            pass
+
+        def to_tts_stream(self, text, opus_handler=None):
+            self.spoken.append(text)
+
+        def reset_flow_controller(self):
+            pass
+
+    provider = RecordingTTS({"output_dir": "tmp/"}, True)
+    provider.conn = _Conn()
+    provider.spoken = []
+    return provider
+
+
+def _text(provider, sentence_type, content_type, detail=None, file=None):
+    provider._handle_tts_text_message(
+        TTSMessageDTO("s1", sentence_type, content_type, detail, file)
+    )
+
+
+def test_text_after_file_is_not_spoken_twice():
+    provider = _make_provider()
+    _text(provider, SentenceType.FIRST, ContentType.ACTION)
+    _text(provider, SentenceType.MIDDLE, ContentType.TEXT, "好的，正在为您播放")
+    _text(provider, SentenceType.MIDDLE, ContentType.TEXT, "歌曲")
+    # 播放音乐：先把剩余文本读完，再播放文件
+    _text(provider, SentenceType.MIDDLE, ContentType.FILE, file="not-exists.mp3")
+    _text(provider, SentenceType.MIDDLE, ContentType.TEXT, "祝您愉快。")
+    _text(provider, SentenceType.LAST, ContentType.ACTION)
+    assert provider.spoken == ["好的", "正在为您播放歌曲", "祝您愉快"]
@@ -0,0 +1,66 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+try:
+    from core.providers.tts.base import TTSProviderBase, _OpusFrameSink
+    from core.providers.tts.dto.dto import SentenceType
+except Exception as e:  # 依赖 libopus 等运行环境
+    pytest.skip(f"TTS基类不可用: {e}", allow_module_level=True)
+
+
+def _wav(seconds, rate=24000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        t = np.arange(int(rate * seconds))
+        wf.writeframes((3000 * np.sin(2 * np.pi * 440 * t / rate)).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class StreamingTTS(TTSProviderBase):
+    def __init__(self, chunks):
+        super().__init__({}, True)
+        self.chunks = chunks
+        self.queued_before_end = 0
+
+    async def text_to_speak(self, text, output_file):
+        raise AssertionError("流式provider不应走整段合成")
+
+    async def text_to_speak_stream(self, text):
+        for chunk in self.chunks:
+            yield chunk
+        self.queued_before_end = self.tts_audio_queue.qsize()
+
+
+def _drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+
+def test_stream_frames_are_queued_before_synthesis_ends():
+    data = _wav(1.0)
+    tts = StreamingTTS([data[i : i + 4800] for i in range(0, len(data), 4800)])
+    tts.to_tts_stream("你好")
+
+    items = _drain(tts.tts_audio_queue)
+    assert tts.queued_before_end > 0
+    assert items[0][0] == SentenceType.FIRST and items[0][2] == "你好"
+    assert items[-1][0] == SentenceType.LAST
+    assert all(t == SentenceType.MIDDLE for t, _, _ in items[1:-1])
+    # 约1秒音频 = 17帧（60ms一帧，末帧补零）
+    assert len(items) == 17
+
+
+def test_sink_tags_single_frame_as_first():
+    tts = StreamingTTS([])
+    sink = _OpusFrameSink(tts, "嗯")
+    sink.push(b"a")
+    assert sink.close() == [b"a"]
+    assert _drain(tts.tts_audio_queue) == [(SentenceType.FIRST, b"a", "嗯")]